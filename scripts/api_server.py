@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from urllib.parse import parse_qs, parse_qsl, unquote, urlsplit
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+import inverted_index
+import pokemon_dataset
+from pokemon_dataset import PATH, iter_json_dir, load_json
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# 小于该大小的响应不压缩
+MIN_COMPRESS_BYTES = 512
+MAX_HEADER_BYTES = 16 * 1024
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+class HttpError(Exception):
+  def __init__(self, status, message):
+    super().__init__(message)
+    self.status = status
+
+# 渲染好的响应：正文、ETag 以及预先压缩好的 gzip / br 版本
+class Response:
+  def __init__(self, status, body):
+    self.status = status
+    self.bodies = {'identity': body}
+    self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    if len(body) >= MIN_COMPRESS_BYTES:
+      self.bodies['gzip'] = gzip.compress(body, 6)
+      if brotli is not None:
+        self.bodies['br'] = brotli.compress(body, quality=9)
+
+  @property
+  def size(self):
+    return sum(len(body) for body in self.bodies.values())
+
+  def choose_encoding(self, accept_encoding):
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    for encoding in ['br', 'gzip']:
+      if encoding in accepted and encoding in self.bodies:
+        return encoding
+    return 'identity'
+
+# 按字节数限制容量的 LRU
+class ResponseCache:
+  def __init__(self, max_bytes=MAX_CACHE_BYTES):
+    self.max_bytes = max_bytes
+    self.size = 0
+    self.entries = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key):
+    response = self.entries.get(key)
+    if response is None:
+      self.misses += 1
+      return None
+    self.entries.move_to_end(key)
+    self.hits += 1
+    return response
+
+  def put(self, key, response):
+    if response.size > self.max_bytes:
+      return
+    if key in self.entries:
+      self.size -= self.entries.pop(key).size
+    self.entries[key] = response
+    self.size += response.size
+    while self.size > self.max_bytes:
+      key, evicted = self.entries.popitem(last=False)
+      self.size -= evicted.size
+
+def dump_body(data):
+  return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# 数据集只读，启动时加载各索引，之后每个请求只查表
+class DatasetApi:
+  def __init__(self, data_path=PATH, pack_path=pokemon_dataset.PACK_PATH, index_path=inverted_index.INDEX_PATH):
+    self.dataset = pokemon_dataset.load(pack_path, data_path)
+    self.index = inverted_index.load(index_path, data_path)
+    # national.json 中地区形态与原种编号相同（如阿罗拉小拳石），取每个编号的第一条，即原种
+    national = {}
+    for entry in load_json(os.path.join(data_path, 'pokedex', 'national.json')):
+      national.setdefault(entry['id'], entry)
+    self.species = []
+    for pokemon in load_json(os.path.join(data_path, 'simple_pokedex.json')):
+      entry = national.get(pokemon['index'], {})
+      self.species.append({**pokemon, 'types': entry.get('types', []), 'gen': entry.get('gen')})
+    self.dex = dict(iter_json_dir('pokedex', data_path))
+
+  def get_record(self, kind, name):
+    try:
+      return self.dataset.get(kind, name)
+    except KeyError:
+      raise HttpError(404, f'{kind} not found: {name}') from None
+
+  def route(self, path, query):
+    parts = [unquote(part) for part in path.strip('/').split('/') if part]
+    if not parts:
+      return {'routes': ['/pokemon/{name}', '/pokemon/{name}/{field}', '/moves/{name}', '/abilities/{name}',
+                         '/pokedex', '/pokedex/{region}', '/search']}
+    kind = parts[0]
+    if kind in ('pokemon', 'moves', 'abilities') and len(parts) == 2:
+      return self.get_record(kind, parts[1]).to_dict()
+    if kind in ('pokemon', 'moves', 'abilities') and len(parts) == 3:
+      record = self.get_record(kind, parts[1])
+      if parts[2] not in record:
+        raise HttpError(404, f'field not found: {parts[2]}')
+      return record[parts[2]]
+    if kind == 'pokedex' and len(parts) == 1:
+      return sorted(self.dex)
+    if kind == 'pokedex' and len(parts) == 2:
+      if parts[1] not in self.dex:
+        raise HttpError(404, f'pokedex not found: {parts[1]}')
+      return self.dex[parts[1]]
+    if kind == 'search' and len(parts) == 1:
+      return self.search(query)
+    raise HttpError(404, f'no route for {path}')
+
+  # 名称子串、世代在内存列表上过滤；招式、特性、属性、蛋群走倒排索引，后三者须由同一个形态满足
+  def search(self, query):
+    indexed = {
+      'moves': query.get('move', []),
+      'abilities': query.get('ability', []),
+      'types': query.get('type', []),
+      'egg_groups': query.get('egg_group', []),
+    }
+    allowed = None
+    if any(indexed.values()):
+      allowed = set(self.index.search(**indexed))
+    name = query.get('q', [''])[0].lower()
+    gen = query.get('gen', [None])[0]
+    result = []
+    for pokemon in self.species:
+      if allowed is not None and int(pokemon['index']) not in allowed:
+        continue
+      if gen and str(pokemon['gen']) != gen:
+        continue
+      if name and not any(name in (pokemon.get(field) or '').lower() for field in ['name_zh', 'name_en', 'name_jp']):
+        continue
+      result.append(pokemon)
+    return result
+
+  def render(self, target):
+    parts = urlsplit(target)
+    query = parse_qs(parts.query)
+    try:
+      return Response(200, dump_body(self.route(parts.path, query)))
+    except HttpError as e:
+      return Response(e.status, dump_body({'error': str(e)}))
+
+# If-None-Match 为 * 或逗号分隔的 ETag 列表，按弱比较忽略 W/ 前缀
+def match_etag(if_none_match, etag):
+  if if_none_match.strip() == '*':
+    return True
+  return etag in re.findall(r'"[^"]*"', if_none_match)
+
+# 查询串参数顺序不同视为同一请求
+def get_cache_key(target):
+  parts = urlsplit(target)
+  return unquote(parts.path), tuple(sorted(parse_qsl(parts.query)))
+
+class Server:
+  def __init__(self, api, cache=None, max_age=3600):
+    self.api = api
+    self.cache = cache or ResponseCache()
+    self.max_age = max_age
+
+  def get_response(self, target):
+    key = get_cache_key(target)
+    response = self.cache.get(key)
+    if response is None:
+      response = self.api.render(target)
+      # 404 等错误响应不缓存，避免任意路径占满缓存
+      if response.status == 200:
+        self.cache.put(key, response)
+    return response
+
+  async def handle(self, reader, writer):
+    try:
+      while True:
+        try:
+          head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+          break
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+          method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+          writer.write(self.format_error(400, 'bad request line'))
+          break
+        headers = {}
+        for line in lines[1:]:
+          if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+        if method not in ('GET', 'HEAD'):
+          writer.write(self.format_error(405, f'method not allowed: {method}', keep_alive))
+        else:
+          response = self.get_response(target)
+          writer.write(self.format_response(response, headers, method == 'HEAD', keep_alive))
+        await writer.drain()
+        if not keep_alive:
+          break
+    finally:
+      writer.close()
+
+  def format_response(self, response, headers, head_only=False, keep_alive=True):
+    lines = [
+      f'ETag: {response.etag}',
+      f'Cache-Control: public, max-age={self.max_age}',
+      'Vary: Accept-Encoding',
+      f'Connection: {"keep-alive" if keep_alive else "close"}',
+    ]
+    if response.status == 200 and match_etag(headers.get('if-none-match', ''), response.etag):
+      return self.format_head(304, lines + ['Content-Length: 0'])
+    encoding = response.choose_encoding(headers.get('accept-encoding', ''))
+    body = response.bodies[encoding]
+    lines += ['Content-Type: application/json; charset=utf-8', f'Content-Length: {len(body)}']
+    if encoding != 'identity':
+      lines.append(f'Content-Encoding: {encoding}')
+    return self.format_head(response.status, lines) + (b'' if head_only else body)
+
+  def format_head(self, status, lines):
+    return '\r\n'.join([f'HTTP/1.1 {status} {STATUS_TEXT[status]}'] + lines + ['', '']).encode('latin-1')
+
+  def format_error(self, status, message, keep_alive=False):
+    body = dump_body({'error': message})
+    lines = ['Content-Type: application/json; charset=utf-8', f'Content-Length: {len(body)}',
+             f'Connection: {"keep-alive" if keep_alive else "close"}']
+    return self.format_head(status, lines) + body
+
+async def serve(host='127.0.0.1', port=8000, cache_bytes=MAX_CACHE_BYTES):
+  server = Server(DatasetApi(), ResponseCache(cache_bytes))
+  listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES)
+  print(f'Serving on http://{host}:{port} (brotli: {"on" if brotli else "off"})')
+  async with listener:
+    await listener.serve_forever()
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='只读的数据集 HTTP 查询服务')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8000)
+  parser.add_argument('--cache-size', type=int, default=MAX_CACHE_BYTES // (1024 * 1024), help='响应缓存容量上限（MB）')
+  args = parser.parse_args()
+  try:
+    asyncio.run(serve(args.host, args.port, args.cache_size * 1024 * 1024))
+  except KeyboardInterrupt:
+    pass
@@ -0,0 +1,62 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# 多个 numpy 数组与一段 JSON 元数据存成一个文件：magic | 版本 | 头长度 | 头 JSON | 按 8 字节对齐的数组
+# 读取时整个文件 mmap，数组直接由 np.frombuffer 映射，不做拷贝
+MAGIC = b'PKAR'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+ALIGN = 8
+
+def write_arrays(path, meta, arrays):
+  os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+  layout = {}
+  offset = 0
+  blobs = []
+  for name, values in arrays.items():
+    values = np.ascontiguousarray(values)
+    layout[name] = [values.dtype.str, list(values.shape), offset]
+    blob = values.tobytes()
+    padding = -len(blob) % ALIGN
+    blobs.append(blob + b'\0' * padding)
+    offset += len(blob) + padding
+  header = json.dumps({'meta': meta, 'arrays': layout}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+  header += b' ' * (-(HEADER.size + len(header)) % ALIGN)
+
+  tmp_path = f'{path}.tmp'
+  with open(tmp_path, 'wb') as f:
+    f.write(HEADER.pack(MAGIC, VERSION, len(header)))
+    f.write(header)
+    for blob in blobs:
+      f.write(blob)
+  os.replace(tmp_path, path)
+
+# 文件存在且元数据中的 source 与给出的一致时为最新，用于 load 判断是否需要重新构建
+def is_current(path, source):
+  if not os.path.exists(path):
+    return False
+  with open(path, 'rb') as f:
+    magic, version, header_length = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+      return False
+    header = json.loads(f.read(header_length))
+  return header['meta'].get('source') == source
+
+def read_arrays(path):
+  with open(path, 'rb') as f:
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  magic, version, header_length = HEADER.unpack_from(buffer, 0)
+  if magic != MAGIC or version != VERSION:
+    raise ValueError(f'{path} is not an array pack of version {VERSION}')
+  header = json.loads(buffer[HEADER.size:HEADER.size + header_length])
+  start = HEADER.size + header_length
+  arrays = {}
+  for name, (dtype, shape, offset) in header['arrays'].items():
+    count = int(np.prod(shape)) if shape else 1
+    values = np.frombuffer(buffer, dtype=np.dtype(dtype), count=count, offset=start + offset)
+    arrays[name] = values.reshape(shape)
+  return header['meta'], arrays
@@ -0,0 +1,333 @@
+import argparse
+import os
+import time
+import unicodedata
+
+import numpy as np
+
+try:
+  from pypinyin import lazy_pinyin
+except ImportError:
+  lazy_pinyin = None
+
+from array_pack import is_current, read_arrays, write_arrays
+from fulltext import encode_strings
+from pokemon_dataset import BUILD_PATH, PATH, get_source, iter_json_dir, load_json
+
+INDEX_PATH = os.path.join(BUILD_PATH, 'autocomplete.bin')
+KINDS = ['pokemon', 'moves', 'abilities', 'items']
+# 构建索引所用的数据
+SOURCES = ['pokemon', 'move_list.json', 'ability_list.json', 'item_list.json']
+
+# 各类名称的权重：中文名最高，其次日文、英文名，其他语言和转写依次降低
+WEIGHTS = {
+  'zh': 10,
+  'primary': 9,
+  'name': 8,
+  'romanized': 7,
+  'pinyin': 7,
+  'romaji': 6,
+  'initials': 5,
+}
+EXACT_BONUS = 3
+LENGTH_PENALTY = 0.05
+FUZZY_PENALTY = 4
+HEAD_BYTES = 8
+# 短于该长度的名称和查询不做容错匹配
+MIN_FUZZY_LENGTH = 4
+
+KANA = {
+  'あ': 'a', 'い': 'i', 'う': 'u', 'え': 'e', 'お': 'o',
+  'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o', 'ゔ': 'vu', 'ん': 'n',
+  'や': 'ya', 'ゆ': 'yu', 'よ': 'yo', 'ゃ': 'ya', 'ゅ': 'yu', 'ょ': 'yo', 'わ': 'wa', 'を': 'o', 'ゎ': 'wa',
+}
+for row, consonant in [('かきくけこ', 'k'), ('がぎぐげご', 'g'), ('さしすせそ', 's'), ('ざじずぜぞ', 'z'),
+                       ('たちつてと', 't'), ('だぢづでど', 'd'), ('なにぬねの', 'n'), ('はひふへほ', 'h'),
+                       ('ばびぶべぼ', 'b'), ('ぱぴぷぺぽ', 'p'), ('まみむめも', 'm'), ('らりるれろ', 'r')]:
+  for kana, vowel in zip(row, 'aiueo'):
+    KANA[kana] = consonant + vowel
+KANA.update({'し': 'shi', 'じ': 'ji', 'ち': 'chi', 'ぢ': 'ji', 'つ': 'tsu', 'づ': 'zu', 'ふ': 'fu'})
+SMALL_Y = {'ゃ': 'a', 'ゅ': 'u', 'ょ': 'o'}
+SMALL_VOWELS = {'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o'}
+
+def to_hiragana(text):
+  return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text)
+
+# 平文式罗马字：拗音、促音和外来语的小写元音按前一个音节改写，长音符号省略
+def to_romaji(text):
+  result = ''
+  double = False
+  for c in to_hiragana(text):
+    if c == 'っ':
+      double = True
+      continue
+    if c in SMALL_Y and result.endswith('i') and len(result) > 1:
+      base = result[:-1]
+      result = base + (SMALL_Y[c] if base.endswith(('sh', 'ch', 'j')) else 'y' + SMALL_Y[c])
+      continue
+    if c in SMALL_VOWELS and result and result[-1] in 'aiueo' and len(result) > 1:
+      result = result[:-1] + SMALL_VOWELS[c]
+      continue
+    romaji = KANA.get(c)
+    if romaji is None:
+      continue
+    if double:
+      romaji = romaji[0] + romaji
+      double = False
+    result += romaji
+  return result
+
+def strip_accents(text):
+  return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c) or ord(c) >= 0x3000)
+
+# 全半角、大小写、片假名与平假名、拉丁字母的变音符号都归一，去掉空格和标点
+def normalize(text):
+  text = unicodedata.normalize('NFKC', text).lower()
+  text = unicodedata.normalize('NFC', strip_accents(text))
+  return ''.join(c for c in to_hiragana(text) if c.isalnum())
+
+def is_kana(text):
+  return bool(text) and all('ぁ' <= c <= 'ゟ' or c == 'ー' for c in to_hiragana(text))
+
+def has_han(text):
+  return any('一' <= c <= '鿿' for c in text)
+
+# 一个名称展开出的全部检索键：(键, 权重)
+# 日文、韩文名后以不换行空格附有官方罗马字，如 'リザードン\xa0Lizardon'
+def expand_name(name, source, pinyin=True):
+  keys = []
+  for i, part in enumerate(str(name).split('\xa0')):
+    key = normalize(part)
+    if not key:
+      continue
+    keys.append((key, WEIGHTS['romanized' if i > 0 else source]))
+    if is_kana(part):
+      keys.append((to_romaji(part), WEIGHTS['romaji']))
+    if pinyin and has_han(part):
+      syllables = lazy_pinyin(part)
+      keys.append((normalize(''.join(syllables)), WEIGHTS['pinyin']))
+      keys.append((normalize(''.join(s[0] for s in syllables if s)), WEIGHTS['initials']))
+  return [(key, weight) for key, weight in keys if key]
+
+def iter_items(nodes):
+  for node in nodes:
+    if node.get('type') == 'item':
+      yield node
+    yield from iter_items(node.get('children', []))
+
+# 返回 (类别, 编号, 显示名称, [(名称, 来源)])
+def iter_entries(data_path=PATH):
+  for key, record in iter_json_dir('pokemon', data_path):
+    names = [(record.get('name_zh'), 'zh'), (record.get('name_ja'), 'primary'), (record.get('name_en'), 'primary')]
+    others = record.get('names') or []
+    # 旧数据中 names 为 {语言: 名称}
+    if isinstance(others, dict):
+      others = [{'name': value} for value in others.values()]
+    names += [(entry['name'], 'name') for entry in others if entry.get('name')]
+    yield 'pokemon', record.get('pokedex_id') or key.split('-')[0], record.get('name_zh'), names
+  for kind, file_name in [('moves', 'move_list.json'), ('abilities', 'ability_list.json')]:
+    for record in load_json(os.path.join(data_path, file_name)):
+      names = [(record.get('name_zh'), 'zh'), (record.get('name_ja') or record.get('name_jp'), 'primary'),
+               (record.get('name_en'), 'primary')]
+      yield kind, record['id'], record['name_zh'], names
+  # 同一道具可能出现在多个分类下
+  seen = set()
+  for record in iter_items(load_json(os.path.join(data_path, 'item_list.json'))):
+    if record['name_zh'] in seen:
+      continue
+    seen.add(record['name_zh'])
+    names = [(record.get('name_zh'), 'zh'), (record.get('name_ja'), 'primary'), (record.get('name_en'), 'primary')]
+    yield 'items', record['name_zh'], record['name_zh'], names
+
+def get_deletions(key):
+  return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+# 键按 UTF-8 字节排序，每个键的倒排（条目、权重、键长）连续存放，前缀对应一段连续的倒排
+def encode_table(postings, prefix):
+  keys = sorted(postings, key=lambda key: key.encode('utf-8'))
+  offsets = [0]
+  entries = []
+  weights = []
+  lengths = []
+  for key in keys:
+    for entry_id, weight in sorted(postings[key].items()):
+      entries.append(entry_id)
+      weights.append(weight)
+      lengths.append(min(len(key), 255))
+    offsets.append(len(entries))
+  blob, key_offsets = encode_strings(keys)
+  return {
+    f'{prefix}.keys': blob,
+    f'{prefix}.key_offsets': key_offsets,
+    f'{prefix}.heads': np.array([get_head(key.encode('utf-8')) for key in keys], dtype=np.uint64),
+    f'{prefix}.offsets': np.array(offsets, dtype=np.uint32),
+    f'{prefix}.entries': np.array(entries, dtype=np.uint32),
+    f'{prefix}.weights': np.array(weights, dtype=np.float32),
+    f'{prefix}.lengths': np.array(lengths, dtype=np.uint8),
+  }
+
+def add_posting(postings, key, entry_id, weight):
+  entry_weights = postings.setdefault(key, {})
+  entry_weights[entry_id] = max(entry_weights.get(entry_id, 0), weight)
+
+# 拼音键是中文名补全的主要入口，没有 pypinyin 时默认报错，明确传入 pinyin=False 才建不含拼音的索引
+def build_index(data_path=PATH, index_path=INDEX_PATH, pinyin=True):
+  if pinyin and lazy_pinyin is None:
+    raise RuntimeError('pypinyin is required for pinyin keys: pip install pypinyin, or build with --no-pinyin')
+  entries = []
+  kinds = []
+  exact = {}
+  fuzzy = {}
+  for kind, entry_key, label, names in iter_entries(data_path):
+    entry_id = len(entries)
+    entries.append([kind, entry_key, label])
+    kinds.append(KINDS.index(kind))
+    for name, source in names:
+      if not name:
+        continue
+      for key, weight in expand_name(name, source, pinyin):
+        add_posting(exact, key, entry_id, weight)
+        # 容错表：每个键删去一个字符后的变体
+        if len(key) >= MIN_FUZZY_LENGTH:
+          for deletion in get_deletions(key):
+            add_posting(fuzzy, deletion, entry_id, weight)
+
+  arrays = {'kinds': np.array(kinds, dtype=np.uint8)}
+  arrays.update(encode_table(exact, 'exact'))
+  arrays.update(encode_table(fuzzy, 'fuzzy'))
+  write_arrays(index_path, {'source': get_source(data_path, SOURCES), 'entries': entries, 'pinyin': pinyin}, arrays)
+  return index_path
+
+# 键的前 8 个字节按大端序转为整数，整数的顺序与字节串顺序一致，前缀查找可以直接用 np.searchsorted
+def get_head(key, fill=b'\0'):
+  return int.from_bytes(key[:HEAD_BYTES].ljust(HEAD_BYTES, fill), 'big')
+
+class Table:
+  def __init__(self, arrays, prefix):
+    self.keys = arrays[f'{prefix}.keys']
+    self.key_offsets = arrays[f'{prefix}.key_offsets']
+    self.heads = arrays[f'{prefix}.heads']
+    self.offsets = arrays[f'{prefix}.offsets']
+    self.entries = arrays[f'{prefix}.entries']
+    self.weights = arrays[f'{prefix}.weights']
+    self.lengths = arrays[f'{prefix}.lengths']
+
+  def get_key(self, i):
+    return self.keys[self.key_offsets[i]:self.key_offsets[i + 1]].tobytes()
+
+  def lower_bound(self, target, lo, hi):
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self.get_key(mid) < target:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+  # 以各个 prefix 开头的键对应的倒排区间；UTF-8 中不会出现 0xff，用它填充即为上界
+  # 前缀超过 8 个字节时，再在前 8 个字节相同的一小段键中二分
+  def prefix_ranges(self, prefixes):
+    targets = [prefix.encode('utf-8') for prefix in prefixes]
+    lows = np.searchsorted(self.heads, np.array([get_head(target) for target in targets], dtype=np.uint64), 'left')
+    highs = np.searchsorted(self.heads, np.array([get_head(target, b'\xff') for target in targets], dtype=np.uint64),
+                            'right')
+    ranges = []
+    for target, lo, hi in zip(targets, lows.tolist(), highs.tolist()):
+      if len(target) > HEAD_BYTES and lo < hi:
+        lo = self.lower_bound(target, lo, hi)
+        hi = self.lower_bound(target + b'\xff', lo, hi)
+      if lo < hi:
+        ranges.append((int(self.offsets[lo]), int(self.offsets[hi])))
+    return ranges
+
+class AutocompleteIndex:
+  def __init__(self, index_path=INDEX_PATH):
+    self.meta, self.arrays = read_arrays(index_path)
+    self.entries = self.meta['entries']
+    self.kinds = self.arrays['kinds']
+    self.exact = Table(self.arrays, 'exact')
+    self.fuzzy = Table(self.arrays, 'fuzzy')
+
+  def score_ranges(self, table, ranges, length, penalty=0):
+    if len(ranges) == 1:
+      index = slice(*ranges[0])
+    else:
+      index = np.concatenate([np.arange(start, end) for start, end in ranges])
+    lengths = table.lengths[index].astype(np.float32)
+    scores = table.weights[index] - LENGTH_PENALTY * (lengths - length) - penalty
+    scores += EXACT_BONUS * (lengths == length)
+    return table.entries[index], scores
+
+  # 前缀匹配；结果不足 limit 时再用删除一个字符的变体做容错匹配（覆盖多打、漏打、打错一个字符和相邻字符颠倒）
+  def search(self, query, limit=10, kinds=None):
+    query = normalize(query)
+    if not query:
+      return []
+    parts = []
+    ranges = self.exact.prefix_ranges([query])
+    if ranges:
+      parts.append(self.score_ranges(self.exact, ranges, len(query)))
+    if len(query) >= MIN_FUZZY_LENGTH and sum(end - start for start, end in ranges) < limit:
+      variants = list(get_deletions(query))
+      for table, prefixes in [(self.exact, variants), (self.fuzzy, [query] + variants)]:
+        ranges = table.prefix_ranges(prefixes)
+        if ranges:
+          parts.append(self.score_ranges(table, ranges, len(query), FUZZY_PENALTY))
+    if not parts:
+      return []
+    entries = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    if kinds:
+      mask = np.isin(self.kinds[entries], [KINDS.index(kind) for kind in kinds])
+      entries, scores = entries[mask], scores[mask]
+    if entries.size == 0:
+      return []
+
+    # 同一条目只保留最高分
+    order = np.lexsort((-scores, entries))
+    entries, scores = entries[order], scores[order]
+    first = np.ones(entries.size, dtype=bool)
+    first[1:] = entries[1:] != entries[:-1]
+    entries, scores = entries[first], scores[first]
+    if entries.size > limit:
+      top = np.argpartition(-scores, limit)[:limit]
+      entries, scores = entries[top], scores[top]
+    order = np.lexsort((entries, -scores))
+
+    results = []
+    for i in order:
+      kind, key, label = self.entries[entries[i]]
+      results.append({'kind': kind, 'id': key, 'name': label, 'score': round(float(scores[i]), 2)})
+    return results
+
+# 索引不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(index_path=INDEX_PATH, data_path=PATH):
+  if not is_current(index_path, get_source(data_path, SOURCES)):
+    build_index(data_path, index_path)
+  return AutocompleteIndex(index_path)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='构建或查询多语言名称的前缀补全索引（含拼音、罗马字和容错匹配）')
+  parser.add_argument('command', choices=['build', 'search'])
+  parser.add_argument('query', nargs='?')
+  parser.add_argument('--limit', type=int, default=10)
+  parser.add_argument('--kind', action='append', choices=KINDS)
+  parser.add_argument('--index', default=INDEX_PATH)
+  parser.add_argument('--no-pinyin', action='store_true', help='不生成拼音键（无需安装 pypinyin）')
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    if lazy_pinyin is None and not args.no_pinyin:
+      parser.error('pypinyin is not installed: pip install pypinyin, or pass --no-pinyin to build without pinyin keys')
+    start = time.perf_counter()
+    build_index(index_path=args.index, pinyin=not args.no_pinyin)
+    print(f'{args.index}: {os.path.getsize(args.index) / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s'
+          + ('' if not args.no_pinyin else ' (no pinyin keys)'))
+  else:
+    index = load(args.index)
+    start = time.perf_counter()
+    results = index.search(args.query, args.limit, args.kind)
+    elapsed = time.perf_counter() - start
+    for result in results:
+      print(f'{result["score"]:6.2f} {result["kind"]}/{result["id"]} {result["name"]}')
+    print(f'{len(results)} results in {elapsed * 1000000:.0f} us')
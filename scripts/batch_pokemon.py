@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import DEFAULT_MAX_BYTES, ResponseCache
+from jsonl_writer import JsonlWriter
+from manifest import MANIFEST_PATH, load_manifest, rebuild_pokemon, save_manifest
+from pokemon import BASE_URL, DEFAULT_PARSER, PARSERS, PATH, fetch_page, parse_pokemon_data
+from profiling import Profiler, measure, print_report, summarize, write_folded, write_report
+from utils import save_to_file
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 令牌桶限速，rate 为每秒请求数，capacity 为允许的突发请求数
+class TokenBucket:
+  def __init__(self, rate, capacity=None):
+    self.rate = rate
+    self.capacity = capacity or max(1, rate)
+    self.tokens = self.capacity
+    self.updated = time.monotonic()
+    self.lock = threading.Lock()
+
+  def acquire(self):
+    if self.rate <= 0:
+      return
+    while True:
+      with self.lock:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+          self.tokens -= 1
+          return
+        wait = (1 - self.tokens) / self.rate
+      time.sleep(wait)
+
+def create_session(pool_size):
+  session = requests.Session()
+  adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+  session.mount('http://', adapter)
+  session.mount('https://', adapter)
+  return session
+
+def get_retry_after(response):
+  value = response.headers.get('Retry-After') if response is not None else None
+  return float(value) if value and value.isdigit() else None
+
+def fetch_with_retry(name, session, bucket, base_url=BASE_URL, retries=4, backoff=1.0, cache=None, profiler=None):
+  for attempt in range(retries + 1):
+    with measure(profiler, 'fetch.throttle', name):
+      bucket.acquire()
+    try:
+      with measure(profiler, 'fetch', name):
+        return fetch_page(name, session, base_url, cache)
+    except requests.HTTPError as e:
+      if e.response is None or e.response.status_code not in RETRY_STATUS or attempt == retries:
+        raise
+      delay = get_retry_after(e.response) or backoff * 2 ** attempt
+    except (requests.ConnectionError, requests.Timeout):
+      if attempt == retries:
+        raise
+      delay = backoff * 2 ** attempt
+    with measure(profiler, 'fetch.backoff', name):
+      time.sleep(delay + random.uniform(0, backoff))
+
+# 在解析进程中计时，记录随结果一起返回给主进程
+def profile_parse(html, pokemon, parser=DEFAULT_PARSER, memory=False):
+  profiler = Profiler(memory)
+  data = parse_pokemon_data(html, pokemon['name_zh'], pokemon['index'], pokemon['name_en'], pokemon['name_jp'],
+                            parser, profiler=profiler)
+  profiler.stop()
+  return data, profiler.records
+
+def select_pokemon(pokemon_list, args):
+  if args[0] == 'all':
+    return pokemon_list
+  if not args[0].isdigit():
+    name = args[0]
+    return [p for p in pokemon_list if name in (p['name_zh'], p['name_en'], p['name_jp'])]
+  start_id = int(args[0])
+  end_id = int(args[1]) if len(args) > 1 else start_id
+  return [p for p in pokemon_list if start_id <= int(p['index']) <= end_id]
+
+def get_key(pokemon):
+  return f'{pokemon["index"]}-{pokemon["name_zh"]}'
+
+def get_output_path(output_dir, pokemon):
+  return f'{output_dir}/{get_key(pokemon)}.json'
+
+# 抓取线程池与解析进程池并行：页面下载完成后立即交给解析进程，同时继续下载后续页面
+# 增量模式（manifest）由 rebuild_pokemon 直接改写输出文件，不经过 on_result
+def run_batch(target_list, output_dir=f'{PATH}/pokemon', base_url=BASE_URL, concurrency=4, rate=2.0,
+              workers=None, parser=DEFAULT_PARSER, retries=4, backoff=1.0, on_result=None, cache=None, manifest=None,
+              profiler=None):
+  if manifest is not None and on_result is not None:
+    raise ValueError('on_result cannot be used with manifest: incremental builds write the output files directly')
+  session = create_session(concurrency)
+  bucket = TokenBucket(rate, capacity=concurrency)
+  summary = {'saved': 0, 'skipped': 0, 'unchanged': 0, 'failed': []}
+  save = on_result or (lambda pokemon, data: save_to_file(get_output_path(output_dir, pokemon), data))
+
+  with ThreadPoolExecutor(max_workers=concurrency) as fetch_pool, ProcessPoolExecutor(max_workers=workers) as parse_pool:
+    fetch_futures = {
+      fetch_pool.submit(fetch_with_retry, p['name_zh'], session, bucket, base_url, retries, backoff, cache, profiler): p
+      for p in target_list
+    }
+    parse_futures = {}
+    for future in as_completed(fetch_futures):
+      pokemon = fetch_futures[future]
+      try:
+        html = future.result()
+      except Exception as e:
+        print(f'[Error] Failed to fetch {pokemon["name_zh"]}: {e}')
+        summary['failed'].append(pokemon['name_zh'])
+        continue
+      if manifest is not None:
+        parse_future = parse_pool.submit(rebuild_pokemon, html, pokemon, get_output_path(output_dir, pokemon),
+                                         manifest.get(get_key(pokemon)), parser)
+      elif profiler is not None:
+        parse_future = parse_pool.submit(profile_parse, html, pokemon, parser, profiler.memory)
+      else:
+        parse_future = parse_pool.submit(parse_pokemon_data, html, pokemon['name_zh'], pokemon['index'],
+                                         pokemon['name_en'], pokemon['name_jp'], parser)
+      parse_futures[parse_future] = pokemon
+
+    for future in as_completed(parse_futures):
+      pokemon = parse_futures[future]
+      try:
+        if manifest is not None:
+          entry, status = future.result()
+          manifest[get_key(pokemon)] = entry
+          summary['saved' if status == 'written' else status] += 1
+          print(f'[{status.capitalize()}] {pokemon["name_zh"]} ({pokemon["index"]})')
+          continue
+        data = future.result()
+        if profiler is not None:
+          data, records = data
+          profiler.extend(records)
+        save(pokemon, data)
+        summary['saved'] += 1
+        print(f'[Done] {pokemon["name_zh"]} ({pokemon["index"]})')
+      except Exception as e:
+        print(f'[Error] Failed to parse {pokemon["name_zh"]}: {e}')
+        summary['failed'].append(pokemon['name_zh'])
+
+  session.close()
+  return summary
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='并发抓取并解析宝可梦页面')
+  parser.add_argument('target', nargs='+', help='<start_id> [end_id] | <pokemon_name> | all')
+  parser.add_argument('--output', default=f'{PATH}/pokemon')
+  parser.add_argument('--base-url', default=BASE_URL, help='可指向本地服务器以离线测试')
+  parser.add_argument('--concurrency', type=int, default=4, help='同时进行的请求数')
+  parser.add_argument('--rate', type=float, default=2.0, help='每秒最多请求数，0 表示不限速')
+  parser.add_argument('--workers', type=int, default=None, help='解析进程数，默认为 CPU 核数')
+  parser.add_argument('--parser', choices=PARSERS, default=DEFAULT_PARSER)
+  parser.add_argument('--retries', type=int, default=4)
+  parser.add_argument('--backoff', type=float, default=1.0, help='指数退避的初始等待秒数')
+  parser.add_argument('--force', action='store_true', help='覆盖已存在的文件')
+  parser.add_argument('--cache-dir', default=f'{PATH}/raw/cache', help='页面缓存目录')
+  parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help='缓存容量上限（MB）')
+  parser.add_argument('--no-cache', action='store_true')
+  parser.add_argument('--offline', action='store_true', help='只使用本地缓存，不访问网络')
+  parser.add_argument('--incremental', action='store_true', help='根据 manifest 只重新提取页面或提取函数有变化的宝可梦')
+  parser.add_argument('--manifest', default=MANIFEST_PATH)
+  parser.add_argument('--jsonl', help='把结果逐条写入 gzip 压缩的 JSONL 文件，重新运行时从上次完成处继续')
+  parser.add_argument('--no-files', action='store_true', help='配合 --jsonl 使用，不再单独写每只宝可梦的 JSON 文件')
+  parser.add_argument('--profile', metavar='PATH', help='记录网络请求和各提取函数的耗时，写入 JSON 报告和同名 .folded 火焰图文件'
+                                                       '（--incremental 时只记录网络请求）')
+  parser.add_argument('--profile-memory', action='store_true', help='配合 --profile 使用，用 tracemalloc 记录内存峰值（较慢）')
+  args = parser.parse_args()
+  # 增量模式需要比对已有的 JSON 文件，不能把结果只写入 JSONL
+  if args.incremental and args.jsonl:
+    parser.error('--incremental cannot be combined with --jsonl')
+  if args.no_files and not args.jsonl:
+    parser.error('--no-files requires --jsonl')
+  cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_size * 1024 * 1024, args.offline)
+
+  with open(f'{PATH}/simple_pokedex.json', 'r', encoding='utf-8') as f:
+    pokemon_list = json.load(f)
+  target_list = select_pokemon(pokemon_list, args.target)
+  manifest = load_manifest(args.manifest) if args.incremental else None
+  writer = JsonlWriter(args.jsonl, output_dir=None if args.no_files else args.output) if args.jsonl else None
+  if writer:
+    target_list = [p for p in target_list if get_key(p) not in writer.done]
+  elif not args.force and not args.incremental:
+    target_list = [p for p in target_list if not os.path.exists(get_output_path(args.output, p))]
+  os.makedirs(args.output, exist_ok=True)
+  print(f'Found {len(target_list)} Pokemon to process.')
+
+  profiler = Profiler(args.profile_memory) if args.profile else None
+  summary = run_batch(target_list, args.output, args.base_url, args.concurrency, 0 if args.offline else args.rate,
+                      args.workers, args.parser, args.retries, args.backoff, cache=cache, manifest=manifest,
+                      on_result=(lambda pokemon, data: writer.write(data)) if writer else None, profiler=profiler)
+  if profiler:
+    write_report(profiler.records, args.profile)
+    write_folded(profiler.records, f'{os.path.splitext(args.profile)[0]}.folded')
+    print_report(summarize(profiler.records))
+  if writer:
+    writer.close()
+  if cache:
+    cache.flush()
+  if manifest is not None:
+    save_manifest(manifest, args.manifest)
+    print(f'skipped: {summary["skipped"]}, unchanged: {summary["unchanged"]}')
+  print(f'Batch processing complete. saved: {summary["saved"]}, failed: {len(summary["failed"])}')
+  if summary['failed']:
+    print('Failed: ' + ', '.join(summary['failed']))
@@ -0,0 +1,249 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import legacy_pokemon
+from pokemon import DEFAULT_PARSER, PARSERS, PATH, fetch_page, parse_pokemon_data
+from profiling import Profiler, percentile
+from species_page import SYNTHETIC_CORPUS_PATH, write_corpus
+
+# 离线基准测试的页面，覆盖 pokemon.py 末尾注释中列出的特殊情况
+CORPUS = ['皮卡丘', '呆呆兽', '小拳石', '九尾', '无畏小子', '宝宝丁', '阿尔宙斯', '霜奶仙', '多边兽2型', '太乐巴戈斯']
+CORPUS_PATH = f'{PATH}/raw/corpus'
+FULL_CORPUS_PATH = f'{SYNTHETIC_CORPUS_PATH}-all'
+# 比基线慢（或内存多）超过该比例视为退化
+THRESHOLD = 0.2
+# 低于该耗时的阶段只看绝对差值，避免计时噪声误报
+MIN_STAGE_TIME = 0.002
+
+def best_of(fn, repeat):
+  timings = []
+  for i in range(repeat):
+    start = time.perf_counter()
+    fn()
+    timings.append(time.perf_counter() - start)
+  return min(timings)
+
+def bench_parse(html, repeat, parser=DEFAULT_PARSER):
+  return best_of(lambda: BeautifulSoup(html, parser), repeat)
+
+def extract_page(html, pokemon, parser, profiler=None):
+  return parse_pokemon_data(html, pokemon['name_zh'], pokemon['index'], pokemon['name_en'], pokemon['name_jp'],
+                            parser, profiler=profiler)
+
+def legacy_extract_page(html, pokemon, parser):
+  return legacy_pokemon.get_pokemon_data(html, pokemon['name_zh'], pokemon['index'], pokemon['name_en'],
+                                         pokemon['name_jp'], parser)
+
+# 端到端对比：改造前原样保留的提取函数与当前的 parse_pokemon_data，两者都包含 BeautifulSoup 解析
+def bench_extract(html, pokemon, repeat, parser=DEFAULT_PARSER):
+  before = best_of(lambda: legacy_extract_page(html, pokemon, parser), repeat)
+  after = best_of(lambda: extract_page(html, pokemon, parser), repeat)
+  return before, after
+
+# 各解析器提取出的 JSON 必须完全一致，返回与第一个解析器结果不同的解析器
+def compare_parsers(html, name, parsers):
+  outputs = {}
+  for parser in parsers:
+    data = parse_pokemon_data(html, name, '0000', '', '', parser)
+    outputs[parser] = json.dumps(data, ensure_ascii=False, sort_keys=True)
+  expected = outputs[parsers[0]]
+  return [parser for parser in parsers[1:] if outputs[parser] != expected]
+
+def load_pokedex():
+  with open(f'{PATH}/simple_pokedex.json', 'r', encoding='utf-8') as f:
+    return {pokemon['name_zh']: pokemon for pokemon in json.load(f)}
+
+def get_pokemon_info(name, pokedex=None):
+  pokedex = load_pokedex() if pokedex is None else pokedex
+  return pokedex.get(name, {'index': '0000', 'name_zh': name, 'name_en': '', 'name_jp': ''})
+
+# 逐页计时解析、改造前与改造后的提取，汇总总耗时；改造前的函数在某页出错时记入 errors，该页不计入总数
+def compare_extract(pages, repeat=1, parser=DEFAULT_PARSER):
+  pokedex = load_pokedex()
+  results = {'parser': parser, 'pages': {}, 'errors': {}}
+  for name, html in pages.items():
+    pokemon = get_pokemon_info(name, pokedex)
+    try:
+      before, after = bench_extract(html, pokemon, repeat, parser)
+    except Exception as e:
+      results['errors'][name] = f'{type(e).__name__}: {e}'
+      continue
+    results['pages'][name] = {'parse': bench_parse(html, repeat, parser), 'before': before, 'after': after}
+  for key in ['parse', 'before', 'after']:
+    results[key] = sum(page[key] for page in results['pages'].values())
+  return results
+
+# 联网一次把页面保存到语料目录，之后的基准测试完全离线
+def save_corpus(names=CORPUS, corpus_path=CORPUS_PATH, cache=None):
+  os.makedirs(corpus_path, exist_ok=True)
+  for name in names:
+    html = fetch_page(name, cache=cache)
+    with open(os.path.join(corpus_path, f'{name}.html'), 'w', encoding='utf-8') as f:
+      f.write(html)
+
+def load_corpus(corpus_path=CORPUS_PATH):
+  pages = {}
+  for path in sorted(glob.glob(os.path.join(corpus_path, '*.html'))):
+    with open(path, 'r', encoding='utf-8') as f:
+      pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+  return pages
+
+# 对语料中每个页面：重复 repeat 次取最快一次的总耗时，各阶段取中位数，另跑一次 tracemalloc 记录内存峰值
+def run_suite(pages, repeat=5, parser=DEFAULT_PARSER):
+  results = {'parser': parser, 'pages': {}, 'stages': {}, 'errors': {}}
+  stage_times = {}
+  for name, html in pages.items():
+    pokemon = get_pokemon_info(name)
+    profiler = Profiler()
+    totals = []
+    try:
+      for i in range(repeat):
+        start = time.perf_counter()
+        extract_page(html, pokemon, parser, profiler)
+        totals.append(time.perf_counter() - start)
+    except Exception as e:
+      results['errors'][name] = f'{type(e).__name__}: {e}'
+      continue
+    stages = {}
+    for stage, key, wall, *rest in profiler.records:
+      stages.setdefault(stage, []).append(wall)
+    for stage, walls in stages.items():
+      stage_times.setdefault(stage, []).append(percentile(walls, 50))
+
+    tracemalloc.start()
+    extract_page(html, pokemon, parser)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results['pages'][name] = {
+      'time': min(totals),
+      'peak': peak,
+      'stages': {stage: percentile(walls, 50) for stage, walls in stages.items()},
+    }
+
+  total = sum(page['time'] for page in results['pages'].values())
+  results['throughput'] = len(pages) / total if total else 0
+  results['peak'] = max((page['peak'] for page in results['pages'].values()), default=0)
+  results['stages'] = {stage: sum(times) for stage, times in stage_times.items()}
+  return results
+
+# 与基线比较，返回退化项的说明
+def find_regressions(results, baseline, threshold=THRESHOLD):
+  regressions = []
+  if results['throughput'] < baseline['throughput'] * (1 - threshold):
+    regressions.append(f'throughput {baseline["throughput"]:.2f} -> {results["throughput"]:.2f} pages/s')
+  if results['peak'] > baseline['peak'] * (1 + threshold):
+    regressions.append(f'peak memory {baseline["peak"] / 1e6:.1f} -> {results["peak"] / 1e6:.1f} MB')
+  for stage, before in baseline['stages'].items():
+    after = results['stages'].get(stage)
+    if after is None or max(before, after) < MIN_STAGE_TIME:
+      continue
+    if after > before * (1 + threshold) and after - before > MIN_STAGE_TIME:
+      regressions.append(f'{stage} {before * 1000:.1f} -> {after * 1000:.1f} ms')
+  return regressions
+
+def print_suite(results):
+  print(f'[{results["parser"]}] {len(results["pages"])} pages, {results["throughput"]:.2f} pages/s, '
+        f'peak {results["peak"] / 1e6:.1f} MB')
+  for name, page in results['pages'].items():
+    print(f'  {name:<10} {page["time"] * 1000:8.1f} ms  peak {page["peak"] / 1e6:6.1f} MB')
+  for stage, total in sorted(results['stages'].items(), key=lambda item: -item[1]):
+    print(f'  {stage:<24} {total * 1000:8.1f} ms')
+
+# 没有下载过语料时用数据集生成结构相同的页面，离线也能运行；与基线比较时两边须使用同一种语料
+def get_corpus(args):
+  if args.save_corpus:
+    save_corpus(corpus_path=args.corpus)
+  pages = {} if args.synthetic else load_corpus(args.corpus)
+  if not pages:
+    print(f'no pages in {args.corpus}, using pages rendered from data/pokemon ({SYNTHETIC_CORPUS_PATH})')
+    write_corpus(CORPUS, SYNTHETIC_CORPUS_PATH)
+    pages = load_corpus(SYNTHETIC_CORPUS_PATH)
+  return pages
+
+# 为数据集中的每一只宝可梦生成页面，用于全量的端到端对比
+def get_full_corpus(corpus_path=FULL_CORPUS_PATH):
+  write_corpus(list(load_pokedex()), corpus_path)
+  return load_corpus(corpus_path)
+
+def main_suite(args):
+  pages = get_corpus(args)
+  results = run_suite(pages, args.repeat, (args.parser or [DEFAULT_PARSER])[0])
+  print_suite(results)
+  for name, error in results['errors'].items():
+    print(f'  error: {name}: {error}')
+  if results['errors']:
+    return 1
+  if args.save_baseline:
+    with open(args.save_baseline, 'w', encoding='utf-8') as f:
+      json.dump(results, f, ensure_ascii=False, indent=2)
+  if args.baseline:
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+      regressions = find_regressions(results, json.load(f), args.threshold)
+    for regression in regressions:
+      print(f'  regression: {regression}')
+    if regressions:
+      return 1
+    print(f'  no regressions over {args.threshold:.0%} against {args.baseline}')
+  return 0
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('pages', nargs='*', help='宝可梦页面，文件名须为宝可梦名；默认使用语料目录中的全部页面')
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--all', action='store_true', help='为数据集中的全部宝可梦生成页面并对比')
+  parser.add_argument('--parser', action='append', choices=PARSERS, help='可重复指定，默认 html.parser')
+  parser.add_argument('--compare', action='store_true', help='检查各解析器的提取结果是否一致')
+  parser.add_argument('--suite', action='store_true', help='对语料目录中的全部页面运行离线基准测试')
+  parser.add_argument('--corpus', default=CORPUS_PATH)
+  parser.add_argument('--save-corpus', action='store_true', help='先联网下载语料页面')
+  parser.add_argument('--synthetic', action='store_true', help='使用根据数据集生成的页面，而不是下载的语料')
+  parser.add_argument('--baseline', help='与该基线 JSON 比较，超过 --threshold 时以非零状态退出')
+  parser.add_argument('--save-baseline', metavar='PATH', help='把本次结果保存为基线')
+  parser.add_argument('--threshold', type=float, default=THRESHOLD)
+  args = parser.parse_args()
+  parsers = args.parser or [DEFAULT_PARSER]
+  if args.suite:
+    sys.exit(main_suite(args))
+
+  if args.pages:
+    pages = {}
+    for path in args.pages:
+      with open(path, 'r', encoding='utf-8') as f:
+        pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+  elif args.all:
+    pages = get_full_corpus()
+  else:
+    pages = get_corpus(args)
+
+  failed = False
+  for name in parsers:
+    results = compare_extract(pages, args.repeat, name)
+    if not args.all:
+      for page_name, page in results['pages'].items():
+        print(f'[{name}] {page_name:<10} parse: {page["parse"] * 1000:8.1f} ms  before: {page["before"] * 1000:8.1f} ms  '
+              f'after: {page["after"] * 1000:8.1f} ms  speedup: {page["before"] / page["after"]:.2f}x')
+    for page_name, error in results['errors'].items():
+      print(f'[{name}] {page_name}: legacy extraction failed: {error}')
+    if results['after']:
+      print(f'[{name}] {len(results["pages"])} pages  before: {results["before"]:.2f} s  after: {results["after"]:.2f} s  '
+            f'speedup: {results["before"] / results["after"]:.2f}x  '
+            f'parse: {results["parse"]:.2f} s ({results["parse"] / results["after"]:.0%} of after)')
+
+  if args.compare and len(parsers) > 1:
+    for page_name, html in pages.items():
+      mismatched = compare_parsers(html, page_name, parsers)
+      if mismatched:
+        failed = True
+        print(f'{page_name}: output differs from {parsers[0]}: {", ".join(mismatched)}')
+    if not failed:
+      print(f'output identical across {", ".join(parsers)}')
+
+  if failed:
+    sys.exit(1)
@@ -0,0 +1,195 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import pokemon_dataset
+from pokemon_dataset import PATH, TYPE_INDEX, load_json, match_form_stats, parse_number
+from type_chart import ABILITY_INDEX, NO_TYPE, defense_multipliers, find_ability
+
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+STAT_INDEX = {name: i for i, name in enumerate(STATS)}
+PHYSICAL = 0
+SPECIAL = 1
+STATUS = -1
+CATEGORIES = {'物理': PHYSICAL, '特殊': SPECIAL}
+
+# 25 种性格，按 (提升的能力, 降低的能力) 排列；提升和降低同一项的性格没有效果
+NATURE_ORDER = ['attack', 'defense', 'speed', 'sp_attack', 'sp_defense']
+NATURE_NAMES = [
+  '勤奋', '怕寂寞', '勇敢', '固执', '顽皮',
+  '大胆', '坦率', '悠闲', '淘气', '乐天',
+  '胆小', '急躁', '认真', '爽朗', '天真',
+  '内敛', '慢吞吞', '冷静', '害羞', '马虎',
+  '温和', '温顺', '自大', '慎重', '浮躁',
+]
+
+def build_nature_table():
+  table = {}
+  for i, name in enumerate(NATURE_NAMES):
+    factors = np.ones(len(STATS), dtype=np.float64)
+    up, down = NATURE_ORDER[i // 5], NATURE_ORDER[i % 5]
+    if up != down:
+      factors[STAT_INDEX[up]] = 1.1
+      factors[STAT_INDEX[down]] = 0.9
+    table[name] = factors
+  return table
+
+NATURES = build_nature_table()
+DEFAULT_SET = {'level': 50, 'evs': 0, 'ivs': 31, 'nature': '认真'}
+# 伤害的随机数为 85% ~ 100%
+RANDOM_MIN = 85
+RANDOM_MAX = 100
+STAB = 6144
+
+def get_stat_vector(values, default):
+  if isinstance(values, dict):
+    return [values.get(name, default) for name in STATS]
+  if isinstance(values, (list, tuple)):
+    return list(values)
+  return [values] * len(STATS)
+
+# 第三世代起的能力值公式，base/ivs/evs 为 (N, 6)，levels 为 (N,)，natures 为 (N, 6)
+def calc_stats(base, ivs, evs, levels, natures):
+  levels = levels[:, None]
+  raw = (2 * base + ivs + evs // 4) * levels // 100
+  stats = np.floor((raw + 5) * natures).astype(np.int32)
+  stats[:, 0] = raw[:, 0] + levels[:, 0] + 10
+  return stats
+
+class MoveTable:
+  def __init__(self, data_path=PATH):
+    moves = load_json(os.path.join(data_path, 'move_list.json'))
+    self.names = [move['name_zh'] for move in moves]
+    self.index = {}
+    for i, move in enumerate(moves):
+      for field in ['name_zh', 'name_en', 'name_jp']:
+        if move.get(field):
+          self.index.setdefault(move[field], i)
+    # 威力为 '—'、'变化' 等非数字的招式不计算伤害
+    self.power = np.array([parse_number(move['power'], 0) for move in moves], dtype=np.int32)
+    self.types = np.array([TYPE_INDEX.get(move['type'], NO_TYPE) for move in moves], dtype=np.int32)
+    self.categories = np.array([CATEGORIES.get(move['category'], STATUS) for move in moves], dtype=np.int32)
+
+  def get_ids(self, names):
+    return np.array([self.index[name] for name in names], dtype=np.int32)
+
+# 把配置（宝可梦、形态、等级、努力值、个体值、性格、特性）整理成数组
+class Sets:
+  def __init__(self, sets, dataset):
+    base, ivs, evs, levels, natures, types, abilities = [], [], [], [], [], [], []
+    self.labels = []
+    for spec in sets:
+      spec = {**DEFAULT_SET, **spec}
+      record = dataset.pokemon(spec['pokemon'])
+      forms = record['forms']
+      names = [form['name'] for form in forms]
+      index = names.index(spec['form']) if spec.get('form') else 0
+      stats = spec.get('stats') or match_form_stats(record)[index]
+      base.append([int(parse_number(str(value), 0)) for value in get_stat_vector(stats, 0)])
+      ivs.append(get_stat_vector(spec['ivs'], 31))
+      evs.append(get_stat_vector(spec['evs'], 0))
+      levels.append(spec['level'])
+      natures.append(NATURES[spec['nature']])
+      type_names = spec.get('types') or forms[index]['types']
+      type_ids = [TYPE_INDEX[name] for name in type_names[:2]]
+      types.append(type_ids + [NO_TYPE] * (2 - len(type_ids)))
+      abilities.append(ABILITY_INDEX[find_ability(spec.get('ability'))])
+      self.labels.append(names[index])
+    self.levels = np.array(levels, dtype=np.int32)
+    self.stats = calc_stats(np.array(base, dtype=np.int32), np.array(ivs, dtype=np.int32),
+                            np.array(evs, dtype=np.int32), self.levels, np.array(natures))
+    self.types = np.array(types, dtype=np.int32)
+    self.abilities = np.array(abilities, dtype=np.int32)
+
+  def __len__(self):
+    return len(self.labels)
+
+# 四舍五入，但 .5 舍去，与游戏中 4096 为单位的修正值取整方式一致
+def apply_modifier(value, modifier):
+  return np.ceil(value * modifier / 4096 - 0.5).astype(np.int32)
+
+# 一次计算 攻击方 x 招式 x 防守方 的伤害范围，返回 (最小值, 最大值)，形状均为 (攻击方, 招式, 防守方)
+# 只计入等级、能力值、威力、随机数、本系加成、属性相性（含 type_chart 中改变相性的特性）和会心一击，
+# 不计天气、道具、能力变化和其他特性
+def damage_ranges(attackers, move_ids, defenders, moves, critical=False):
+  power = moves.power[move_ids]
+  move_types = moves.types[move_ids]
+  categories = moves.categories[move_ids]
+  physical = categories == PHYSICAL
+
+  # (攻击方, 招式)：物理招式用攻击，特殊招式用特攻
+  attack = np.where(physical[None, :], attackers.stats[:, 1, None], attackers.stats[:, 3, None])
+  # (招式, 防守方)
+  defense = np.where(physical[:, None], defenders.stats[None, :, 2], defenders.stats[None, :, 4])
+  level_factor = (2 * attackers.levels) // 5 + 2
+
+  damage = (level_factor[:, None, None] * power[None, :, None] * attack[:, :, None]) // defense[None, :, :]
+  damage = damage // 50 + 2
+  # 会心一击为 1.5 倍并舍去小数，不走 4096 为单位的修正值取整
+  if critical:
+    damage = damage * 3 // 2
+
+  stab = (attackers.types[:, None, :] == move_types[None, :, None]).any(axis=2)
+  stab_modifier = np.where(stab, STAB, 4096)[:, :, None]
+  # (招式, 防守方) 的属性相性倍率
+  effectiveness = defense_multipliers(defenders.types[:, 0], defenders.types[:, 1], defenders.abilities)
+  effectiveness = effectiveness[:, np.maximum(move_types, 0)].T
+
+  ranges = []
+  for roll in [RANDOM_MIN, RANDOM_MAX]:
+    value = damage * roll // 100
+    value = apply_modifier(value, stab_modifier)
+    value = np.floor(value * effectiveness[None, :, :]).astype(np.int32)
+    # 有效的攻击招式至少造成 1 点伤害
+    value = np.where(effectiveness[None, :, :] > 0, np.maximum(value, 1), 0)
+    ranges.append(np.where(((power > 0) & (categories != STATUS) & (move_types >= 0))[None, :, None], value, 0))
+  return ranges[0], ranges[1]
+
+def main_bench(moves, dataset, attackers, move_count, defenders):
+  names = dataset.index['pokemon']['keys']
+  rng = np.random.default_rng(0)
+  natures = list(NATURES)
+  def random_sets(count):
+    return Sets([{'pokemon': names[i], 'nature': natures[rng.integers(len(natures))],
+                  'evs': {'attack': 252, 'sp_attack': 252}} for i in rng.integers(len(names), size=count)], dataset)
+  attacker_sets = random_sets(attackers)
+  defender_sets = random_sets(defenders)
+  move_ids = rng.choice(np.flatnonzero(moves.power > 0), size=move_count, replace=False)
+  start = time.perf_counter()
+  low, high = damage_ranges(attacker_sets, move_ids, defender_sets, moves)
+  elapsed = time.perf_counter() - start
+  combos = low.size
+  print(f'{combos} combinations in {elapsed * 1000:.1f} ms ({combos / elapsed / 1e6:.1f}M/s)')
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='批量计算 攻击方 x 招式 x 防守方 的伤害范围')
+  parser.add_argument('attacker', nargs='?', help='攻击方宝可梦')
+  parser.add_argument('--form', help='攻击方形态')
+  parser.add_argument('--level', type=int, default=50)
+  parser.add_argument('--nature', default='认真', choices=NATURE_NAMES)
+  parser.add_argument('--evs', default='0', help='努力值，如 252 或 hp=4,attack=252,speed=252')
+  parser.add_argument('--moves', nargs='+', default=[])
+  parser.add_argument('--defenders', nargs='+', default=[], help='防守方宝可梦，可写作 名称:特性')
+  parser.add_argument('--critical', action='store_true')
+  parser.add_argument('--bench', nargs=3, type=int, metavar=('ATTACKERS', 'MOVES', 'DEFENDERS'),
+                      help='用随机配置测试计算速度')
+  args = parser.parse_args()
+
+  moves = MoveTable()
+  dataset = pokemon_dataset.load()
+  if args.bench:
+    main_bench(moves, dataset, *args.bench)
+  else:
+    evs = int(args.evs) if args.evs.isdigit() else {k: int(v) for k, v in (item.split('=') for item in args.evs.split(','))}
+    attackers = Sets([{'pokemon': args.attacker, 'form': args.form, 'level': args.level, 'nature': args.nature,
+                       'evs': evs}], dataset)
+    defenders = Sets([dict(zip(['pokemon', 'ability'], item.split(':', 1))) for item in args.defenders], dataset)
+    move_ids = moves.get_ids(args.moves)
+    low, high = damage_ranges(attackers, move_ids, defenders, moves, args.critical)
+    for j, move_id in enumerate(move_ids):
+      for k, label in enumerate(defenders.labels):
+        hp = defenders.stats[k, 0]
+        print(f'{moves.names[move_id]} -> {label}: {low[0, j, k]}-{high[0, j, k]} '
+              f'({low[0, j, k] / hp:.1%}-{high[0, j, k] / hp:.1%})')
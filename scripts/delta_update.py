@@ -0,0 +1,291 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+
+from pokemon_dataset import PATH
+
+# 不随数据集发布的目录
+EXCLUDE = {'raw', 'build'}
+DELTA_NAME = 'delta.json'
+# 应用增量包时的暂存目录，放在数据目录内以保证 os.replace 不跨文件系统
+STAGING_DIR = '.delta'
+# 暂存目录中的日志：所有新文件校验通过后写入，记录待执行的替换和删除；中途崩溃时下次 apply 据此继续
+JOURNAL_NAME = 'journal.json'
+
+class DeltaError(Exception):
+  pass
+
+def hash_bytes(data):
+  return hashlib.sha256(data).hexdigest()
+
+# 与抓取脚本写出数据文件时的格式一致
+def dump_json(data):
+  return json.dumps(data, ensure_ascii=False, indent=2)
+
+def read_bytes(path):
+  with open(path, 'rb') as f:
+    return f.read()
+
+def iter_files(data_path=PATH):
+  for root, dirs, files in os.walk(data_path):
+    if os.path.samefile(root, data_path):
+      dirs[:] = [name for name in dirs if name not in EXCLUDE and not name.startswith('.')]
+    dirs.sort()
+    for name in sorted(files):
+      if not name.endswith('.tmp'):
+        yield os.path.relpath(os.path.join(root, name), data_path).replace(os.sep, '/')
+
+# 整个数据集的哈希：按路径排序后对 (路径, 文件哈希) 求哈希
+def get_root_hash(files):
+  digest = hashlib.sha256()
+  for path in sorted(files):
+    digest.update(f'{path}\0{files[path]}\n'.encode('utf-8'))
+  return digest.hexdigest()
+
+def snapshot(data_path=PATH):
+  files = {path: hash_bytes(read_bytes(os.path.join(data_path, path))) for path in iter_files(data_path)}
+  return {'root': get_root_hash(files), 'files': files}
+
+def load_snapshot(path):
+  with open(path, 'r', encoding='utf-8') as f:
+    manifest = json.load(f)
+  if get_root_hash(manifest['files']) != manifest['root']:
+    raise DeltaError(f'{path}: root hash does not match the file list')
+  return manifest
+
+# 字典按键、列表按下标比较，只记录变化的部分
+def diff_json(old, new):
+  if isinstance(old, dict) and isinstance(new, dict):
+    return {'keys': list(new), 'set': {key: value for key, value in new.items() if key not in old or old[key] != value}}
+  if isinstance(old, list) and isinstance(new, list):
+    return {'length': len(new), 'set': {str(i): value for i, value in enumerate(new) if i >= len(old) or old[i] != value}}
+  return None
+
+def patch_json(old, patch):
+  changed = patch['set']
+  if 'keys' in patch:
+    return {key: changed[key] if key in changed else old[key] for key in patch['keys']}
+  return [changed[str(i)] if str(i) in changed else old[i] for i in range(patch['length'])]
+
+# 只有补丁应用后能逐字节还原新文件时才使用字段级补丁，否则整个文件作为 blob 发布
+def get_patch(old_bytes, new_bytes):
+  try:
+    old, new = json.loads(old_bytes), json.loads(new_bytes)
+  except ValueError:
+    return None
+  patch = diff_json(old, new)
+  if patch is None or dump_json(patch_json(old, patch)).encode('utf-8') != new_bytes:
+    return None
+  return patch
+
+# old_path 为 None 时旧版本只有哈希清单（snapshot 的输出），变化的文件都作为 blob 发布
+def get_changes(old_path, new_path, old=None, new=None):
+  old = old or snapshot(old_path)
+  new = new or snapshot(new_path)
+  changes = []
+  blobs = {}
+  for path, hash in sorted(new['files'].items()):
+    base = old['files'].get(path)
+    if base == hash:
+      continue
+    change = {'path': path, 'base': base, 'hash': hash}
+    new_file = os.path.join(new_path, path)
+    patch = None
+    if old_path is not None and base is not None and path.endswith('.json'):
+      patch = get_patch(read_bytes(os.path.join(old_path, path)), read_bytes(new_file))
+    if patch is not None:
+      change['patch'] = patch
+    else:
+      blobs[hash] = new_file
+    changes.append(change)
+  for path, base in sorted(old['files'].items()):
+    if path not in new['files']:
+      changes.append({'path': path, 'base': base, 'hash': None})
+  delta = {'version': 1, 'from': old['root'], 'to': new['root'], 'changes': changes}
+  return delta, blobs
+
+# 增量包为 tar.gz：第一个成员是 delta.json，其后是按哈希命名、去重后的 blob
+def write_bundle(delta, blobs, bundle_path):
+  tmp_path = f'{bundle_path}.tmp'
+  with tarfile.open(tmp_path, 'w:gz') as tar:
+    data = json.dumps(delta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    info = tarfile.TarInfo(DELTA_NAME)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+    for hash, path in sorted(blobs.items()):
+      tar.add(path, arcname=f'blobs/{hash}', recursive=False)
+  os.replace(tmp_path, bundle_path)
+  return delta
+
+def build_delta(old_path, new_path, bundle_path, old=None, new=None):
+  delta, blobs = get_changes(old_path, new_path, old, new)
+  return write_bundle(delta, blobs, bundle_path)
+
+def write_staged(path, data):
+  with open(path, 'wb') as f:
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+def write_journal(staging, journal):
+  path = os.path.join(staging, JOURNAL_NAME)
+  write_staged(f'{path}.tmp', json.dumps(journal, ensure_ascii=False).encode('utf-8'))
+  os.replace(f'{path}.tmp', path)
+
+# 按日志替换和删除文件；每一步都可以重复执行，崩溃后从头再执行一遍即可
+def replay_journal(staging, data_path):
+  with open(os.path.join(staging, JOURNAL_NAME), 'r', encoding='utf-8') as f:
+    journal = json.load(f)
+  for staged_name, path in journal['replace']:
+    target = os.path.join(data_path, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # 同一个 blob 可能对应多个路径，先复制到目标目录再原子替换
+    shutil.copyfile(os.path.join(staging, staged_name), f'{target}.tmp')
+    os.replace(f'{target}.tmp', target)
+  for path in journal['remove']:
+    target = os.path.join(data_path, path)
+    if os.path.exists(target):
+      os.remove(target)
+  # 先删日志再删暂存的文件，避免留下指向已删除文件的日志
+  os.remove(os.path.join(staging, JOURNAL_NAME))
+  shutil.rmtree(staging)
+  if snapshot(data_path)['root'] != journal['to']:
+    raise DeltaError('data does not match the target version after applying')
+  return journal['to']
+
+# 增量包来自外部，其中的路径必须是数据目录内参与快照的相对路径，不能是绝对路径、含 .. 或落到数据目录之外
+def check_path(path, data_path):
+  if not isinstance(path, str):
+    raise DeltaError(f'unsafe path in bundle: {path!r}')
+  parts = path.split('/')
+  if (os.path.isabs(path) or '\\' in path or any(part in ('', '.', '..') for part in parts)
+      or parts[0] in EXCLUDE or parts[0].startswith('.') or path.endswith('.tmp')):
+    raise DeltaError(f'unsafe path in bundle: {path!r}')
+  root = os.path.realpath(data_path)
+  if os.path.commonpath([root, os.path.realpath(os.path.join(root, path))]) != root:
+    raise DeltaError(f'path escapes the data directory: {path!r}')
+
+# 把增量包中的新文件写到暂存目录并逐个校验哈希，返回 (delta, 日志)；数据已是目标版本时日志为 None
+def stage_delta(bundle_path, data_path, staging):
+  current = snapshot(data_path)
+  delta = None
+  with tarfile.open(bundle_path, 'r:gz') as tar:
+    for member in tar:
+      data = tar.extractfile(member).read()
+      if member.name == DELTA_NAME:
+        delta = json.loads(data)
+        for change in delta['changes']:
+          check_path(change['path'], data_path)
+        if current['root'] == delta['to']:
+          return delta, None
+        if current['root'] != delta['from']:
+          raise DeltaError(f'local data {current["root"][:12]} does not match bundle base {delta["from"][:12]}')
+        continue
+      hash = member.name.split('/')[-1]
+      if delta is None or hash_bytes(data) != hash:
+        raise DeltaError(f'corrupt bundle member: {member.name}')
+      write_staged(os.path.join(staging, 'blobs', hash), data)
+  if delta is None:
+    raise DeltaError(f'{DELTA_NAME} missing from bundle')
+
+  files = dict(current['files'])
+  journal = {'to': delta['to'], 'replace': [], 'remove': []}
+  for i, change in enumerate(delta['changes']):
+    path = change['path']
+    if files.get(path) != change['base']:
+      raise DeltaError(f'{path}: unexpected local version')
+    if change['hash'] is None:
+      del files[path]
+      journal['remove'].append(path)
+      continue
+    if 'patch' in change:
+      old = json.loads(read_bytes(os.path.join(data_path, path)))
+      data = dump_json(patch_json(old, change['patch'])).encode('utf-8')
+      if hash_bytes(data) != change['hash']:
+        raise DeltaError(f'{path}: patched file does not match {change["hash"][:12]}')
+      staged_name = str(i)
+      write_staged(os.path.join(staging, staged_name), data)
+    else:
+      staged_name = f'blobs/{change["hash"]}'
+      if not os.path.exists(os.path.join(staging, staged_name)):
+        raise DeltaError(f'{path}: blob {change["hash"][:12]} missing from bundle')
+    journal['replace'].append([staged_name, path])
+    files[path] = change['hash']
+  if get_root_hash(files) != delta['to']:
+    raise DeltaError('bundle does not produce its target version')
+  return delta, journal
+
+# 先把所有新文件写到暂存目录并校验，全部通过后写日志，再按日志替换到数据目录，最后校验整个数据集的哈希；
+# 写日志之前出错不会改动数据目录，写日志之后中断的话，再次 apply（任意增量包）会先把上次的日志执行完
+def apply_delta(bundle_path, data_path=PATH):
+  staging = os.path.join(data_path, STAGING_DIR)
+  if os.path.exists(os.path.join(staging, JOURNAL_NAME)):
+    replay_journal(staging, data_path)
+  shutil.rmtree(staging, ignore_errors=True)
+  os.makedirs(os.path.join(staging, 'blobs'))
+  try:
+    delta, journal = stage_delta(bundle_path, data_path, staging)
+    if journal is None:
+      shutil.rmtree(staging)
+      return delta, 'current'
+    write_journal(staging, journal)
+  except BaseException:
+    shutil.rmtree(staging, ignore_errors=True)
+    raise
+  replay_journal(staging, data_path)
+  return delta, 'applied'
+
+def summarize(delta):
+  counts = {'added': 0, 'patched': 0, 'replaced': 0, 'removed': 0}
+  for change in delta['changes']:
+    if change['hash'] is None:
+      counts['removed'] += 1
+    elif change['base'] is None:
+      counts['added'] += 1
+    elif 'patch' in change:
+      counts['patched'] += 1
+    else:
+      counts['replaced'] += 1
+  return counts
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='生成或应用两个数据集版本之间的增量包')
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  snapshot_parser = subparsers.add_parser('snapshot', help='保存数据目录的文件哈希清单')
+  snapshot_parser.add_argument('output')
+  snapshot_parser.add_argument('--data', default=PATH)
+  diff_parser = subparsers.add_parser('diff', help='比较旧版本和新版本目录，生成增量包')
+  diff_parser.add_argument('old', help='旧版本的数据目录，或 snapshot 保存的哈希清单（此时变化的文件整个发布）')
+  diff_parser.add_argument('new', nargs='?', default=PATH, help='新版本的数据目录')
+  diff_parser.add_argument('--output', '-o', default='delta.tar.gz')
+  apply_parser = subparsers.add_parser('apply', help='把增量包应用到本地数据目录')
+  apply_parser.add_argument('bundle')
+  apply_parser.add_argument('--data', default=PATH)
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  if args.command == 'snapshot':
+    manifest = snapshot(args.data)
+    with open(args.output, 'w', encoding='utf-8') as f:
+      json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f'{len(manifest["files"])} files, root {manifest["root"][:12]}')
+  elif args.command == 'diff':
+    if os.path.isfile(args.old):
+      delta = build_delta(None, args.new, args.output, old=load_snapshot(args.old))
+    else:
+      delta = build_delta(args.old, args.new, args.output)
+    counts = ', '.join(f'{key}: {value}' for key, value in summarize(delta).items())
+    print(f'{delta["from"][:12]} -> {delta["to"][:12]}, {counts}, '
+          f'{os.path.getsize(args.output) / 1024:.1f} KB in {time.perf_counter() - start:.1f}s')
+  else:
+    try:
+      delta, status = apply_delta(args.bundle, args.data)
+    except DeltaError as e:
+      raise SystemExit(f'[Error] {e}')
+    print(f'{status} {delta["to"][:12]} in {time.perf_counter() - start:.1f}s')
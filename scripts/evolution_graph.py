@@ -0,0 +1,224 @@
+import argparse
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from array_pack import is_current, read_arrays, write_arrays
+from pokemon_dataset import BUILD_PATH, PATH, get_source, iter_json_dir
+
+GRAPH_PATH = os.path.join(BUILD_PATH, 'evolution_graph.bin')
+# 构建进化图所用的数据
+SOURCES = ['pokemon']
+
+# 每个进化链是一条从根到叶的节点列表，from 只写了宝可梦名
+# 同名的节点可能以不同形态出现在多条链里，所以 from 指向同一条链中之前最近的同名节点
+def iter_chain_edges(chain):
+  previous = {}
+  for node in chain:
+    source = previous.get(node['from']) if node['from'] else None
+    yield source, node
+    previous[node['name']] = node
+
+def get_node_key(node):
+  return node['name'], node.get('form_name')
+
+def build_graph(data_path=PATH, graph_path=GRAPH_PATH):
+  species_ids = {}
+  chains = []
+  for key, record in iter_json_dir('pokemon', data_path):
+    species_ids[record['name_zh']] = int(record['pokedex_id'])
+    chains.extend(record['evolution_chains'])
+
+  node_ids = {}
+  nodes = []
+  edges = {}
+  for chain in chains:
+    for source, node in iter_chain_edges(chain):
+      node_key = get_node_key(node)
+      if node_key not in node_ids:
+        node_ids[node_key] = len(nodes)
+        nodes.append({
+          'species_id': species_ids.get(node['name'], 0),
+          'name': node['name'],
+          'form_name': node.get('form_name'),
+          'stage': node['stage'],
+          'image': node['image'],
+        })
+      if source is not None:
+        # 同一对节点的进化条件只保留第一次出现的
+        edges.setdefault((node_ids[get_node_key(source)], node_ids[node_key]), node['text'])
+
+  # 并查集求连通分量作为家族
+  parents = list(range(len(nodes)))
+  def find(i):
+    while parents[i] != i:
+      parents[i] = parents[parents[i]]
+      i = parents[i]
+    return i
+  for source, target in edges:
+    parents[find(source)] = find(target)
+  roots = {}
+  families = np.array([roots.setdefault(find(i), len(roots)) for i in range(len(nodes))], dtype=np.uint16)
+
+  edge_list = sorted(edges)
+  sources = np.array([edge[0] for edge in edge_list], dtype=np.uint16)
+  targets = np.array([edge[1] for edge in edge_list], dtype=np.uint16)
+  by_target = np.argsort(targets, kind='stable').astype(np.uint32)
+  family_members = np.argsort(families, kind='stable').astype(np.uint16)
+  species = np.array([node['species_id'] for node in nodes], dtype=np.uint16)
+  species_nodes = np.argsort(species, kind='stable').astype(np.uint16)
+
+  meta = {
+    'source': get_source(data_path, SOURCES),
+    'nodes': [[node['name'], node['form_name'], node['stage'], node['image']] for node in nodes],
+    'conditions': [edges[edge] for edge in edge_list],
+  }
+  write_arrays(graph_path, meta, {
+    'species': species,
+    'families': families,
+    # 按起点排序的边，out_offsets[i]:out_offsets[i+1] 为节点 i 的出边
+    'sources': sources,
+    'targets': targets,
+    'out_offsets': np.searchsorted(sources, np.arange(len(nodes) + 1)).astype(np.uint32),
+    # by_target 为按终点排序的边下标，in_offsets 同理
+    'by_target': by_target,
+    'in_offsets': np.searchsorted(targets[by_target], np.arange(len(nodes) + 1)).astype(np.uint32),
+    'family_members': family_members,
+    'family_offsets': np.searchsorted(families[family_members], np.arange(len(roots) + 1)).astype(np.uint32),
+    'species_nodes': species_nodes,
+    'species_offsets': np.searchsorted(species[species_nodes], np.arange(int(species.max(initial=0)) + 2)).astype(np.uint32),
+  })
+  return graph_path
+
+class EvolutionGraph:
+  def __init__(self, graph_path=GRAPH_PATH):
+    self.meta, self.arrays = read_arrays(graph_path)
+    self.node_count = len(self.meta['nodes'])
+
+  def node(self, node_id):
+    name, form_name, stage, image = self.meta['nodes'][node_id]
+    return {
+      'id': int(node_id),
+      'species_id': int(self.arrays['species'][node_id]),
+      'name': name,
+      'form_name': form_name,
+      'stage': stage,
+      'image': image,
+    }
+
+  def edge(self, edge_id):
+    return {
+      'from': int(self.arrays['sources'][edge_id]),
+      'to': int(self.arrays['targets'][edge_id]),
+      'text': self.meta['conditions'][edge_id],
+    }
+
+  # 某个全国图鉴编号对应的所有形态节点
+  def species_nodes(self, species_id):
+    offsets = self.arrays['species_offsets']
+    if not 0 <= species_id < len(offsets) - 1:
+      return []
+    return [int(i) for i in self.arrays['species_nodes'][offsets[species_id]:offsets[species_id + 1]]]
+
+  def out_edges(self, node_id):
+    offsets = self.arrays['out_offsets']
+    return range(offsets[node_id], offsets[node_id + 1])
+
+  def in_edges(self, node_id):
+    offsets = self.arrays['in_offsets']
+    return self.arrays['by_target'][offsets[node_id]:offsets[node_id + 1]]
+
+  def family(self, node_id):
+    family_id = self.arrays['families'][node_id]
+    offsets = self.arrays['family_offsets']
+    return [int(i) for i in self.arrays['family_members'][offsets[family_id]:offsets[family_id + 1]]]
+
+  def species_family(self, species_id):
+    members = set()
+    for node_id in self.species_nodes(species_id):
+      members.update(self.family(node_id))
+    return sorted(members)
+
+  def walk(self, node_id, forward=True):
+    seen = {node_id}
+    queue = deque([node_id])
+    while queue:
+      current = queue.popleft()
+      edge_ids = self.out_edges(current) if forward else self.in_edges(current)
+      for edge_id in edge_ids:
+        neighbour = int(self.arrays['targets'][edge_id] if forward else self.arrays['sources'][edge_id])
+        if neighbour not in seen:
+          seen.add(neighbour)
+          queue.append(neighbour)
+    seen.discard(node_id)
+    return sorted(seen)
+
+  def ancestors(self, node_id):
+    return self.walk(node_id, forward=False)
+
+  def descendants(self, node_id):
+    return self.walk(node_id, forward=True)
+
+  # 从 source 进化到 target 经过的边，无法进化到时返回 None
+  def path(self, source, target):
+    previous = {source: None}
+    queue = deque([source])
+    while queue:
+      current = queue.popleft()
+      if current == target:
+        edges = []
+        while previous[current] is not None:
+          edge_id = previous[current]
+          edges.append(self.edge(edge_id))
+          current = int(self.arrays['sources'][edge_id])
+        return edges[::-1]
+      for edge_id in self.out_edges(current):
+        neighbour = int(self.arrays['targets'][edge_id])
+        if neighbour not in previous:
+          previous[neighbour] = edge_id
+          queue.append(neighbour)
+    return None
+
+# 进化图不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(graph_path=GRAPH_PATH, data_path=PATH):
+  if not is_current(graph_path, get_source(data_path, SOURCES)):
+    build_graph(data_path, graph_path)
+  return EvolutionGraph(graph_path)
+
+def format_node(node):
+  return f'{node["name"]}（{node["form_name"]}）' if node['form_name'] else node['name']
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='把所有进化链合并为一张进化图，并查询家族和进化路径')
+  parser.add_argument('command', choices=['build', 'family', 'path'])
+  parser.add_argument('species', nargs='*', type=int, help='全国图鉴编号，path 需要起点和终点两个')
+  parser.add_argument('--graph', default=GRAPH_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    build_graph(graph_path=args.graph)
+    graph = EvolutionGraph(args.graph)
+    print(f'{args.graph}: {graph.node_count} nodes, {len(graph.arrays["sources"])} edges, '
+          f'{len(graph.arrays["family_offsets"]) - 1} families in {time.perf_counter() - start:.1f}s')
+  elif args.command == 'family':
+    graph = load(args.graph)
+    start = time.perf_counter()
+    members = graph.species_family(args.species[0])
+    elapsed = time.perf_counter() - start
+    for node_id in members:
+      node = graph.node(node_id)
+      print(f'{node["species_id"]:04d} {format_node(node)} {node["stage"]}')
+    print(f'{len(members)} members in {elapsed * 1000:.3f} ms')
+  else:
+    graph = load(args.graph)
+    source, target = args.species[:2]
+    for start_node in graph.species_nodes(source):
+      for end_node in graph.species_nodes(target):
+        edges = graph.path(start_node, end_node)
+        if edges is not None:
+          steps = [format_node(graph.node(start_node))]
+          steps += [f'--[{edge["text"]}]--> {format_node(graph.node(edge["to"]))}' for edge in edges]
+          print(' '.join(steps))
@@ -0,0 +1,143 @@
+import argparse
+import glob
+import os
+import re
+import time
+
+import numpy as np
+
+try:
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+except ImportError:
+  pa = None
+
+from pokemon_dataset import (BUILD_PATH, PATH, TYPE_INDEX, TYPES, iter_json_dir, match_form_items,
+                             match_form_type_effectiveness, parse_number)
+
+COLUMNS_PATH = os.path.join(BUILD_PATH, 'columns')
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+UNKNOWN = -1
+
+def parse_int(text):
+  value = parse_number(text)
+  return UNKNOWN if np.isnan(value) else int(value)
+
+def parse_catch_rate_percent(text):
+  match = re.search(r'（([\d.]+)%）', text or '')
+  return float(match.group(1)) if match else np.nan
+
+def get_type_ids(types):
+  ids = [TYPE_INDEX[t] for t in types[:2]]
+  return ids + [UNKNOWN] * (2 - len(ids))
+
+def parse_damage(text):
+  return float(text)
+
+# 把 data/pokemon 中的字符串字段整理成按列存储的数值表
+# stats、type_effectiveness 两张表与 forms 逐行对齐（第 i 行都是同一个形态），form 列为匹配到的原始形态名，
+# 没有对应数据的形态种族值为 -1、相性倍率为 NaN
+def build_tables(data_path=PATH):
+  forms = {name: [] for name in ['species_id', 'form_index', 'name', 'type1', 'type2', 'height', 'weight',
+                                 'catch_rate', 'catch_rate_percent', 'base_exp']}
+  stats = {name: [] for name in ['species_id', 'form_index', 'form'] + STATS}
+  effectiveness = {name: [] for name in ['species_id', 'form_index', 'form', 'type1', 'type2']}
+  matrix = []
+
+  for key, record in iter_json_dir('pokemon', data_path):
+    species_id = int(record['pokedex_id'])
+    stat_items = match_form_items(record, 'stats')
+    effectiveness_items = match_form_type_effectiveness(record)
+    for form_index, form in enumerate(record['forms']):
+      type1, type2 = get_type_ids(form['types'])
+      forms['species_id'].append(species_id)
+      forms['form_index'].append(form_index)
+      forms['name'].append(form['name'])
+      forms['type1'].append(type1)
+      forms['type2'].append(type2)
+      forms['height'].append(parse_number(form['height']))
+      forms['weight'].append(parse_number(form['weight']))
+      forms['catch_rate'].append(parse_int(form['catch_rate']))
+      forms['catch_rate_percent'].append(parse_catch_rate_percent(form['catch_rate']))
+      forms['base_exp'].append(parse_int(form['base_exp']))
+
+      stat_index = stat_items[form_index]
+      stats['species_id'].append(species_id)
+      stats['form_index'].append(form_index)
+      stats['form'].append(record['stats'][stat_index]['form'] if stat_index is not None else '')
+      for name in STATS:
+        stats[name].append(parse_int(record['stats'][stat_index]['data'][name]) if stat_index is not None else UNKNOWN)
+
+      item = effectiveness_items[form_index]
+      effectiveness['species_id'].append(species_id)
+      effectiveness['form_index'].append(form_index)
+      effectiveness['form'].append(item['form'] if item else '')
+      effectiveness['type1'].append(type1)
+      effectiveness['type2'].append(type2)
+      row = [1.0 if item else np.nan] * len(TYPES)
+      for entry in item['data'] if item else []:
+        row[TYPE_INDEX[entry['type']]] = parse_damage(entry['damage'])
+      matrix.append(row)
+
+  int16 = ['species_id', 'catch_rate', 'base_exp'] + STATS
+  int8 = ['form_index', 'type1', 'type2']
+  float32 = ['height', 'weight', 'catch_rate_percent']
+  tables = {}
+  for table_name, table in [('forms', forms), ('stats', stats), ('type_effectiveness', effectiveness)]:
+    columns = {}
+    for name, values in table.items():
+      if name in int16:
+        columns[name] = np.array(values, dtype=np.int16)
+      elif name in int8:
+        columns[name] = np.array(values, dtype=np.int8)
+      elif name in float32:
+        columns[name] = np.array(values, dtype=np.float32)
+      else:
+        columns[name] = np.array(values, dtype=str)
+    tables[table_name] = columns
+  tables['type_effectiveness']['damage'] = np.array(matrix, dtype=np.float32).reshape(-1, len(TYPES))
+  return tables
+
+def write_npy(table, directory):
+  os.makedirs(directory, exist_ok=True)
+  for name, values in table.items():
+    np.save(os.path.join(directory, f'{name}.npy'), values)
+
+def write_parquet(table, path):
+  arrays = {}
+  for name, values in table.items():
+    if values.ndim == 2:
+      arrays[name] = pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+    else:
+      arrays[name] = pa.array(values)
+  pq.write_table(pa.table(arrays), path)
+
+def export_columns(data_path=PATH, output_path=COLUMNS_PATH, parquet=True):
+  tables = build_tables(data_path)
+  for name, table in tables.items():
+    write_npy(table, os.path.join(output_path, name))
+    if parquet and pa is not None:
+      write_parquet(table, os.path.join(output_path, f'{name}.parquet'))
+  return tables
+
+# 以 mmap 方式读取导出的 .npy 列，无需解析 JSON
+def load_columns(table_name, output_path=COLUMNS_PATH):
+  directory = os.path.join(output_path, table_name)
+  return {
+    os.path.splitext(os.path.basename(path))[0]: np.load(path, mmap_mode='r')
+    for path in sorted(glob.glob(os.path.join(directory, '*.npy')))
+  }
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='把宝可梦数据导出为按列存储的 Parquet / .npy 文件')
+  parser.add_argument('--output', default=COLUMNS_PATH)
+  parser.add_argument('--no-parquet', action='store_true')
+  args = parser.parse_args()
+
+  if pa is None and not args.no_parquet:
+    print('pyarrow is not installed, only .npy files will be written')
+  start = time.perf_counter()
+  tables = export_columns(output_path=args.output, parquet=not args.no_parquet)
+  for name, table in tables.items():
+    print(f'{name}: {len(next(iter(table.values())))} rows')
+  print(f'done in {time.perf_counter() - start:.1f}s -> {args.output}')
@@ -0,0 +1,359 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import time
+
+from evolution_graph import EvolutionGraph, build_graph
+from normalize_moves import LEARNSETS, find_move_id, get_move_ids, load_move_table
+from pokemon_dataset import BUILD_PATH, PATH, iter_json_dir, load_json, match_form_items, parse_number
+
+SQLITE_PATH = os.path.join(BUILD_PATH, 'dataset.sqlite')
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+METHODS = {'learnable_moves': 'level', 'machine_moves': 'machine', 'egg_moves': 'egg'}
+
+SCHEMA = '''
+CREATE TABLE species (
+  id INTEGER PRIMARY KEY,
+  name_zh TEXT NOT NULL,
+  name_ja TEXT,
+  name_en TEXT,
+  description TEXT,
+  profile TEXT,
+  prototype TEXT
+);
+CREATE TABLE forms (
+  id INTEGER PRIMARY KEY,
+  species_id INTEGER NOT NULL REFERENCES species(id),
+  position INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  category TEXT,
+  height REAL,
+  weight REAL,
+  color TEXT,
+  catch_rate INTEGER,
+  base_exp INTEGER,
+  male REAL,
+  female REAL,
+  image TEXT
+);
+CREATE TABLE form_types (
+  form_id INTEGER NOT NULL REFERENCES forms(id),
+  slot INTEGER NOT NULL,
+  type TEXT NOT NULL,
+  PRIMARY KEY (form_id, slot)
+) WITHOUT ROWID;
+CREATE TABLE form_abilities (
+  form_id INTEGER NOT NULL REFERENCES forms(id),
+  ability TEXT NOT NULL,
+  ability_id INTEGER REFERENCES abilities(id),
+  is_hidden INTEGER NOT NULL,
+  PRIMARY KEY (form_id, ability)
+) WITHOUT ROWID;
+CREATE TABLE form_egg_groups (
+  form_id INTEGER NOT NULL REFERENCES forms(id),
+  egg_group TEXT NOT NULL,
+  PRIMARY KEY (form_id, egg_group)
+) WITHOUT ROWID;
+CREATE TABLE stats (
+  form_id INTEGER REFERENCES forms(id),
+  species_id INTEGER NOT NULL REFERENCES species(id),
+  form TEXT NOT NULL,
+  hp INTEGER, attack INTEGER, defense INTEGER, sp_attack INTEGER, sp_defense INTEGER, speed INTEGER,
+  total INTEGER
+);
+CREATE TABLE moves (
+  id INTEGER PRIMARY KEY,
+  name_zh TEXT NOT NULL,
+  name_ja TEXT,
+  name_en TEXT,
+  type TEXT,
+  category TEXT,
+  power INTEGER,
+  accuracy INTEGER,
+  pp INTEGER,
+  generation INTEGER,
+  description TEXT
+);
+CREATE TABLE learnsets (
+  species_id INTEGER NOT NULL REFERENCES species(id),
+  form TEXT NOT NULL,
+  method TEXT NOT NULL,
+  move_id INTEGER REFERENCES moves(id),
+  move TEXT NOT NULL,
+  detail TEXT
+);
+CREATE TABLE abilities (
+  id INTEGER PRIMARY KEY,
+  number INTEGER NOT NULL,
+  name_zh TEXT NOT NULL,
+  name_ja TEXT,
+  name_en TEXT,
+  description TEXT,
+  generation INTEGER
+);
+CREATE TABLE evolution_nodes (
+  id INTEGER PRIMARY KEY,
+  species_id INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  form_name TEXT,
+  stage TEXT
+);
+CREATE TABLE evolution_edges (
+  from_id INTEGER NOT NULL REFERENCES evolution_nodes(id),
+  to_id INTEGER NOT NULL REFERENCES evolution_nodes(id),
+  condition TEXT
+);
+CREATE TABLE dex_numbers (
+  dex TEXT NOT NULL,
+  number INTEGER NOT NULL,
+  species_id INTEGER NOT NULL,
+  name TEXT
+);
+CREATE TABLE items (
+  id INTEGER PRIMARY KEY,
+  name_zh TEXT NOT NULL,
+  variant INTEGER NOT NULL,
+  name_ja TEXT,
+  name_en TEXT,
+  category TEXT,
+  description TEXT,
+  icon TEXT
+);
+CREATE TABLE flavor_texts (
+  id INTEGER PRIMARY KEY,
+  species_id INTEGER NOT NULL REFERENCES species(id),
+  generation TEXT,
+  version TEXT,
+  version_group TEXT,
+  text TEXT NOT NULL
+);
+'''
+
+# 建完数据后再建索引，批量插入更快
+INDEXES = '''
+CREATE INDEX forms_species ON forms(species_id);
+CREATE INDEX form_types_type ON form_types(type, form_id);
+CREATE INDEX form_abilities_ability ON form_abilities(ability, form_id);
+CREATE INDEX form_egg_groups_egg_group ON form_egg_groups(egg_group, form_id);
+CREATE INDEX stats_species ON stats(species_id);
+CREATE INDEX stats_form ON stats(form_id);
+CREATE INDEX moves_name ON moves(name_zh);
+CREATE INDEX learnsets_species ON learnsets(species_id, method);
+CREATE INDEX learnsets_move ON learnsets(move_id, species_id);
+CREATE INDEX abilities_name ON abilities(name_zh);
+CREATE INDEX evolution_nodes_species ON evolution_nodes(species_id);
+CREATE INDEX evolution_edges_from ON evolution_edges(from_id);
+CREATE INDEX evolution_edges_to ON evolution_edges(to_id);
+CREATE INDEX dex_numbers_species ON dex_numbers(species_id);
+CREATE INDEX dex_numbers_dex ON dex_numbers(dex, number);
+CREATE INDEX items_name ON items(name_zh);
+CREATE INDEX flavor_texts_species ON flavor_texts(species_id);
+'''
+
+# 中文没有空格分词，用 trigram 分词器支持任意子串检索（至少三个字）
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE flavor_texts_fts USING fts5(text, content='flavor_texts', content_rowid='id', tokenize='trigram');
+INSERT INTO flavor_texts_fts(flavor_texts_fts) VALUES ('rebuild');
+'''
+
+# executescript 会先提交当前事务，这里逐条执行，让建表和写数据在同一个事务里
+def execute_script(db, script):
+  for statement in script.split(';'):
+    if statement.strip():
+      db.execute(statement)
+
+def to_int(text):
+  value = parse_number(text)
+  return None if math.isnan(value) else int(value)
+
+def to_float(text):
+  value = parse_number(text)
+  return None if math.isnan(value) else value
+
+def iter_items(nodes, category=None):
+  for node in nodes:
+    if node['type'] == 'category':
+      yield from iter_items(node['children'], f'{category}/{node["name"]}' if category else node['name'])
+    else:
+      yield category, node
+
+def insert_species(db, data_path, move_ids, ability_ids):
+  species_rows = []
+  stats_rows = []
+  learnset_rows = []
+  flavor_rows = []
+  form_id = 0
+  for key, record in iter_json_dir('pokemon', data_path):
+    species_id = int(record['pokedex_id'])
+    species_rows.append((species_id, record['name_zh'], record.get('name_ja'), record.get('name_en'),
+                         record.get('description'), record.get('profile'), record.get('prototype')))
+    first_form_id = form_id + 1
+    for position, form in enumerate(record['forms']):
+      form_id += 1
+      gender = form.get('gender_ratio') or {}
+      db.execute('INSERT INTO forms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+        form_id, species_id, position, form['name'], form.get('category'), to_float(form.get('height')),
+        to_float(form.get('weight')), form.get('color'), to_int(form.get('catch_rate')), to_int(form.get('base_exp')),
+        gender.get('male'), gender.get('female'), form.get('image'),
+      ))
+      db.executemany('INSERT INTO form_types VALUES (?, ?, ?)',
+                     [(form_id, slot, type_name) for slot, type_name in enumerate(form['types'], start=1)])
+      db.executemany('INSERT OR IGNORE INTO form_abilities VALUES (?, ?, ?, ?)',
+                     [(form_id, a['name'], ability_ids.get(a['name']), int(a['is_hidden'])) for a in form['abilities']])
+      db.executemany('INSERT OR IGNORE INTO form_egg_groups VALUES (?, ?)',
+                     [(form_id, egg_group) for egg_group in form['egg_groups']])
+
+    # 种族值的形态名（如 '一般'、'超级喷火龙Ｘ'）与 forms 的名称不同，按 match_form_items 为每个形态配一项；
+    # 没有配给任何形态的项也保留，form_id 为空
+    matches = match_form_items(record, 'stats')
+    for i, item in enumerate(record['stats']):
+      values = [to_int(item['data'].get(stat)) for stat in STATS]
+      total = sum(values) if None not in values else None
+      form_ids = [first_form_id + position for position, match in enumerate(matches) if match == i] or [None]
+      stats_rows.extend((row_form_id, species_id, item['form'], *values, total) for row_form_id in form_ids)
+
+    for field, method in METHODS.items():
+      detail_field = LEARNSETS[field]
+      for group in record[field]:
+        for row in group['data']:
+          detail = row.get(detail_field)
+          # 蛋招式的亲代是列表，部分亲代没有编号，原样存为 JSON
+          if detail_field == 'parents':
+            detail = json.dumps(detail, ensure_ascii=False)
+          learnset_rows.append((species_id, group['form'], method, find_move_id(row['name'], move_ids), row['name'], detail))
+
+    for generation in record.get('pokedex_entries', []):
+      for version in generation['versions']:
+        flavor_rows.append((species_id, generation['name'], version['name'], version.get('group'), version['text']))
+
+  db.executemany('INSERT INTO species VALUES (?, ?, ?, ?, ?, ?, ?)', species_rows)
+  db.executemany('INSERT INTO stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', stats_rows)
+  db.executemany('INSERT INTO learnsets VALUES (?, ?, ?, ?, ?, ?)', learnset_rows)
+  db.executemany('INSERT INTO flavor_texts (species_id, generation, version, version_group, text) VALUES (?, ?, ?, ?, ?)',
+                 flavor_rows)
+
+def insert_moves(db, data_path):
+  rows = []
+  for move in load_json(os.path.join(data_path, 'move_list.json')):
+    # 超极巨招式没有编号，与 normalize_moves 一致地跳过
+    if not move['id'].isdigit():
+      continue
+    rows.append((int(move['id']), move['name_zh'], move.get('name_jp'), move.get('name_en'), move['type'],
+                 move['category'], to_int(move['power']), to_int(move['accuracy']), to_int(move['pp']),
+                 move.get('generation'), move.get('description')))
+  db.executemany('INSERT INTO moves VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+# 特性编号并不唯一（杂音与气闸都是 076），所以另设行号作为主键
+def insert_abilities(db, data_path):
+  rows = [(row_id, int(a['id']), a['name_zh'], a.get('name_ja'), a.get('name_en'), a.get('description'), a.get('generation'))
+          for row_id, a in enumerate(load_json(os.path.join(data_path, 'ability_list.json')), start=1)]
+  db.executemany('INSERT INTO abilities VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+  return {row[2]: row[0] for row in rows}
+
+# 进化图总是从 data_path 重新构建，不复用 build 目录中可能来自其他数据的图
+def insert_evolutions(db, data_path, graph_path):
+  build_graph(data_path, graph_path)
+  graph = EvolutionGraph(graph_path)
+  db.executemany('INSERT INTO evolution_nodes VALUES (?, ?, ?, ?, ?)', [
+    (node['id'], node['species_id'], node['name'], node['form_name'], node['stage'])
+    for node in map(graph.node, range(graph.node_count))
+  ])
+  db.executemany('INSERT INTO evolution_edges VALUES (?, ?, ?)', [
+    (edge['from'], edge['to'], edge['text']) for edge in map(graph.edge, range(len(graph.arrays['sources'])))
+  ])
+
+def insert_dex_numbers(db, data_path):
+  rows = set()
+  for key, entries in iter_json_dir('pokedex', data_path):
+    for entry in entries:
+      species_id = int(entry.get('national_id', entry['id']))
+      rows.add((key, int(entry['id']), species_id, entry['name']))
+  db.executemany('INSERT INTO dex_numbers VALUES (?, ?, ?, ?)', sorted(rows))
+
+# 有外观差异的道具（如树叶信）的说明和图标是列表，每种外观存一行
+def insert_items(db, data_path):
+  rows = []
+  for category, item in iter_items(load_json(os.path.join(data_path, 'item_list.json'))):
+    descriptions = item.get('description')
+    icons = item.get('icon')
+    count = max(len(value) for value in [descriptions, icons] if isinstance(value, list)) \
+      if isinstance(descriptions, list) or isinstance(icons, list) else 1
+    for variant in range(count):
+      description = descriptions[min(variant, len(descriptions) - 1)] if isinstance(descriptions, list) else descriptions
+      icon = icons[min(variant, len(icons) - 1)] if isinstance(icons, list) else icons
+      rows.append((item['name_zh'], variant, item.get('name_ja'), item.get('name_en'), category, description, icon))
+  db.executemany('INSERT INTO items (name_zh, variant, name_ja, name_en, category, description, icon) '
+                 'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+# 在临时文件中一次事务写完全部数据，再建索引和全文索引，最后原子替换
+def export_sqlite(data_path=PATH, sqlite_path=SQLITE_PATH):
+  os.makedirs(os.path.dirname(sqlite_path), exist_ok=True)
+  tmp_path = f'{sqlite_path}.tmp'
+  if os.path.exists(tmp_path):
+    os.remove(tmp_path)
+  db = sqlite3.connect(tmp_path, isolation_level=None)
+  db.execute('PRAGMA journal_mode = OFF')
+  db.execute('PRAGMA synchronous = OFF')
+  db.execute('BEGIN')
+  execute_script(db, SCHEMA)
+
+  moves = load_move_table(data_path)
+  insert_moves(db, data_path)
+  ability_ids = insert_abilities(db, data_path)
+  insert_species(db, data_path, get_move_ids(moves), ability_ids)
+  graph_path = f'{sqlite_path}.graph.tmp'
+  try:
+    insert_evolutions(db, data_path, graph_path)
+  finally:
+    if os.path.exists(graph_path):
+      os.remove(graph_path)
+  insert_dex_numbers(db, data_path)
+  insert_items(db, data_path)
+  execute_script(db, INDEXES + FTS_SCHEMA)
+  db.execute('COMMIT')
+  db.execute('ANALYZE')
+  db.execute('VACUUM')
+  db.close()
+  os.replace(tmp_path, sqlite_path)
+  return sqlite_path
+
+# 只读打开，整个文件 mmap，多个进程共享页缓存
+def connect(sqlite_path=SQLITE_PATH, mmap_size=256 * 1024 * 1024):
+  db = sqlite3.connect(f'file:{sqlite_path}?mode=ro', uri=True, check_same_thread=False)
+  db.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+  db.execute('PRAGMA query_only = ON')
+  return db
+
+# 检索词整体作为 FTS5 短语，其中的双引号要写成两个
+def search_flavor_texts(db, query, limit=10):
+  return db.execute('''
+    SELECT s.id, s.name_zh, f.generation, f.version, f.text
+    FROM flavor_texts_fts JOIN flavor_texts f ON f.id = flavor_texts_fts.rowid JOIN species s ON s.id = f.species_id
+    WHERE flavor_texts_fts MATCH ? ORDER BY rank LIMIT ?
+  ''', ('"{}"'.format(query.replace('"', '""')), limit)).fetchall()
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='把整个数据集导出为一个带索引和全文检索的 SQLite 数据库')
+  parser.add_argument('command', choices=['build', 'query', 'search'])
+  parser.add_argument('text', nargs='?', help='query 时为 SQL，search 时为图鉴介绍的检索词')
+  parser.add_argument('--output', default=SQLITE_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    export_sqlite(sqlite_path=args.output)
+    db = connect(args.output)
+    counts = {table: db.execute(f'SELECT count(*) FROM {table}').fetchone()[0] for (table,) in
+              db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '%fts%' AND name NOT LIKE 'sqlite%'")}
+    print(f'{args.output}: {os.path.getsize(args.output) / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s')
+    print(', '.join(f'{table}: {count}' for table, count in counts.items()))
+  else:
+    db = connect(args.output)
+    start = time.perf_counter()
+    rows = db.execute(args.text).fetchall() if args.command == 'query' else search_flavor_texts(db, args.text)
+    elapsed = time.perf_counter() - start
+    for row in rows:
+      print(row)
+    print(f'{len(rows)} rows in {elapsed * 1000:.2f} ms')
@@ -0,0 +1,144 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch_pokemon import get_key, get_output_path, select_pokemon
+from http_cache import ResponseCache
+from manifest import (MANIFEST_PATH, dump_json, hash_text, load_manifest, make_entry, read_output, save_manifest,
+                      write_if_changed)
+from pokemon import BASE_URL, DEFAULT_PARSER, EXTRACTOR_VERSIONS, FIELDS, PARSERS, PATH, get_error, parse_pokemon_data
+
+ERRORS_PATH = f'{PATH}/raw/errors.json'
+# 输出文件中键的顺序，与完整提取时一致
+KEY_ORDER = ['name', 'index', 'name_en', 'name_jp'] + FIELDS
+
+def load_errors(path=ERRORS_PATH):
+  if not os.path.exists(path):
+    return {}
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+def save_errors(errors, path=ERRORS_PATH):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  tmp_path = f'{path}.tmp'
+  with open(tmp_path, 'w', encoding='utf-8') as f:
+    json.dump(errors, f, ensure_ascii=False, indent=2, sort_keys=True)
+  os.replace(tmp_path, path)
+
+# 只重新提取部分字段时，其余字段沿用的版本：旧记录对应同一页面和同一输出时才可信
+def get_kept_versions(entry, source_hash, old_text, fields):
+  if not entry or old_text is None or entry.get('source') != source_hash or entry.get('output') != hash_text(old_text):
+    return {}
+  return {field: version for field, version in entry.get('versions', {}).items() if field not in fields}
+
+# 在子进程中运行：读取缓存的页面、逐个字段提取并写出结果，只把状态、错误和新的 manifest 记录返回给主进程
+# 出错的字段从输出中删去，不保留旧值，manifest 中也不记其版本，下次增量构建或 --retry 时会重新提取；
+# fields 不为 None 时只重新提取这些字段，其余字段沿用已有输出
+def extract_pokemon(pokemon, body_path, output_path, parser=DEFAULT_PARSER, fields=None, entry=None):
+  try:
+    with open(body_path, 'rb') as f:
+      html = gzip.decompress(f.read()).decode('utf-8')
+    errors = []
+    data = parse_pokemon_data(html, pokemon['name_zh'], pokemon['index'], pokemon['name_en'], pokemon['name_jp'],
+                              parser, fields, errors=errors)
+  except Exception as e:
+    return 'failed', [get_error(None, e)], None
+
+  failed = {error['field'] for error in errors}
+  source_hash = hash_text(html)
+  old_text = read_output(output_path)
+  versions = {}
+  if old_text is not None and fields is not None:
+    data = {**json.loads(old_text), **data}
+    versions = get_kept_versions(entry, source_hash, old_text, fields)
+  versions.update({field: EXTRACTOR_VERSIONS[field] for field in fields or FIELDS if field not in failed})
+  keys = [key for key in KEY_ORDER if key in data] + [key for key in data if key not in KEY_ORDER]
+  data = {key: data[key] for key in keys if key not in failed}
+  text = dump_json(data)
+  changed = write_if_changed(output_path, text, old_text)
+  entry = make_entry(source_hash, text, versions)
+  if errors:
+    return 'partial', errors, entry
+  return 'written' if changed else 'unchanged', [], entry
+
+# 多进程从页面缓存重新提取；返回汇总，并就地更新错误台账 ledger 和增量构建的 manifest
+def extract_all(target_list, cache, output_dir=f'{PATH}/pokemon', base_url=BASE_URL, workers=None, parser=DEFAULT_PARSER,
+                ledger=None, retry_fields=None, manifest=None):
+  ledger = {} if ledger is None else ledger
+  manifest = {} if manifest is None else manifest
+  summary = {'written': 0, 'unchanged': 0, 'partial': 0, 'failed': 0, 'missing': []}
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    futures = {}
+    for pokemon in target_list:
+      url = f'{base_url}{pokemon["name_zh"]}'
+      if url not in cache.index:
+        summary['missing'].append(pokemon['name_zh'])
+        continue
+      key = get_key(pokemon)
+      fields = retry_fields.get(key) if retry_fields else None
+      future = pool.submit(extract_pokemon, pokemon, cache.get_body_path(url), get_output_path(output_dir, pokemon),
+                           parser, fields, manifest.get(key))
+      futures[future] = pokemon
+
+    for future in as_completed(futures):
+      pokemon = futures[future]
+      key = get_key(pokemon)
+      try:
+        status, errors, entry = future.result()
+      except Exception as e:
+        status, errors, entry = 'failed', [get_error(None, e)], None
+      summary[status] += 1
+      if entry is not None:
+        manifest[key] = entry
+      if errors:
+        ledger[key] = {'name': pokemon['name_zh'], 'status': status, 'errors': errors}
+        print(f'[{status.capitalize()}] {pokemon["name_zh"]}: ' + ', '.join(f'{e["field"]}: {e["type"]}' for e in errors))
+      else:
+        ledger.pop(key, None)
+  return summary
+
+# 台账中某只宝可梦出错的字段；整页失败时为 None，表示重新提取全部字段
+def get_retry_fields(ledger):
+  retry = {}
+  for key, entry in ledger.items():
+    fields = [error['field'] for error in entry['errors']]
+    retry[key] = None if None in fields else fields
+  return retry
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='多进程从页面缓存重新提取，单个字段出错时保留其余字段并记录到错误台账')
+  parser.add_argument('target', nargs='*', default=['all'], help='<start_id> [end_id] | <pokemon_name> | all')
+  parser.add_argument('--output', default=f'{PATH}/pokemon')
+  parser.add_argument('--cache-dir', default=f'{PATH}/raw/cache')
+  parser.add_argument('--base-url', default=BASE_URL)
+  parser.add_argument('--workers', type=int, default=None, help='进程数，默认为 CPU 核数')
+  parser.add_argument('--parser', choices=PARSERS, default=DEFAULT_PARSER)
+  parser.add_argument('--errors', default=ERRORS_PATH, help='错误台账')
+  parser.add_argument('--retry', action='store_true', help='只重新提取台账中出错的宝可梦和字段')
+  parser.add_argument('--manifest', default=MANIFEST_PATH, help='增量构建的 manifest，随提取结果一起更新')
+  args = parser.parse_args()
+
+  with open(f'{PATH}/simple_pokedex.json', 'r', encoding='utf-8') as f:
+    pokemon_list = json.load(f)
+  ledger = load_errors(args.errors)
+  manifest = load_manifest(args.manifest)
+  target_list = select_pokemon(pokemon_list, args.target)
+  retry_fields = None
+  if args.retry:
+    retry_fields = get_retry_fields(ledger)
+    target_list = [p for p in target_list if get_key(p) in retry_fields]
+  os.makedirs(args.output, exist_ok=True)
+  print(f'Found {len(target_list)} Pokemon to extract.')
+
+  start = time.perf_counter()
+  cache = ResponseCache(args.cache_dir, offline=True)
+  summary = extract_all(target_list, cache, args.output, args.base_url, args.workers, args.parser, ledger, retry_fields,
+                        manifest)
+  save_errors(ledger, args.errors)
+  save_manifest(manifest, args.manifest)
+  print(f'Extraction complete in {time.perf_counter() - start:.1f}s. written: {summary["written"]}, '
+        f'unchanged: {summary["unchanged"]}, partial: {summary["partial"]}, failed: {summary["failed"]}, '
+        f'not cached: {len(summary["missing"])}')
@@ -0,0 +1,199 @@
+import argparse
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from array_pack import is_current, read_arrays, write_arrays
+from pokemon_dataset import BUILD_PATH, PATH, get_source, iter_json_dir
+
+INDEX_PATH = os.path.join(BUILD_PATH, 'fulltext.bin')
+K1 = 1.2
+B = 0.75
+
+# 参与检索的字段：(目录, 字段)
+TEXT_FIELDS = {
+  'pokemon': ['description', 'profile', 'prototype'],
+  'moves': ['description', 'additional_effect'],
+  'abilities': ['introduction', 'effect'],
+}
+# 构建索引所用的数据
+SOURCES = list(TEXT_FIELDS)
+
+CJK = r'぀-ヿ㐀-䶿一-鿿豈-﫿'
+TOKEN_RE = re.compile(f'[{CJK}]+|[0-9a-z]+')
+CJK_RE = re.compile(f'[{CJK}]')
+
+# 中日文按相邻两字切分（单字的片段保留单字），字母数字按单词切分；先做 NFKC 归一化，全角数字、字母按半角处理
+# 建索引时 unigrams 为 True，另外收录每个单字，单字的查询也能命中
+def tokenize(text, unigrams=False):
+  tokens = []
+  for part in TOKEN_RE.findall(unicodedata.normalize('NFKC', text).lower()):
+    if CJK_RE.match(part) and len(part) > 1:
+      tokens.extend(part[i:i + 2] for i in range(len(part) - 1))
+      if unigrams:
+        tokens.extend(part)
+    else:
+      tokens.append(part)
+  return tokens
+
+# 图鉴介绍中不同版本的文字常常相同，相同文字合并为一条，版本记在 context 中
+def iter_documents(data_path=PATH):
+  for kind, fields in TEXT_FIELDS.items():
+    for key, record in iter_json_dir(kind, data_path):
+      for field in fields:
+        text = record.get(field)
+        if isinstance(text, str) and text.strip():
+          yield kind, key, field, None, text
+      if kind == 'pokemon':
+        for generation in record.get('pokedex_entries', []):
+          versions = {}
+          for version in generation['versions']:
+            versions.setdefault(version['text'], []).append(version['name'])
+          for text, names in versions.items():
+            if text.strip():
+              yield kind, key, 'pokedex_entries', f'{generation["name"]} {"／".join(names)}', text
+
+def encode_strings(values):
+  blobs = [value.encode('utf-8') for value in values]
+  offsets = np.zeros(len(blobs) + 1, dtype=np.uint64)
+  offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+  return np.frombuffer(b''.join(blobs), dtype=np.uint8), offsets
+
+def build_index(data_path=PATH, index_path=INDEX_PATH):
+  documents = []
+  texts = []
+  lengths = []
+  postings = {}
+  for doc_id, (kind, key, field, context, text) in enumerate(iter_documents(data_path)):
+    tokens = tokenize(text, unigrams=True)
+    documents.append([kind, key, field, context])
+    texts.append(text)
+    lengths.append(len(tokens))
+    for term, tf in Counter(tokens).items():
+      postings.setdefault(term, []).append((doc_id, tf))
+
+  # 按 UTF-8 字节排序，查询时直接在字节串上二分
+  terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+  offsets = [0]
+  doc_ids = []
+  tfs = []
+  for term in terms:
+    for doc_id, tf in postings[term]:
+      doc_ids.append(doc_id)
+      tfs.append(tf)
+    offsets.append(len(doc_ids))
+
+  term_blob, term_offsets = encode_strings(terms)
+  text_blob, text_offsets = encode_strings(texts)
+  meta = {
+    'source': get_source(data_path, SOURCES),
+    'documents': documents,
+    'average_length': sum(lengths) / max(len(lengths), 1),
+  }
+  write_arrays(index_path, meta, {
+    'terms': term_blob,
+    'term_offsets': term_offsets,
+    'postings': np.array(offsets, dtype=np.uint32),
+    'doc_ids': np.array(doc_ids, dtype=np.uint32),
+    'tfs': np.array(tfs, dtype=np.uint16),
+    'lengths': np.array(lengths, dtype=np.uint32),
+    'texts': text_blob,
+    'text_offsets': text_offsets,
+  })
+  return index_path
+
+class FullTextIndex:
+  def __init__(self, index_path=INDEX_PATH):
+    self.meta, self.arrays = read_arrays(index_path)
+    self.terms = self.arrays['terms']
+    self.term_offsets = self.arrays['term_offsets']
+    self.term_count = len(self.term_offsets) - 1
+    self.lengths = self.arrays['lengths'].astype(np.float32)
+    self.document_count = len(self.lengths)
+    self.length_norm = K1 * (1 - B + B * self.lengths / self.meta['average_length'])
+    self.kinds = np.array([document[0] for document in self.meta['documents']])
+
+  def get_term(self, i):
+    return self.terms[self.term_offsets[i]:self.term_offsets[i + 1]].tobytes()
+
+  def find_term(self, term):
+    target = term.encode('utf-8')
+    lo, hi = 0, self.term_count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if self.get_term(mid) < target:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo if lo < self.term_count and self.get_term(lo) == target else None
+
+  def get_text(self, doc_id):
+    offsets = self.arrays['text_offsets']
+    return self.arrays['texts'][offsets[doc_id]:offsets[doc_id + 1]].tobytes().decode('utf-8')
+
+  # BM25 排序，返回 [{kind, key, field, context, score, text}]
+  def search(self, query, limit=10, kind=None):
+    scores = np.zeros(self.document_count, dtype=np.float32)
+    postings = self.arrays['postings']
+    for term in set(tokenize(query)):
+      i = self.find_term(term)
+      if i is None:
+        continue
+      doc_ids = self.arrays['doc_ids'][postings[i]:postings[i + 1]]
+      tfs = self.arrays['tfs'][postings[i]:postings[i + 1]].astype(np.float32)
+      idf = math.log(1 + (self.document_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+      scores[doc_ids] += idf * tfs * (K1 + 1) / (tfs + self.length_norm[doc_ids])
+
+    if kind:
+      scores[self.kinds != kind] = 0
+    candidates = np.flatnonzero(scores)
+    if len(candidates) > limit:
+      candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    hits = []
+    for doc_id in candidates:
+      kind_name, key, field, context = self.meta['documents'][doc_id]
+      hits.append({
+        'kind': kind_name,
+        'key': key,
+        'field': field,
+        'context': context,
+        'score': float(scores[doc_id]),
+        'text': self.get_text(doc_id),
+      })
+    return hits
+
+# 索引不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(index_path=INDEX_PATH, data_path=PATH):
+  if not is_current(index_path, get_source(data_path, SOURCES)):
+    build_index(data_path, index_path)
+  return FullTextIndex(index_path)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='构建或查询图鉴介绍、招式和特性说明的全文索引')
+  parser.add_argument('command', choices=['build', 'search'])
+  parser.add_argument('query', nargs='?')
+  parser.add_argument('--limit', type=int, default=10)
+  parser.add_argument('--kind', choices=list(TEXT_FIELDS))
+  parser.add_argument('--index', default=INDEX_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    build_index(index_path=args.index)
+    print(f'{args.index}: {os.path.getsize(args.index) / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s')
+  else:
+    index = load(args.index)
+    start = time.perf_counter()
+    hits = index.search(args.query, args.limit, args.kind)
+    elapsed = time.perf_counter() - start
+    for hit in hits:
+      context = f' [{hit["context"]}]' if hit['context'] else ''
+      print(f'{hit["score"]:6.2f} {hit["kind"]}/{hit["key"]} {hit["field"]}{context}: {hit["text"][:60]}')
+    print(f'{len(hits)} hits in {elapsed * 1000:.2f} ms')
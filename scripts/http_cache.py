@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 命中缓存只更新内存中的访问时间，index.json 至多每隔这么多秒写一次，其余由 store 或 flush 写出
+INDEX_SAVE_INTERVAL = 30
+
+class OfflineCacheMiss(Exception):
+  pass
+
+# 按 URL 缓存页面：正文 gzip 压缩存盘，记录 ETag / Last-Modified 用于条件请求，超出容量时按最近访问时间淘汰
+class ResponseCache:
+  def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+    self.offline = offline
+    self.index_path = os.path.join(cache_dir, 'index.json')
+    self.lock = threading.Lock()
+    self.dirty = False
+    self.saved = time.monotonic()
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(self.index_path):
+      with open(self.index_path, 'r', encoding='utf-8') as f:
+        self.index = json.load(f)
+    else:
+      self.index = {}
+
+  def get_body_path(self, url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(self.cache_dir, f'{key}.html.gz')
+
+  def read(self, url):
+    with open(self.get_body_path(url), 'rb') as f:
+      return gzip.decompress(f.read()).decode('utf-8')
+
+  # 读取缓存的正文；正文文件已被删除或损坏时去掉该条目，返回 None
+  def read_cached(self, url):
+    try:
+      text = self.read(url)
+    except (OSError, EOFError):
+      with self.lock:
+        if self.index.pop(url, None) is not None:
+          self.dirty = True
+      return None
+    self.touch(url)
+    return text
+
+  def fetch(self, session, url, headers=None, timeout=30):
+    with self.lock:
+      entry = self.index.get(url)
+    if self.offline:
+      text = self.read_cached(url) if entry else None
+      if text is None:
+        raise OfflineCacheMiss(url)
+      return text
+
+    request_headers = dict(headers or {})
+    if entry and entry.get('etag'):
+      request_headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+      request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = session.get(url, headers=request_headers, timeout=timeout)
+    if response.status_code == 304:
+      text = self.read_cached(url) if entry else None
+      if text is not None:
+        return text
+      # 本地没有可用的正文，改发不带条件的请求
+      response = session.get(url, headers=headers, timeout=timeout)
+      if response.status_code == 304:
+        raise requests.HTTPError(f'304 Not Modified without a cached body for url: {url}', response=response)
+    response.raise_for_status()
+    self.store(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.text
+
+  def touch(self, url):
+    with self.lock:
+      if url in self.index:
+        self.index[url]['accessed'] = time.time()
+        self.dirty = True
+        if time.monotonic() - self.saved >= INDEX_SAVE_INTERVAL:
+          self.save_index()
+
+  # 写出尚未保存的访问时间，批量抓取结束时调用
+  def flush(self):
+    with self.lock:
+      if self.dirty:
+        self.save_index()
+
+  def store(self, url, text, etag=None, last_modified=None):
+    body = gzip.compress(text.encode('utf-8'))
+    path = self.get_body_path(url)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+      f.write(body)
+    os.replace(tmp_path, path)
+    with self.lock:
+      self.index[url] = {
+        'etag': etag,
+        'last_modified': last_modified,
+        'size': len(body),
+        'accessed': time.time()
+      }
+      self.evict()
+      self.save_index()
+
+  def evict(self):
+    total = sum(entry['size'] for entry in self.index.values())
+    for url in sorted(self.index, key=lambda u: self.index[u]['accessed']):
+      if total <= self.max_bytes:
+        break
+      total -= self.index.pop(url)['size']
+      path = self.get_body_path(url)
+      if os.path.exists(path):
+        os.remove(path)
+
+  def save_index(self):
+    tmp_path = f'{self.index_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      json.dump(self.index, f, ensure_ascii=False)
+    os.replace(tmp_path, self.index_path)
+    self.dirty = False
+    self.saved = time.monotonic()
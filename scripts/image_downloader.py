@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+  from PIL import Image
+except ImportError:
+  Image = None
+
+from batch_pokemon import RETRY_STATUS, TokenBucket, create_session, fetch_with_retry, get_retry_after, select_pokemon
+from http_cache import DEFAULT_MAX_BYTES, ResponseCache
+from pokemon import BASE_URL, DEFAULT_PARSER, PARSERS, PATH, parse_pokemon_images
+
+IMAGE_PATH = f'{PATH}/images'
+IMAGE_MANIFEST_PATH = f'{PATH}/raw/images.json'
+# 每下载这么多张保存一次 manifest，中断后从这里继续
+SAVE_EVERY = 50
+
+class ImageError(Exception):
+  pass
+
+# 只读文件头取宽高，不依赖 Pillow；支持 PNG、GIF、JPEG 和 WebP（VP8/VP8L/VP8X）
+def get_image_size(data):
+  if data.startswith(b'\x89PNG\r\n\x1a\n') and data[12:16] == b'IHDR':
+    return struct.unpack('>II', data[16:24])
+  if data[:6] in (b'GIF87a', b'GIF89a'):
+    return struct.unpack('<HH', data[6:10])
+  if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+      width, height = struct.unpack('<HH', data[26:30])
+      return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L':
+      bits = int.from_bytes(data[21:25], 'little')
+      return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b'VP8X':
+      return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+  if data.startswith(b'\xff\xd8'):
+    position = 2
+    while position + 9 < len(data):
+      if data[position] != 0xff:
+        position += 1
+        continue
+      marker = data[position + 1]
+      length = struct.unpack('>H', data[position + 2:position + 4])[0]
+      if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+        height, width = struct.unpack('>HH', data[position + 5:position + 9])
+        return width, height
+      position += 2 + length
+  return None
+
+# 有 Pillow 时完整解码一遍，否则只检查文件头中的尺寸
+def verify_image(data):
+  if Image is not None:
+    try:
+      with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        size = image.size
+    except Exception as e:
+      raise ImageError(f'cannot decode image: {e}')
+  else:
+    size = get_image_size(data)
+  if not size or min(size) <= 0:
+    raise ImageError('cannot read image dimensions')
+  return size
+
+def hash_file(path):
+  digest = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+def load_image_manifest(path=IMAGE_MANIFEST_PATH):
+  if not os.path.exists(path):
+    return {}
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+def save_image_manifest(manifest, path=IMAGE_MANIFEST_PATH):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  tmp_path = f'{path}.tmp'
+  with open(tmp_path, 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+  os.replace(tmp_path, path)
+
+# 文件存在且大小、哈希都与 manifest 一致时跳过
+def is_current(path, entry, check_hash=True):
+  if not entry or not os.path.exists(path) or os.path.getsize(path) != entry['bytes']:
+    return False
+  return not check_hash or hash_file(path) == entry['sha256']
+
+# 把图片地址的协议和域名换成 host，用于指向本地的测试服务器
+def rewrite_url(url, host=None):
+  if not host:
+    return url
+  parts = urlsplit(url)
+  return host.rstrip('/') + parts.path + (f'?{parts.query}' if parts.query else '')
+
+def fetch_image(url, session, bucket, retries=4, backoff=1.0, timeout=30):
+  for attempt in range(retries + 1):
+    bucket.acquire()
+    try:
+      response = session.get(url, timeout=timeout)
+      response.raise_for_status()
+      data = response.content
+      return data, verify_image(data)
+    except requests.HTTPError as e:
+      if e.response is None or e.response.status_code not in RETRY_STATUS or attempt == retries:
+        raise
+      delay = get_retry_after(e.response) or backoff * 2 ** attempt
+    # 传输中断（实际长度小于 Content-Length）与连接错误一样重试
+    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, ImageError):
+      if attempt == retries:
+        raise
+      delay = backoff * 2 ** attempt
+    time.sleep(delay + random.uniform(0, backoff))
+
+# 先写临时文件再改名，中断时不会留下半张图片
+def write_atomic(path, data):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  tmp_path = f'{path}.{threading.get_ident()}.tmp'
+  with open(tmp_path, 'wb') as f:
+    f.write(data)
+  os.replace(tmp_path, path)
+
+def download_image(image, session, bucket, image_path=IMAGE_PATH, host=None, retries=4, backoff=1.0):
+  data, (width, height) = fetch_image(rewrite_url(image['url'], host), session, bucket, retries, backoff)
+  write_atomic(os.path.join(image_path, image['path']), data)
+  return {
+    'url': image['url'],
+    'bytes': len(data),
+    'sha256': hashlib.sha256(data).hexdigest(),
+    'width': width,
+    'height': height,
+  }
+
+# images 为 [{'path', 'url'}]，path 相对于 image_path；manifest 会被就地更新
+def download_images(images, image_path=IMAGE_PATH, manifest=None, manifest_path=IMAGE_MANIFEST_PATH, concurrency=8,
+                    rate=5.0, host=None, retries=4, backoff=1.0, check_hash=True, force=False):
+  manifest = {} if manifest is None else manifest
+  summary = {'downloaded': 0, 'skipped': 0, 'failed': []}
+  pending = []
+  for image in {image['path']: image for image in images}.values():
+    entry = manifest.get(image['path'])
+    if not force and entry and entry['url'] == image['url'] and \
+        is_current(os.path.join(image_path, image['path']), entry, check_hash):
+      summary['skipped'] += 1
+    else:
+      pending.append(image)
+
+  session = create_session(concurrency)
+  bucket = TokenBucket(rate, capacity=concurrency)
+  with ThreadPoolExecutor(max_workers=concurrency) as pool:
+    futures = {
+      pool.submit(download_image, image, session, bucket, image_path, host, retries, backoff): image
+      for image in pending
+    }
+    for future in as_completed(futures):
+      image = futures[future]
+      try:
+        manifest[image['path']] = future.result()
+        summary['downloaded'] += 1
+      except Exception as e:
+        print(f'[Error] Failed to download {image["path"]}: {e}')
+        summary['failed'].append(image['path'])
+        continue
+      if manifest_path and summary['downloaded'] % SAVE_EVERY == 0:
+        save_image_manifest(manifest, manifest_path)
+
+  session.close()
+  if manifest_path:
+    save_image_manifest(manifest, manifest_path)
+  return summary
+
+# 抓取页面并找出其中的图片，页面走与 batch_pokemon 相同的缓存
+def collect_images(target_list, base_url=BASE_URL, concurrency=4, rate=2.0, workers=None, parser=DEFAULT_PARSER,
+                   retries=4, backoff=1.0, cache=None):
+  session = create_session(concurrency)
+  bucket = TokenBucket(rate, capacity=concurrency)
+  images = []
+  with ThreadPoolExecutor(max_workers=concurrency) as fetch_pool, ProcessPoolExecutor(max_workers=workers) as parse_pool:
+    fetch_futures = {
+      fetch_pool.submit(fetch_with_retry, p['name_zh'], session, bucket, base_url, retries, backoff, cache): p
+      for p in target_list
+    }
+    parse_futures = {}
+    for future in as_completed(fetch_futures):
+      pokemon = fetch_futures[future]
+      try:
+        html = future.result()
+      except Exception as e:
+        print(f'[Error] Failed to fetch {pokemon["name_zh"]}: {e}')
+        continue
+      parse_futures[parse_pool.submit(parse_pokemon_images, html, pokemon['name_zh'], pokemon['index'], parser)] = pokemon
+    for future in as_completed(parse_futures):
+      pokemon = parse_futures[future]
+      try:
+        images.extend(future.result())
+      except Exception as e:
+        print(f'[Error] Failed to parse {pokemon["name_zh"]}: {e}')
+  session.close()
+  return images
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='并发下载宝可梦页面中的官方图和 HOME 图片，可中断后继续')
+  parser.add_argument('target', nargs='+', help='<start_id> [end_id] | <pokemon_name> | all')
+  parser.add_argument('--output', default=IMAGE_PATH)
+  parser.add_argument('--manifest', default=IMAGE_MANIFEST_PATH)
+  parser.add_argument('--base-url', default=BASE_URL, help='页面地址，可指向本地服务器以离线测试')
+  parser.add_argument('--image-host', help='替换图片地址的协议和域名，如 http://127.0.0.1:8000')
+  parser.add_argument('--concurrency', type=int, default=8, help='同时进行的下载数')
+  parser.add_argument('--rate', type=float, default=5.0, help='下载图片时每秒最多请求数，0 表示不限速')
+  parser.add_argument('--page-concurrency', type=int, default=4, help='抓取页面时同时进行的请求数')
+  parser.add_argument('--page-rate', type=float, default=2.0, help='抓取页面时每秒最多请求数，0 表示不限速')
+  parser.add_argument('--workers', type=int, default=None, help='解析进程数，默认为 CPU 核数')
+  parser.add_argument('--parser', choices=PARSERS, default=DEFAULT_PARSER)
+  parser.add_argument('--retries', type=int, default=4)
+  parser.add_argument('--backoff', type=float, default=1.0)
+  parser.add_argument('--no-hash-check', action='store_true', help='只比较文件大小，不重新计算哈希')
+  parser.add_argument('--force', action='store_true', help='重新下载全部图片')
+  parser.add_argument('--cache-dir', default=f'{PATH}/raw/cache', help='页面缓存目录')
+  parser.add_argument('--no-cache', action='store_true')
+  parser.add_argument('--offline', action='store_true', help='页面只使用本地缓存')
+  args = parser.parse_args()
+  cache = None if args.no_cache else ResponseCache(args.cache_dir, DEFAULT_MAX_BYTES, args.offline)
+
+  with open(f'{PATH}/simple_pokedex.json', 'r', encoding='utf-8') as f:
+    pokemon_list = json.load(f)
+  target_list = select_pokemon(pokemon_list, args.target)
+  images = collect_images(target_list, args.base_url, args.page_concurrency, 0 if args.offline else args.page_rate,
+                          args.workers, args.parser, args.retries, args.backoff, cache)
+  if cache:
+    cache.flush()
+  print(f'Found {len(images)} images in {len(target_list)} pages.')
+
+  summary = download_images(images, args.output, load_image_manifest(args.manifest), args.manifest, args.concurrency,
+                            args.rate, args.image_host, args.retries, args.backoff, not args.no_hash_check, args.force)
+  print(f'Image download complete. downloaded: {summary["downloaded"]}, skipped: {summary["skipped"]}, '
+        f'failed: {len(summary["failed"])}')
+  if summary['failed']:
+    print('Failed: ' + ', '.join(summary['failed']))
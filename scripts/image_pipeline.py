@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+  from PIL import Image, features
+except ImportError:
+  Image = None
+
+from pokemon_dataset import BUILD_PATH, PATH
+
+IMAGE_PATH = os.path.join(PATH, 'images')
+OUTPUT_PATH = os.path.join(BUILD_PATH, 'images')
+# 参与构建的图片目录；sprites.webp、types.webp 本身已经是图集
+DIRECTORIES = ['official', 'home', 'dream', 'items']
+SIZES = [48, 96, 192]
+FORMATS = ['webp', 'avif']
+ATLAS_SIZE = 48
+ATLAS_MAX_WIDTH = 2048
+ATLAS_MAX_HEIGHT = 2048
+
+# 按文件头判断真实格式，官方图等文件虽然以 .png 结尾，实际是 WebP
+def sniff_format(header):
+  if header.startswith(b'\x89PNG\r\n\x1a\n'):
+    return 'png'
+  if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+    return 'webp'
+  if header.startswith(b'\xff\xd8\xff'):
+    return 'jpeg'
+  if header[:6] in (b'GIF87a', b'GIF89a'):
+    return 'gif'
+  if header[4:8] == b'ftyp' and header[8:12] in (b'avif', b'avis'):
+    return 'avif'
+  return None
+
+def hash_file(path):
+  digest = hashlib.sha256()
+  with open(path, 'rb') as f:
+    header = f.read(16)
+    digest.update(header)
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      digest.update(chunk)
+  return digest.hexdigest(), sniff_format(header)
+
+def iter_images(image_path=IMAGE_PATH, directories=DIRECTORIES):
+  for directory in directories:
+    for name in sorted(os.listdir(os.path.join(image_path, directory))):
+      if not name.startswith('.'):
+        yield f'{directory}/{name}'
+
+# 内容寻址存储：相同内容只保存一份，文件名为 sha256 加正确的扩展名
+# 能建硬链接时不复制文件
+def store_asset(source, target):
+  if os.path.exists(target):
+    return
+  os.makedirs(os.path.dirname(target), exist_ok=True)
+  tmp_path = f'{target}.tmp'
+  try:
+    os.link(source, tmp_path)
+  except OSError:
+    shutil.copyfile(source, tmp_path)
+  os.replace(tmp_path, target)
+
+def get_asset_path(digest, image_format, output_path=OUTPUT_PATH):
+  return os.path.join(output_path, 'assets', digest[:2], f'{digest}.{image_format}')
+
+def get_thumbnail_path(digest, size, image_format, output_path=OUTPUT_PATH):
+  return os.path.join(output_path, 'thumbnails', str(size), digest[:2], f'{digest}.{image_format}')
+
+# 缩放到 size x size 之内并居中放到透明的正方形画布上，方便拼成固定格子的图集
+def make_square(image, size):
+  image = image.convert('RGBA')
+  image.thumbnail((size, size), Image.LANCZOS)
+  canvas = Image.new('RGBA', (size, size))
+  canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+  return canvas
+
+def get_formats(formats=FORMATS):
+  return [image_format for image_format in formats if image_format != 'avif' or features.check('avif')]
+
+def write_thumbnails(args):
+  source, digest, sizes, formats, output_path = args
+  written = 0
+  with Image.open(source) as image:
+    image.load()
+    for size in sizes:
+      thumbnail = None
+      for image_format in formats:
+        target = get_thumbnail_path(digest, size, image_format, output_path)
+        if os.path.exists(target):
+          continue
+        if thumbnail is None:
+          thumbnail = make_square(image, size)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f'{target}.tmp'
+        thumbnail.save(tmp_path, format=image_format.upper(), quality=80)
+        os.replace(tmp_path, target)
+        written += 1
+  return written
+
+# 图集中的偏移以格子为单位，与 national.json 的 icon 一致（如 '-3em 0'），font-size 设为格子边长即可
+def get_icon(column, row):
+  return ' '.join(f'-{n}em' if n else '0' for n in (column, row))
+
+# 把某个目录的缩略图按固定格子拼成若干张图集，索引中记录每张图的位置
+# entries 为 (文件名, sha256)，内容相同的文件共用一个格子；格子直接取已生成的缩略图，不再解码原图
+def build_atlases(directory, entries, size=ATLAS_SIZE, output_path=OUTPUT_PATH, image_format='webp',
+                  thumbnail_format='webp'):
+  columns = ATLAS_MAX_WIDTH // size
+  per_sheet = columns * (ATLAS_MAX_HEIGHT // size)
+  digests = list(dict.fromkeys(digest for name, digest in entries))
+  cells = {}
+  sheets = []
+  for start in range(0, len(digests), per_sheet):
+    chunk = digests[start:start + per_sheet]
+    rows = (len(chunk) + columns - 1) // columns
+    sheet = Image.new('RGBA', (min(len(chunk), columns) * size, rows * size))
+    sheet_name = f'{directory}-{size}-{len(sheets)}.{image_format}'
+    for i, digest in enumerate(chunk):
+      column, row = i % columns, i // columns
+      with Image.open(get_thumbnail_path(digest, size, thumbnail_format, output_path)) as thumbnail:
+        sheet.paste(thumbnail, (column * size, row * size))
+      cells[digest] = {'sheet': sheet_name, 'x': column * size, 'y': row * size, 'width': size, 'height': size,
+                       'icon': get_icon(column, row)}
+    path = os.path.join(output_path, 'atlases', sheet_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sheet.save(path, format=image_format.upper(), quality=80)
+    sheets.append(sheet_name)
+  return {name: cells[digest] for name, digest in entries}
+
+# thumbnails 为 False 时只去重，不生成缩略图和图集；需要缩略图而没有安装 Pillow 时报错
+def build_images(image_path=IMAGE_PATH, output_path=OUTPUT_PATH, sizes=SIZES, formats=FORMATS,
+                 atlas_size=ATLAS_SIZE, workers=None, thumbnails=True):
+  if thumbnails and Image is None:
+    raise RuntimeError('Pillow is required for thumbnails and atlases: pip install Pillow, or build with --no-thumbnails')
+  if thumbnails:
+    formats = get_formats(formats)
+    if not formats:
+      raise RuntimeError('none of the requested thumbnail formats is supported by this Pillow build')
+    # 图集由缩略图拼成，图集尺寸的缩略图总要生成
+    sizes = sorted(set(sizes) | {atlas_size})
+  else:
+    sizes, formats = [], []
+  assets = {}
+  files = {}
+  for name in iter_images(image_path):
+    source = os.path.join(image_path, name)
+    digest, image_format = hash_file(source)
+    image_format = image_format or os.path.splitext(name)[1].lstrip('.').lower()
+    files[name] = digest
+    if digest not in assets:
+      assets[digest] = {'format': image_format, 'bytes': os.path.getsize(source), 'source': source, 'files': []}
+      store_asset(source, get_asset_path(digest, image_format, output_path))
+    assets[digest]['files'].append(name)
+
+  summary = {'files': len(files), 'assets': len(assets), 'thumbnails': 0, 'atlases': {}}
+  if thumbnails:
+    jobs = [(asset['source'], digest, sizes, formats, output_path) for digest, asset in assets.items()]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      summary['thumbnails'] = sum(executor.map(write_thumbnails, jobs, chunksize=16))
+    for directory in DIRECTORIES:
+      entries = [(name, digest) for name, digest in files.items() if name.startswith(f'{directory}/')]
+      atlas_index = build_atlases(directory, entries, atlas_size, output_path, thumbnail_format=formats[0])
+      with open(os.path.join(output_path, 'atlases', f'{directory}-{atlas_size}.json'), 'w', encoding='utf-8') as f:
+        json.dump(atlas_index, f, ensure_ascii=False, indent=2)
+      summary['atlases'][directory] = len({entry['sheet'] for entry in atlas_index.values()})
+
+  manifest = {
+    'sizes': sizes,
+    'formats': formats,
+    'files': files,
+    'assets': {digest: {key: asset[key] for key in ['format', 'bytes', 'files']} for digest, asset in assets.items()},
+  }
+  os.makedirs(output_path, exist_ok=True)
+  with open(os.path.join(output_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, ensure_ascii=False, indent=2)
+  return summary
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='图片去重、生成固定尺寸缩略图并拼成图集')
+  parser.add_argument('--output', default=OUTPUT_PATH)
+  parser.add_argument('--size', type=int, action='append', help=f'缩略图边长，默认 {SIZES}')
+  parser.add_argument('--format', action='append', choices=FORMATS, help=f'缩略图格式，默认 {FORMATS}')
+  parser.add_argument('--atlas-size', type=int, default=ATLAS_SIZE)
+  parser.add_argument('--workers', type=int)
+  parser.add_argument('--no-thumbnails', action='store_true', help='只去重，不生成缩略图和图集（无需安装 Pillow）')
+  args = parser.parse_args()
+
+  if Image is None and not args.no_thumbnails:
+    parser.error('Pillow is not installed: pip install Pillow, or pass --no-thumbnails to only deduplicate images')
+  start = time.perf_counter()
+  summary = build_images(output_path=args.output, sizes=args.size or SIZES, formats=args.format or FORMATS,
+                         atlas_size=args.atlas_size, workers=args.workers, thumbnails=not args.no_thumbnails)
+  print(f'{summary["files"]} files -> {summary["assets"]} unique assets, {summary["thumbnails"]} thumbnails, '
+        f'atlases {summary["atlases"]} in {time.perf_counter() - start:.1f}s -> {args.output}')
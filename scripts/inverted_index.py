@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import time
+from functools import reduce
+
+import numpy as np
+
+from array_pack import is_current, read_arrays, write_arrays
+from normalize_moves import NAME_SUFFIX_RE, find_move_id, get_move_ids, load_move_table
+from pokemon_dataset import BUILD_PATH, PATH, get_source, iter_json_dir
+
+INDEX_PATH = os.path.join(BUILD_PATH, 'inverted_index.bin')
+# 构建索引所用的数据
+SOURCES = ['pokemon', 'move_list.json']
+
+# 学习方式编号
+METHODS = ['level', 'machine', 'egg']
+LEARNSET_FIELDS = [
+  ('learnable_moves', 'level', 'level'),
+  ('machine_moves', 'machine', 'machine'),
+  ('egg_moves', 'egg', None),
+]
+
+class StringTable:
+  def __init__(self):
+    self.values = []
+    self.ids = {}
+
+  def get_id(self, value):
+    if value not in self.ids:
+      self.ids[value] = len(self.values)
+      self.values.append(value)
+    return self.ids[value]
+
+# 词 -> 若干条记录，转成按词排序的 CSR 结构：terms、offsets 和按第一列排序的 postings
+def to_csr(postings, columns):
+  terms = sorted(postings)
+  offsets = [0]
+  rows = []
+  for term in terms:
+    entries = sorted(set(postings[term]))
+    rows.extend(entries)
+    offsets.append(len(rows))
+  arrays = {'offsets': np.array(offsets, dtype=np.uint32)}
+  for i, (name, dtype) in enumerate(columns):
+    arrays[name] = np.array([row[i] for row in rows], dtype=dtype)
+  return terms, arrays
+
+# 学习表中的招式名可能带有注记（如 '挠痒*'、'泪眼汪汪USUM'），统一为招式表中的名称
+def get_move_name(name, moves, move_ids):
+  move_id = find_move_id(name, move_ids)
+  return moves[move_id]['name'] if move_id is not None else NAME_SUFFIX_RE.sub('', name)
+
+def build_index(data_path=PATH, index_path=INDEX_PATH):
+  species = {}
+  forms = []
+  labels = StringTable()
+  details = StringTable()
+  move_entries = {}
+  ability_forms = {}
+  type_forms = {}
+  egg_group_forms = {}
+  moves = load_move_table(data_path)
+  move_ids = get_move_ids(moves)
+
+  for key, record in iter_json_dir('pokemon', data_path):
+    species_id = int(record['pokedex_id'])
+    species[species_id] = record['name_zh']
+    for form in record['forms']:
+      form_id = len(forms)
+      forms.append([species_id, form['name']])
+      for ability in form['abilities']:
+        ability_forms.setdefault(ability['name'], []).append((form_id, species_id, int(ability['is_hidden'])))
+      for type_name in form['types']:
+        type_forms.setdefault(type_name, []).append((form_id, species_id))
+      for egg_group in form['egg_groups']:
+        egg_group_forms.setdefault(egg_group, []).append((form_id, species_id))
+
+    for field, method, detail_field in LEARNSET_FIELDS:
+      for group in record[field]:
+        label_id = labels.get_id(group['form'])
+        for row in group['data']:
+          detail_id = details.get_id(row.get(detail_field, '') if detail_field else '')
+          move_name = get_move_name(row['name'], moves, move_ids)
+          move_entries.setdefault(move_name, []).append((species_id, label_id, METHODS.index(method), detail_id))
+
+  meta = {
+    'source': get_source(data_path, SOURCES),
+    'species': {str(k): v for k, v in species.items()},
+    'forms': forms,
+    'labels': labels.values,
+    'details': details.values,
+    'terms': {}
+  }
+  arrays = {}
+  kinds = [
+    ('move_entries', move_entries, [('species', np.uint16), ('label', np.uint16), ('method', np.uint8), ('detail', np.uint16)]),
+    ('move_species', {k: [(v[0],) for v in entries] for k, entries in move_entries.items()}, [('species', np.uint16)]),
+    ('ability_forms', ability_forms, [('form', np.uint16), ('species', np.uint16), ('hidden', np.uint8)]),
+    ('ability_species', {k: [(v[1],) for v in entries] for k, entries in ability_forms.items()}, [('species', np.uint16)]),
+    ('type_forms', type_forms, [('form', np.uint16), ('species', np.uint16)]),
+    ('type_species', {k: [(v[1],) for v in entries] for k, entries in type_forms.items()}, [('species', np.uint16)]),
+    ('egg_group_forms', egg_group_forms, [('form', np.uint16), ('species', np.uint16)]),
+    ('egg_group_species', {k: [(v[1],) for v in entries] for k, entries in egg_group_forms.items()}, [('species', np.uint16)]),
+  ]
+  for kind, postings, columns in kinds:
+    terms, csr = to_csr(postings, columns)
+    meta['terms'][kind] = terms
+    for name, values in csr.items():
+      arrays[f'{kind}.{name}'] = values
+
+  write_arrays(index_path, meta, arrays)
+  return index_path
+
+class InvertedIndex:
+  def __init__(self, index_path=INDEX_PATH):
+    self.meta, self.arrays = read_arrays(index_path)
+    self.term_ids = {kind: {term: i for i, term in enumerate(terms)} for kind, terms in self.meta['terms'].items()}
+    self.form_species = np.array([species_id for species_id, name in self.meta['forms']], dtype=np.uint16)
+
+  def postings(self, kind, term, column):
+    i = self.term_ids[kind].get(term)
+    if i is None:
+      return self.arrays[f'{kind}.{column}'][:0]
+    offsets = self.arrays[f'{kind}.offsets']
+    return self.arrays[f'{kind}.{column}'][offsets[i]:offsets[i + 1]]
+
+  def species_name(self, species_id):
+    return self.meta['species'][str(int(species_id))]
+
+  def form(self, form_id):
+    species_id, name = self.meta['forms'][int(form_id)]
+    return {'species_id': species_id, 'name': name}
+
+  # 可以学会某招式的宝可梦，包括学习方式、等级或招式学习器
+  def learners(self, move):
+    species = self.postings('move_entries', move, 'species')
+    labels = self.postings('move_entries', move, 'label')
+    methods = self.postings('move_entries', move, 'method')
+    details = self.postings('move_entries', move, 'detail')
+    result = []
+    for i in range(len(species)):
+      method = METHODS[methods[i]]
+      result.append({
+        'species_id': int(species[i]),
+        'name': self.species_name(species[i]),
+        'form': self.meta['labels'][labels[i]],
+        'method': method,
+        'level': self.meta['details'][details[i]] if method == 'level' else None,
+        'machine': self.meta['details'][details[i]] if method == 'machine' else None,
+      })
+    return result
+
+  def holders(self, ability, hidden=None):
+    forms = self.postings('ability_forms', ability, 'form')
+    flags = self.postings('ability_forms', ability, 'hidden')
+    return [{**self.form(form_id), 'is_hidden': bool(flag)}
+            for form_id, flag in zip(forms, flags) if hidden is None or bool(flag) == hidden]
+
+  def forms_with_type(self, type_name):
+    return [self.form(form_id) for form_id in self.postings('type_forms', type_name, 'form')]
+
+  def forms_in_egg_group(self, egg_group):
+    return [self.form(form_id) for form_id in self.postings('egg_group_forms', egg_group, 'form')]
+
+  # 多个条件取交集，返回满足全部条件的全国图鉴编号；特性、属性、蛋群须由同一个形态满足，
+  # 先按形态取交集再映射到宝可梦，招式表按宝可梦记录，最后与之取交集
+  def search(self, moves=(), abilities=(), types=(), egg_groups=()):
+    form_lists = [np.unique(self.postings('ability_forms', term, 'form')) for term in abilities]
+    form_lists += [self.postings('type_forms', term, 'form') for term in types]
+    form_lists += [self.postings('egg_group_forms', term, 'form') for term in egg_groups]
+    lists = [self.postings('move_species', term, 'species') for term in moves]
+    if form_lists:
+      form_lists.sort(key=len)
+      forms = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), form_lists)
+      lists.append(np.unique(self.form_species[forms]))
+    if not lists:
+      return []
+    lists.sort(key=len)
+    result = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+    return [int(species_id) for species_id in result]
+
+# 索引不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(index_path=INDEX_PATH, data_path=PATH):
+  if not is_current(index_path, get_source(data_path, SOURCES)):
+    build_index(data_path, index_path)
+  return InvertedIndex(index_path)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='构建或查询招式、特性、属性、蛋群的倒排索引')
+  parser.add_argument('command', choices=['build', 'search'])
+  parser.add_argument('--move', action='append', default=[])
+  parser.add_argument('--ability', action='append', default=[])
+  parser.add_argument('--type', action='append', default=[])
+  parser.add_argument('--egg-group', action='append', default=[])
+  parser.add_argument('--index', default=INDEX_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    build_index(index_path=args.index)
+    print(f'{args.index}: {os.path.getsize(args.index) / 1024:.0f} KB in {time.perf_counter() - start:.1f}s')
+  else:
+    index = load(args.index)
+    start = time.perf_counter()
+    result = index.search(args.move, args.ability, args.type, args.egg_group)
+    elapsed = time.perf_counter() - start
+    print(json.dumps([f'{species_id:04d}-{index.species_name(species_id)}' for species_id in result], ensure_ascii=False))
+    print(f'{len(result)} results in {elapsed * 1000:.3f} ms')
@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import zlib
+
+def get_pokemon_key(data):
+  return f'{data["index"]}-{data["name"]}'
+
+CHUNK_SIZE = 4096
+
+# 解压一个 gzip 数据块，返回 (解出的内容, 剩余数据, 是否完整)；出错时逐字节重试该段，尽量保留出错位置之前的内容
+def decompress_member(raw):
+  decompressor = zlib.decompressobj(31)
+  output = b''
+  for start in range(0, len(raw), CHUNK_SIZE):
+    chunk = raw[start:start + CHUNK_SIZE]
+    backup = decompressor.copy()
+    try:
+      output += decompressor.decompress(chunk)
+    except zlib.error:
+      decompressor = backup
+      for i in range(len(chunk)):
+        try:
+          output += decompressor.decompress(chunk[i:i + 1])
+        except zlib.error:
+          break
+      return output, b'', False
+    if decompressor.eof:
+      return output, decompressor.unused_data + raw[start + CHUNK_SIZE:], True
+  return output, b'', decompressor.eof
+
+# 读取 gzip 压缩的 JSONL，遇到崩溃留下的不完整结尾时停止，只返回完整的行
+# 文件可能由多个 gzip 数据块组成（每次续写追加一个）
+def read_jsonl(path):
+  with open(path, 'rb') as f:
+    raw = f.read()
+  text = b''
+  while raw:
+    output, raw, complete = decompress_member(raw)
+    text += output
+    if not complete:
+      break
+
+  records = []
+  for line in text.split(b'\n')[:-1]:
+    try:
+      records.append(json.loads(line))
+    except json.JSONDecodeError:
+      break
+  return records
+
+def iter_jsonl(path):
+  with gzip.open(path, 'rt', encoding='utf-8') as f:
+    for line in f:
+      yield json.loads(line)
+
+# 每完成一只宝可梦就追加一行并立即刷新到磁盘；重新打开时跳过已完成的记录，从中断处继续
+class JsonlWriter:
+  def __init__(self, path, resume=True, key=get_pokemon_key, output_dir=None):
+    self.path = path
+    self.key = key
+    self.output_dir = output_dir
+    self.done = set()
+    if resume and os.path.exists(path):
+      records = read_jsonl(path)
+      self.rewrite(records)
+      self.done = {key(record) for record in records}
+    elif os.path.exists(path):
+      os.remove(path)
+    self.file = gzip.open(path, 'ab')
+
+  # 去掉崩溃时写了一半的 gzip 数据块
+  def rewrite(self, records):
+    tmp_path = f'{self.path}.tmp'
+    with gzip.open(tmp_path, 'wb') as f:
+      for record in records:
+        f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+    os.replace(tmp_path, self.path)
+
+  def write(self, data):
+    line = json.dumps(data, ensure_ascii=False).encode('utf-8') + b'\n'
+    self.file.write(line)
+    self.file.flush()
+    self.file.fileobj.flush()
+    os.fsync(self.file.fileobj.fileno())
+    self.done.add(self.key(data))
+    if self.output_dir:
+      path = os.path.join(self.output_dir, f'{self.key(data)}.json')
+      with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+  def close(self):
+    self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import time
+from urllib.parse import quote
+
+from profiling import percentile
+
+PATHS = [
+  '/pokemon/0025',
+  '/pokemon/皮卡丘',
+  '/pokemon/妙蛙种子/forms',
+  '/moves/十万伏特',
+  '/abilities/静电',
+  '/pokedex/关都',
+  '/search?type=电',
+  '/search?type=草&type=毒',
+  '/search?ability=静电',
+  '/search?q=pika',
+  '/search?gen=1',
+]
+
+def format_request(host, path, encoding):
+  target = quote(path, safe='/?=&')
+  return (f'GET {target} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: {encoding}\r\n\r\n').encode('latin-1')
+
+async def read_response(reader):
+  head = await reader.readuntil(b'\r\n\r\n')
+  lines = head.decode('latin-1').split('\r\n')
+  status = int(lines[0].split(' ')[1])
+  length = 0
+  for line in lines[1:]:
+    if line.lower().startswith('content-length:'):
+      length = int(line.split(':', 1)[1])
+  await reader.readexactly(length)
+  return status
+
+# 每个连接保持 keep-alive，按顺序循环请求 PATHS，直到到达 deadline
+async def run_connection(host, port, requests, deadline, latencies, statuses):
+  reader, writer = await asyncio.open_connection(host, port)
+  try:
+    i = 0
+    while time.perf_counter() < deadline:
+      start = time.perf_counter()
+      writer.write(requests[i % len(requests)])
+      await writer.drain()
+      status = await read_response(reader)
+      latencies.append(time.perf_counter() - start)
+      statuses[status] = statuses.get(status, 0) + 1
+      i += 1
+  finally:
+    writer.close()
+
+async def run_load(host='127.0.0.1', port=8000, connections=16, duration=10, encoding='gzip', paths=PATHS):
+  requests = [format_request(host, path, encoding) for path in paths]
+  latencies = []
+  statuses = {}
+  start = time.perf_counter()
+  deadline = start + duration
+  await asyncio.gather(*[run_connection(host, port, requests, deadline, latencies, statuses) for i in range(connections)])
+  elapsed = time.perf_counter() - start
+  return {
+    'requests': len(latencies),
+    'rate': len(latencies) / elapsed,
+    'p50': percentile(latencies, 50),
+    'p99': percentile(latencies, 99),
+    'statuses': statuses,
+  }
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='对本地 api_server.py 进行压力测试')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8000)
+  parser.add_argument('--connections', type=int, default=16)
+  parser.add_argument('--duration', type=float, default=10)
+  parser.add_argument('--encoding', default='gzip', help='Accept-Encoding，如 identity、gzip、br')
+  parser.add_argument('paths', nargs='*', default=PATHS)
+  args = parser.parse_args()
+  result = asyncio.run(run_load(args.host, args.port, args.connections, args.duration, args.encoding, args.paths))
+  print(f'{result["requests"]} requests, {result["rate"]:.0f} req/s, '
+        f'p50 {result["p50"] * 1000:.2f} ms, p99 {result["p99"] * 1000:.2f} ms')
+  print('status: ' + ', '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items())))
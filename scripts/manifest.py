@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+
+from pokemon import DEFAULT_PARSER, EXTRACTOR_VERSIONS, FIELDS, PATH, parse_pokemon_data
+
+MANIFEST_PATH = f'{PATH}/raw/manifest.json'
+
+def load_manifest(path=MANIFEST_PATH):
+  if not os.path.exists(path):
+    return {}
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+  tmp_path = f'{path}.tmp'
+  with open(tmp_path, 'w', encoding='utf-8') as f:
+    json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+  os.replace(tmp_path, path)
+
+def hash_text(text):
+  return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def dump_json(data):
+  return json.dumps(data, ensure_ascii=False, indent=2)
+
+def read_output(path):
+  if not os.path.exists(path):
+    return None
+  with open(path, 'r', encoding='utf-8') as f:
+    return f.read()
+
+# 内容没有变化时不改写文件，避免产生无意义的 git diff
+def write_if_changed(path, text, old_text=None):
+  if old_text is None:
+    old_text = read_output(path)
+  if old_text == text:
+    return False
+  tmp_path = f'{path}.tmp'
+  with open(tmp_path, 'w', encoding='utf-8') as f:
+    f.write(text)
+  os.replace(tmp_path, path)
+  return True
+
+# versions 为输出中与当前提取函数版本一致的字段；缺少版本的字段在下次增量构建时会重新提取
+def make_entry(source_hash, text, versions=None):
+  return {
+    'source': source_hash,
+    'versions': dict(EXTRACTOR_VERSIONS) if versions is None else versions,
+    'output': hash_text(text)
+  }
+
+def get_stale_fields(entry, source_hash):
+  if not entry or entry.get('source') != source_hash:
+    return list(FIELDS)
+  versions = entry.get('versions', {})
+  return [field for field in FIELDS if versions.get(field) != EXTRACTOR_VERSIONS[field]]
+
+# 页面内容与提取函数版本都未变化时跳过；只有部分字段的提取函数版本变化时，只重新提取这些字段，其余字段沿用已有输出
+def rebuild_pokemon(html, pokemon, output_path, entry=None, parser=DEFAULT_PARSER):
+  source_hash = hash_text(html)
+  old_text = read_output(output_path)
+  # 输出文件被手动修改或丢失时，不能复用其中的字段
+  reusable = entry and old_text is not None and entry.get('output') == hash_text(old_text)
+  stale = get_stale_fields(entry if reusable else None, source_hash)
+  if not stale:
+    return entry, 'skipped'
+
+  fields = None if len(stale) == len(FIELDS) else stale
+  data = parse_pokemon_data(html, pokemon['name_zh'], pokemon['index'], pokemon['name_en'], pokemon['name_jp'], parser, fields)
+  if fields is not None:
+    data = {**json.loads(old_text), **data}
+
+  text = dump_json(data)
+  changed = write_if_changed(output_path, text, old_text)
+  return make_entry(source_hash, text), 'written' if changed else 'unchanged'
@@ -0,0 +1,129 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from pokemon_dataset import BUILD_PATH, PATH, iter_json_dir, load_json
+
+NORMALIZED_PATH = os.path.join(BUILD_PATH, 'normalized')
+MOVE_FIELDS = ['type', 'category', 'power', 'accuracy', 'pp']
+# 招式表中已有的属性不再在每一行重复；detail 为该学习方式特有的字段
+LEARNSETS = {
+  'learnable_moves': 'level',
+  'machine_moves': 'machine',
+  'egg_moves': 'parents',
+}
+# 招式名后的注记，如 '延后*'、'再来一次‡'、'种子机关枪USUM'
+NAME_SUFFIX_RE = re.compile(r'(USUM|[*‡])+$')
+
+def load_move_table(data_path=PATH):
+  moves = {}
+  for move in load_json(os.path.join(data_path, 'move_list.json')):
+    # 超极巨招式没有编号，也不会出现在学习表中
+    if not move['id'].isdigit():
+      continue
+    move_id = int(move['id'])
+    moves[move_id] = {'name': move['name_zh'], **{field: move[field] for field in MOVE_FIELDS}}
+  return moves
+
+def get_move_ids(moves):
+  ids = {}
+  for move_id, move in sorted(moves.items()):
+    ids.setdefault(move['name'], move_id)
+  return ids
+
+def find_move_id(name, move_ids):
+  if name in move_ids:
+    return move_ids[name]
+  return move_ids.get(NAME_SUFFIX_RE.sub('', name))
+
+# 学习表中的一行 -> [招式编号, detail] 或 [招式编号, detail, 与招式表不同的字段]
+# 找不到对应招式时保留原来的行
+def encode_row(row, detail_field, moves, move_ids):
+  move_id = find_move_id(row['name'], move_ids)
+  if move_id is None:
+    return row
+  move = moves[move_id]
+  overrides = {field: row[field] for field in ['name'] + MOVE_FIELDS if row[field] != move[field]}
+  encoded = [move_id, row[detail_field]]
+  if overrides:
+    encoded.append(overrides)
+  return encoded
+
+def decode_row(row, detail_field, moves):
+  if isinstance(row, dict):
+    return row
+  move = moves[row[0]]
+  overrides = row[2] if len(row) > 2 else {}
+  decoded = {detail_field: row[1], 'name': overrides.get('name', move['name'])}
+  for field in MOVE_FIELDS:
+    decoded[field] = overrides.get(field, move[field])
+  return decoded
+
+def normalize_pokemon(data, moves, move_ids):
+  result = dict(data)
+  for field, detail_field in LEARNSETS.items():
+    result[field] = [
+      {'form': group['form'], 'data': [encode_row(row, detail_field, moves, move_ids) for row in group['data']]}
+      for group in data[field]
+    ]
+  return result
+
+def rehydrate_pokemon(data, moves):
+  result = dict(data)
+  for field, detail_field in LEARNSETS.items():
+    result[field] = [
+      {'form': group['form'], 'data': [decode_row(row, detail_field, moves) for row in group['data']]}
+      for group in data[field]
+    ]
+  return result
+
+def dump_compact(data, path):
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+def export_normalized(data_path=PATH, output_path=NORMALIZED_PATH):
+  moves = load_move_table(data_path)
+  move_ids = get_move_ids(moves)
+  pokemon_path = os.path.join(output_path, 'pokemon')
+  os.makedirs(pokemon_path, exist_ok=True)
+  dump_compact({str(move_id): move for move_id, move in moves.items()}, os.path.join(output_path, 'moves.json'))
+  for key, data in iter_json_dir('pokemon', data_path):
+    dump_compact(normalize_pokemon(data, moves, move_ids), os.path.join(pokemon_path, f'{key}.json'))
+  return output_path
+
+# 读取规范化后的数据，按需还原成与 data/pokemon 相同的结构
+class NormalizedLoader:
+  def __init__(self, output_path=NORMALIZED_PATH):
+    self.output_path = output_path
+    self.moves = {int(move_id): move for move_id, move in load_json(os.path.join(output_path, 'moves.json')).items()}
+
+  def load(self, key, rehydrate=True):
+    data = load_json(os.path.join(self.output_path, 'pokemon', f'{key}.json'))
+    return rehydrate_pokemon(data, self.moves) if rehydrate else data
+
+  def keys(self):
+    return sorted(os.path.splitext(os.path.basename(path))[0]
+                  for path in glob.glob(os.path.join(self.output_path, 'pokemon', '*.json')))
+
+def get_dir_size(path):
+  return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, '**', '*.json'), recursive=True))
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='把学习表中的招式改为引用招式编号，招式属性只在招式表中保存一份')
+  parser.add_argument('--output', default=NORMALIZED_PATH)
+  parser.add_argument('--verify', action='store_true', help='还原后与 data/pokemon 逐个比较')
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  export_normalized(output_path=args.output)
+  before = get_dir_size(os.path.join(PATH, 'pokemon'))
+  after = get_dir_size(args.output)
+  print(f'{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s')
+
+  if args.verify:
+    loader = NormalizedLoader(args.output)
+    mismatched = [key for key, data in iter_json_dir('pokemon') if loader.load(key) != data]
+    print(f'mismatched: {len(mismatched)}' + (f' ({", ".join(mismatched[:10])})' if mismatched else ''))
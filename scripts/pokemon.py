@@ -1,26 +1,73 @@
 
 import re
+import traceback
 from bs4 import BeautifulSoup
 import requests
 
 from fixed_data import FIXED_EVOLUTION_DATA, FIXED_EVOLUTION_POKEMONS
-from utils import save_image, save_to_file
+from profiling import measure
+from utils import save_to_file
 
 PATH = './../data'
-
-def get_pokemon_data(name, index, name_en, name_jp):
-  headers = {
-    'Accept-Language': 'zh-Hans'
-  }
-
-  url = f"https://wiki.52poke.com/wiki/{name}"
-  response = requests.get(url, headers=headers)
+BASE_URL = 'https://wiki.52poke.com/wiki/'
+HEADERS = {
+  'Accept-Language': 'zh-Hans'
+}
+
+# BeautifulSoup 的解析器，提取函数在各解析器下输出一致；lxml 需要额外安装，速度快很多
+PARSERS = ['html.parser', 'lxml', 'html5lib']
+DEFAULT_PARSER = 'html.parser'
+
+def get_pokemon_data(name, index, name_en, name_jp, parser=DEFAULT_PARSER, cache=None):
+  html = fetch_page(name, cache=cache)
+  return parse_pokemon_data(html, name, index, name_en, name_jp, parser)
+
+# cache 为 http_cache.ResponseCache 时使用条件请求，页面未变化则直接读取本地缓存
+def fetch_page(name, session=None, base_url=BASE_URL, cache=None, timeout=30):
+  url = f"{base_url}{name}"
+  if cache:
+    return cache.fetch(session or requests, url, HEADERS, timeout)
+  response = (session or requests).get(url, headers=HEADERS, timeout=timeout)
   response.raise_for_status()
-  soup = BeautifulSoup(response.text, "html.parser")
-
-  for tag in soup.find_all(True):
-    if tag.get('style') and 'display:none' in tag.get('style'):
-      tag.decompose
+  return response.text
+
+# 各字段的提取函数，按调用顺序排列（部分提取函数会修改文档树，顺序不可随意调整）
+EXTRACTORS = {
+  'names': lambda page, name, index: get_names(page, name),
+  'forms': lambda page, name, index: get_form_infos(page, get_form_names(page), name, index),
+  'profile': lambda page, name, index: get_profile(page),
+  'flavor_texts': lambda page, name, index: get_flavor_texts(page),
+  # 部分宝可梦进化链手动处理
+  'evolution_chains': lambda page, name, index: get_evolution_chains(page, name) if name not in FIXED_EVOLUTION_POKEMONS else FIXED_EVOLUTION_DATA[name],
+  'stats': lambda page, name, index: get_stats(page),
+  'moves': lambda page, name, index: get_moves(page),
+  'home_images': lambda page, name, index: get_home_images(page, name, index),
+}
+# 输出 JSON 中各字段的顺序
+FIELDS = ['profile', 'forms', 'stats', 'flavor_texts', 'evolution_chains', 'names', 'moves', 'home_images']
+# 修改某个提取函数后递增对应的版本号，增量构建时只重新提取该字段
+EXTRACTOR_VERSIONS = {
+  'names': 1,
+  'forms': 1,
+  'profile': 1,
+  'flavor_texts': 1,
+  'evolution_chains': 1,
+  'stats': 1,
+  'moves': 1,
+  'home_images': 1,
+}
+
+# images 为列表时，追加页面中需要下载的图片 {'path', 'url'}，path 相对于 data/images
+# profiler 为 profiling.Profiler 时，记录解析、建索引和每个提取函数的耗时
+# errors 为列表时，单个提取函数出错不再中断整个页面：该字段从结果中省略，错误信息追加到 errors
+def parse_pokemon_data(html, name, index, name_en, name_jp, parser=DEFAULT_PARSER, fields=None, images=None,
+                       profiler=None, errors=None):
+  if parser not in PARSERS:
+    raise ValueError(f'unknown parser: {parser}, expected one of {PARSERS}')
+  with measure(profiler, 'parse', name):
+    soup = BeautifulSoup(html, parser)
+  with measure(profiler, 'index', name):
+    page = build_page_index(soup)
 
   data = {
     'name': name,
@@ -29,31 +76,93 @@ def get_pokemon_data(name, index, name_en, name_jp):
     'name_jp': name_jp
   }
 
-  names = get_form_names(soup)
-
-  lang_names = get_names(soup, name)
-  forms = get_form_infos(soup, names, name, index)
-  profile = get_profile(soup)
-  flavor_texts = get_flavor_texts(soup)
-  # 部分宝可梦进化链手动处理
-  evolution_chains = get_evolution_chains(soup, name) if name not in FIXED_EVOLUTION_POKEMONS else FIXED_EVOLUTION_DATA[name]
-  stats = get_stats(soup)
-  moves = get_moves(soup)
-  home_images = get_home_images(soup, name, index)
-  data['profile'] = profile
-  data['forms'] = forms
-  data['stats'] = stats
-  data['flavor_texts'] = flavor_texts
-  data['evolution_chains'] = evolution_chains
-  data['names'] = lang_names
-  data['moves'] = moves
-  data['home_images'] = home_images
+  results = {}
+  for field, extractor in EXTRACTORS.items():
+    if fields is None or field in fields:
+      with measure(profiler, f'extract.{field}', name):
+        if errors is None:
+          results[field] = extractor(page, name, index)
+          continue
+        try:
+          results[field] = extractor(page, name, index)
+        except Exception as e:
+          errors.append(get_error(field, e))
+  for field in FIELDS:
+    if field in results:
+      data[field] = results[field]
+  if images is not None:
+    images.extend(page['images'])
 
   return data
 
-def get_form_names(soup):
+def get_error(field, error):
+  return {
+    'field': field,
+    'type': type(error).__name__,
+    'message': str(error),
+    'traceback': traceback.format_exc(limit=-3),
+  }
+
+# 只运行与图片有关的提取函数，返回需要下载的图片
+def parse_pokemon_images(html, name, index, parser=DEFAULT_PARSER):
+  images = []
+  parse_pokemon_data(html, name, index, None, None, parser, fields=['forms', 'home_images'], images=images)
+  return images
+
+# 一次遍历整个文档，建立 id / title / class 索引，各个提取函数直接查表，不再重复全文搜索
+def build_page_index(soup):
+  page = {
+    'soup': soup,
+    'ids': {},
+    'titles': {},
+    'classes': {},
+    'images': []
+  }
+  for position, tag in enumerate(soup.find_all(True)):
+    tag_id = tag.get('id')
+    if tag_id and tag_id not in page['ids']:
+      page['ids'][tag_id] = (position, tag)
+    if tag.name == 'a':
+      title = tag.get('title')
+      if title:
+        page['titles'].setdefault(title, []).append(tag)
+    elif tag.name == 'tr' or tag.name == 'table':
+      for class_name in tag.get('class') or []:
+        page['classes'].setdefault(class_name, []).append(tag)
+  return page
+
+def queue_image(page, path, url):
+  if url:
+    page['images'].append({'path': path, 'url': f'https:{url}' if url.startswith('//') else url})
+
+def find_by_id(page, *ids, name=None):
+  # 多个候选 id 时，按文档顺序返回第一个
+  found = [page['ids'][tag_id] for tag_id in ids if tag_id in page['ids']]
+  found = [(position, tag) for position, tag in found if name is None or tag.name == name]
+  return min(found, key=lambda item: item[0])[1] if found else None
+
+def find_heading(page, *ids):
+  span = find_by_id(page, *ids, name='span')
+  return span.parent if span else None
+
+def find_in(tags, container):
+  for tag in tags:
+    if any(parent is container for parent in tag.parents):
+      return tag
+  return None
+
+def find_title_in(page, title, container):
+  return find_in(page['titles'].get(title, []), container)
+
+def find_class_in(page, class_name, container):
+  return find_in(page['classes'].get(class_name, []), container)
+
+def has_text(strings, keyword, exact=False):
+  return any((keyword == text) if exact else (keyword in text) for text in strings)
+
+def get_form_names(page):
   names = []
-  form_table = soup.find('table', id='multi-pm-form-table')
+  form_table = find_by_id(page, 'multi-pm-form-table', name='table')
   if form_table:
     name_tr_list = form_table.select('tr.md-hide:not(.hide)')
     for tr in name_tr_list:
@@ -64,9 +173,10 @@ def get_form_names(soup):
 
   return names
 
-def get_form_infos(soup, names, pokemon_name, pokemon_index):
+def get_form_infos(page, names, pokemon_name, pokemon_index):
   infos = []
-  info_table_list = soup.select('table.roundy.a-r.at-c')
+  info_table_list = [table for table in page['classes'].get('at-c', [])
+                     if table.name == 'table' and 'roundy' in table['class'] and 'a-r' in table['class']]
 
   for index, form in enumerate(info_table_list):
     if index < len(names):
@@ -88,9 +198,11 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
       td_list = form.select('.fulltable')
 
       for td in td_list:
+        td_titles = {a.get('title') for a in td.find_all('a', title=True)}
+        td_strings = td.find_all(string=True)
+
         # types
-        type_a = td.find('a', attrs={'title': '属性'})
-        if type_a:
+        if '属性' in td_titles:
           type_spans = td.select('span.type-box-9-text')
           types = []
           for span in type_spans:
@@ -98,8 +210,7 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
           form_info['types'] = types
         
         # genus
-        genus_a = td.find('a', attrs={'title': '分类'})
-        if genus_a:
+        if '分类' in td_titles:
           genus_el = td.select('td > a')[0]
           for el in genus_el:
             form_info['genus'] = el.text.strip()
@@ -125,8 +236,7 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
           form_info['ability'] = abilities
         
         # experience
-        experience_a = td.find('a', attrs={'title': '经验值'})
-        if experience_a:
+        if '经验值' in td_titles:
           experience_el = td.select('td > table')
 
           for el in experience_el:
@@ -138,12 +248,10 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
             }
       
         # height weight
-        height_a = td.find_all(string=lambda text: '身高' in text if text else False)
-        if height_a:
+        if has_text(td_strings, '身高'):
           height = td.select('td.roundy')[0].text.strip()
           form_info['height'] = height
-        weight_a = td.find_all(string=lambda text: '体重' in text if text else False)
-        if weight_a:
+        if has_text(td_strings, '体重'):
           weight = td.select('td.roundy')[0].text.strip()
           form_info['weight'] = weight
 
@@ -151,11 +259,10 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
       img_el = form.select('.roundy.bgwhite.fulltable')[0].find('img')
 
       image_url = img_el.get('data-url')
-      image_path = f'{PATH}/images/official/{image_name}.png'
-      # save_image(image_path, f'https:{image_url}')
+      queue_image(page, f'official/{image_name}.png', image_url)
       
       # gender rate
-      gender_a = form.find('a', attrs={'title': '宝可梦列表（按性别比例分类）'})
+      gender_a = find_title_in(page, '宝可梦列表（按性别比例分类）', form)
       if gender_a:
         gender_table = gender_a.parent.find_next('table')
         male_el = gender_table.find('span', attrs={
@@ -175,19 +282,19 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
       infos.append(form_info)
 
       # shape
-      shape_a = form.find('a', attrs={'title': '宝可梦列表（按体形分类）'})
+      shape_a = find_title_in(page, '宝可梦列表（按体形分类）', form)
       if shape_a:
         shape_el = shape_a.parent.find_next('table').find('a')
         form_info['shape'] = shape_el.get('title')
       
       # color
-      color_a = form.find('a', attrs={'title': '宝可梦列表（按颜色分类）'})
+      color_a = find_title_in(page, '宝可梦列表（按颜色分类）', form)
       if color_a:
         color_el = color_a.parent.find_next('table').find('span')
         form_info['color'] = color_el.text.strip()
 
       # catch rate
-      catch_a = form.find('a', attrs={'title': '捕获率'})
+      catch_a = find_title_in(page, '捕获率', form)
       if catch_a:
         catch_el = catch_a.parent.find_next('table').find('td')
         num = catch_el.contents[0].strip()
@@ -198,7 +305,7 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
         }
 
       # raise
-      raise_a = form.find('a', attrs={'title': '宝可梦培育'})
+      raise_a = find_title_in(page, '宝可梦培育', form)
       if raise_a:
         egg_groups = []
         raise_td_list = raise_a.parent.find_next('table').find_all('td')
@@ -210,23 +317,22 @@ def get_form_infos(soup, names, pokemon_name, pokemon_index):
 
   return infos
 
-def get_names(soup, name):
+def get_names(page, name):
   names = {
     'zh_hans': name
   }
-  name_table = soup.find('table', {
-    'class': 'wiki-nametable'
-  })
+  name_table = next((table for table in page['classes'].get('wiki-nametable', []) if table.name == 'table'), None)
 
   name_tr_list = name_table.select('tr.varname1')
 
   for tr in name_tr_list:
-    tr_cn = tr.find_all(string=lambda text: '任天堂' == text if text else False)
-    tr_en = tr.find_all(string=lambda text: '英文' in text if text else False)
-    tr_fr = tr.find_all(string=lambda text: '英文' in text if text else False)
-    tr_es = tr.find_all(string=lambda text: '西班牙文' in text if text else False)
-    tr_it = tr.find_all(string=lambda text: '意大利文' in text if text else False)
-    tr_de = tr.find_all(string=lambda text: '德文' in text if text else False)
+    tr_strings = tr.find_all(string=True)
+    tr_cn = has_text(tr_strings, '任天堂', exact=True)
+    tr_en = has_text(tr_strings, '英文')
+    tr_fr = has_text(tr_strings, '英文')
+    tr_es = has_text(tr_strings, '西班牙文')
+    tr_it = has_text(tr_strings, '意大利文')
+    tr_de = has_text(tr_strings, '德文')
 
     if tr_cn:
       name_zh_hant = tr.select('td')[2].contents[0].strip() if tr.select('td') else name
@@ -253,9 +359,9 @@ def get_names(soup, name):
   names['ko'] = name_ko.text.strip() if name_ko else None
   return names
 
-def get_profile(soup):
+def get_profile(page):
   # tag_span = soup.find('span', id=lambda x: x in ['概述', '概要'])
-  profile_p = soup.find('span', id=lambda x: x in ['概述', '基本介绍']).parent.find_next_sibling('p')
+  profile_p = find_heading(page, '概述', '基本介绍').find_next_sibling('p')
   profile_text = ''
   while profile_p and profile_p.name == 'p':
     for sup in profile_p.find_all('sup'):
@@ -265,10 +371,10 @@ def get_profile(soup):
     profile_p = profile_p.find_next_sibling()
   return profile_text
 
-def get_flavor_texts(soup):
+def get_flavor_texts(page):
   texts = []
   # flavor_table = soup.find('span', id='图鉴介绍').parent.find_next_sibling()
-  flavor_table = soup.find('span', id=lambda x: x in ['图鉴介绍', '圖鑑介绍', '圖鑑介紹']).parent.find_next_sibling()
+  flavor_table = find_heading(page, '图鉴介绍', '圖鑑介绍', '圖鑑介紹').find_next_sibling()
   generation_th_list = flavor_table.select('th.roundytop-5')
 
   for th in generation_th_list:
@@ -318,11 +424,10 @@ def get_flavor_texts(soup):
   
   return texts
 
-def get_evolution_chains(soup, name):
-  evo_tag = soup.find('span', id=lambda x: x in ['进化', '進化'])
-  if not evo_tag:
+def get_evolution_chains(page, name):
+  tag_h1 = find_heading(page, '进化', '進化')
+  if not tag_h1:
     return [{'name': name, 'stage': '不进化', "text": None, "back_text": None, "from": None}]
-  tag_h1 = evo_tag.parent
 
   # multi_form_table = tag_h1.find_next('table', class_='a-c')
   form_table = tag_h1.find_next('table')
@@ -463,8 +568,8 @@ def has_multiple_forms(table):
       flag_count += 1
   return flag_count > 1
 
-def get_stats(soup):
-    stats_tag = soup.find('span', id='种族值').parent
+def get_stats(page):
+    stats_tag = find_heading(page, '种族值')
     table_el = stats_tag.find_next('table')
     table_list = []
     stats_form_names = []
@@ -481,22 +586,22 @@ def get_stats(soup):
     stats =[]
 
     for index, stats_table in enumerate(table_list):
-      hp = stats_table.find('tr', class_='bgl-HP').find('span', attrs={
+      hp = find_class_in(page, 'bgl-HP', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
-      attack = stats_table.find('tr', class_='bgl-攻击').find('span', attrs={
+      attack = find_class_in(page, 'bgl-攻击', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
-      defense = stats_table.find('tr', class_='bgl-防御').find('span', attrs={
+      defense = find_class_in(page, 'bgl-防御', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
-      sp_attack = stats_table.find('tr', class_='bgl-特攻').find('span', attrs={
+      sp_attack = find_class_in(page, 'bgl-特攻', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
-      sp_defense = stats_table.find('tr', class_='bgl-特防').find('span', attrs={
+      sp_defense = find_class_in(page, 'bgl-特防', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
-      speed = stats_table.find('tr', class_='bgl-速度').find('span', attrs={
+      speed = find_class_in(page, 'bgl-速度', stats_table).find('span', attrs={
         'style': 'float:right'
       }).text
       result = {
@@ -514,7 +619,7 @@ def get_stats(soup):
     return stats
 
 
-def get_moves(soup):
+def get_moves(page):
   moves = []
   all_learned_moves = []
   all_machine_moves = []
@@ -523,7 +628,7 @@ def get_moves(soup):
   learned_form_names = []
   machine_form_names = []
 
-  learned_table_el = soup.find('span', id="可学会的招式").parent.find_next('table')
+  learned_table_el = find_heading(page, '可学会的招式').find_next('table')
   if 'fulltable' in learned_table_el.get('class'):
     form_names_els = learned_table_el.find_all('span', class_='toggle-p')
     for sp in form_names_els:
@@ -569,7 +674,7 @@ def get_moves(soup):
     all_learned_moves.append(result)
 
 
-  machine_table_el = soup.find('span', id="能使用的招式学习器").parent.find_next('table')
+  machine_table_el = find_heading(page, '能使用的招式学习器').find_next('table')
   if 'fulltable' in machine_table_el.get('class'):
     form_names_els = machine_table_el.find_all('span', class_='toggle-p')
     for sp in form_names_els:
@@ -618,9 +723,9 @@ def get_moves(soup):
     "machine": all_machine_moves
   }
 
-def get_home_images(soup, name, index):
+def get_home_images(page, name, index):
   home_images = []
-  tag_el = soup.find('span', id="形象").parent.find_next_sibling('div')
+  tag_el = find_heading(page, '形象').find_next_sibling('div')
 
   table = tag_el.find('a', title="Pokémon HOME").parent.parent.parent
   tr_list = table.find_all('tr', class_="bgwhite")
@@ -639,7 +744,7 @@ def get_home_images(soup, name, index):
     image = td.find('img').get('data-url')
     if is_shiny is False:
       image_name = f'{index}-{name}-{form_name}{extra_name}.png' if form_name else f'{index}-{name}{extra_name}.png'
-      # save_image(f'{PATH}/images/home/{image_name}', f'https:{image}')
+      queue_image(page, f'home/{image_name}', image)
       item = {
         'name': item_name,
         'image': image_name,
@@ -647,7 +752,7 @@ def get_home_images(soup, name, index):
       home_images.append(item)
     else:
       image_name =  f'{index}-{name}-{form_name}{extra_name}-shiny.png' if form_name else f'{index}-{name}{extra_name}-shiny.png'
-      # save_image(f'{PATH}/images/home/{image_name}', f'https:{image}')
+      queue_image(page, f'home/{image_name}', image)
       exist_item = next((item for item in home_images if item["name"] == item_name), None)
       if exist_item:
         exist_item['shiny'] = image_name
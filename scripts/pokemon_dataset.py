@@ -0,0 +1,323 @@
+import argparse
+import difflib
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+BUILD_PATH = os.path.join(PATH, 'build')
+PACK_PATH = os.path.join(BUILD_PATH, 'dataset.pack')
+
+# 文件头：magic、格式版本、索引的偏移和长度
+MAGIC = b'PKDS'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQ')
+
+KINDS = {
+  'pokemon': 'pokemon',
+  'moves': 'moves',
+  'abilities': 'abilities',
+}
+# 可以用来查找记录的字段
+ALIAS_FIELDS = {
+  'pokemon': ['name_zh', 'name_en', 'name_ja', 'pokedex_id'],
+  'moves': ['name_zh', 'name_en', 'name_ja', 'id'],
+  'abilities': ['name_zh', 'name_en', 'name_ja'],
+}
+
+# 属性顺序与 type_effectiveness 中的顺序一致
+TYPES = ['一般', '格斗', '飞行', '毒', '地面', '岩石', '虫', '幽灵', '钢', '火', '水', '草', '电', '超能力', '冰', '龙', '恶', '妖精']
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+
+# 取字符串开头的数字，如 '0.4m' -> 0.4、'190（24.8%）' -> 190；'???.?kg' 这类未知值返回 default
+def parse_number(text, default=float('nan')):
+  match = re.match(r'\s*(\d[\d,]*(?:\.\d+)?)', text or '')
+  return float(match.group(1).replace(',', '')) if match else default
+
+# 旧数据的形态没有 is_mega / is_gmax，按名称判断，规则与 pokemon.py 的 get_form_infos 一致
+def is_mega(form):
+  return form.get('is_mega', '超级' in form['name'])
+
+def is_gmax(form):
+  return form.get('is_gmax', '极巨化' in form['name'] and '超级' not in form['name'])
+
+# stats、type_effectiveness 中的形态名与 forms 中的并不一一对应（如 '一般'、'阿罗拉的样子'），为每个形态找最接近的一项，
+# 返回其下标：same(form, item) 为真的项优先；第一个形态和超极巨化形态用第一项，其余去掉宝可梦名后按名称完全相同或最相似匹配，
+# 都不相似时也用第一项
+def match_form_items(record, field, same=None):
+  items = record.get(field) or []
+  if not items:
+    return [None] * len(record['forms'])
+  species_name = record.get('name_zh') or ''
+  labels = [item['form'].replace(species_name, '') for item in items]
+  result = []
+  for index, form in enumerate(record['forms']):
+    base = index == 0 or is_gmax(form)
+    name = form['name'].replace(species_name, '')
+    ratios = [difflib.SequenceMatcher(None, name, label).ratio() for label in labels]
+    result.append(max(range(len(items)), key=lambda i: (
+      bool(same and same(form, items[i])), base and i == 0, items[i]['form'] == form['name'], ratios[i], -i)))
+  return result
+
+def match_form_stats(record):
+  return [record['stats'][i]['data'] if i is not None else None for i in match_form_items(record, 'stats')]
+
+# 属性相性按属性相同优先匹配，如 '超级进化' 一项可能排在原本形态之前
+def match_form_type_effectiveness(record):
+  same = lambda form, item: sorted(form['types']) == sorted(item['types'])
+  return [record['type_effectiveness'][i] if i is not None else None
+          for i in match_form_items(record, 'type_effectiveness', same)]
+
+def load_json(path):
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+# 按文件名顺序遍历 data 下某个目录里的 JSON，返回 (文件名, 数据)
+def iter_json_dir(kind, data_path=PATH):
+  for path in sorted(glob.glob(os.path.join(data_path, kind, '*.json'))):
+    yield os.path.splitext(os.path.basename(path))[0], load_json(path)
+
+# 构建产物所用数据的指纹：数据目录的绝对路径，以及 sources（相对数据目录的目录或文件）下文件的数量、总字节数和最新修改时间；
+# 数据有变化（如应用了增量包）或换了数据目录时指纹不同，各 load 据此重新构建
+def get_source(data_path=PATH, sources=tuple(KINDS.values())):
+  files = size = mtime = 0
+  for source in sources:
+    path = os.path.join(data_path, source)
+    if os.path.isfile(path):
+      paths = [path]
+    else:
+      paths = [os.path.join(root, name) for root, dirs, names in os.walk(path) for name in names if not name.endswith('.tmp')]
+    for path in paths:
+      stat = os.stat(path)
+      files += 1
+      size += stat.st_size
+      mtime = max(mtime, stat.st_mtime_ns)
+  return {'path': os.path.realpath(data_path), 'files': files, 'bytes': size, 'mtime': mtime}
+
+def encode_value(value):
+  return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# 数据包布局：文件头 | 各记录各字段的 JSON | 每类记录一张 (偏移, 长度) 的 uint64 表 | 索引 JSON
+# 读取时只解析索引，字段值在第一次访问时才从 mmap 中解码
+def build_pack(data_path=PATH, pack_path=PACK_PATH):
+  os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+  source = get_source(data_path)
+  index = {}
+  tmp_path = f'{pack_path}.tmp'
+  with open(tmp_path, 'wb') as f:
+    f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+    for kind, directory in KINDS.items():
+      keys = []
+      fields = []
+      rows = []
+      aliases = {}
+      for key, record in iter_json_dir(directory, data_path):
+        aliases[key] = len(keys)
+        for field in ALIAS_FIELDS[kind]:
+          value = record.get(field)
+          if isinstance(value, str) and value and value not in aliases:
+            aliases[value] = len(keys)
+        for field in record:
+          if field not in fields:
+            fields.append(field)
+        row = {}
+        for field, value in record.items():
+          blob = encode_value(value)
+          row[field] = (f.tell(), len(blob))
+          f.write(blob)
+        keys.append(key)
+        rows.append(row)
+
+      table = []
+      for row in rows:
+        for field in fields:
+          table.extend(row.get(field, (0, 0)))
+      table_offset = f.tell()
+      f.write(struct.pack(f'<{len(table)}Q', *table))
+
+      index[kind] = {
+        'keys': keys,
+        'fields': fields,
+        'table': table_offset,
+        'aliases': aliases,
+      }
+
+    index['source'] = source
+    index_offset = f.tell()
+    index_blob = encode_value(index)
+    f.write(index_blob)
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, index_offset, len(index_blob)))
+  os.replace(tmp_path, pack_path)
+  return pack_path
+
+class Record:
+  def __init__(self, dataset, kind, position):
+    self._dataset = dataset
+    self._kind = kind
+    self._position = position
+    self._cache = {}
+
+  @property
+  def key(self):
+    return self._dataset.index[self._kind]['keys'][self._position]
+
+  def keys(self):
+    return [field for field in self._dataset.index[self._kind]['fields'] if self._dataset.has_field(self._kind, self._position, field)]
+
+  def __getitem__(self, field):
+    if field not in self._cache:
+      self._cache[field] = self._dataset.read_field(self._kind, self._position, field)
+    return self._cache[field]
+
+  def __getattr__(self, field):
+    if field.startswith('_'):
+      raise AttributeError(field)
+    try:
+      return self[field]
+    except KeyError:
+      raise AttributeError(field) from None
+
+  def __contains__(self, field):
+    return self._dataset.has_field(self._kind, self._position, field)
+
+  def get(self, field, default=None):
+    return self[field] if field in self else default
+
+  def to_dict(self):
+    return {field: self[field] for field in self.keys()}
+
+  def __repr__(self):
+    return f'{type(self).__name__}({self.key!r})'
+
+class Pokemon(Record):
+  pass
+
+class Move(Record):
+  pass
+
+class Ability(Record):
+  pass
+
+RECORD_TYPES = {
+  'pokemon': Pokemon,
+  'moves': Move,
+  'abilities': Ability,
+}
+
+class Dataset:
+  def __init__(self, pack_path=PACK_PATH):
+    self.file = open(pack_path, 'rb')
+    self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, index_offset, index_length = HEADER.unpack_from(self.buffer, 0)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f'{pack_path} is not a dataset pack of version {VERSION}')
+    self.index = json.loads(self.buffer[index_offset:index_offset + index_length])
+    self.tables = {}
+    self.field_positions = {}
+    for kind in KINDS:
+      info = self.index[kind]
+      count = len(info['keys']) * len(info['fields']) * 2
+      self.tables[kind] = memoryview(self.buffer)[info['table']:info['table'] + count * 8].cast('Q')
+      self.field_positions[kind] = {field: i for i, field in enumerate(info['fields'])}
+    self.records = {}
+
+  def locate(self, kind, position, field):
+    field_position = self.field_positions[kind].get(field)
+    if field_position is None:
+      return 0, 0
+    i = (position * len(self.field_positions[kind]) + field_position) * 2
+    table = self.tables[kind]
+    return table[i], table[i + 1]
+
+  def has_field(self, kind, position, field):
+    return self.locate(kind, position, field)[1] > 0
+
+  def read_field(self, kind, position, field):
+    offset, length = self.locate(kind, position, field)
+    if length == 0:
+      raise KeyError(field)
+    return json.loads(self.buffer[offset:offset + length])
+
+  def get(self, kind, name):
+    aliases = self.index[kind]['aliases']
+    position = aliases.get(str(name))
+    # 全国图鉴编号可以不补零，如 25 -> 0025
+    if position is None and str(name).isdigit():
+      position = aliases.get(str(name).zfill(4))
+    if position is None:
+      raise KeyError(name)
+    record = self.records.get((kind, position))
+    if record is None:
+      record = RECORD_TYPES[kind](self, kind, position)
+      self.records[(kind, position)] = record
+    return record
+
+  def pokemon(self, name):
+    return self.get('pokemon', name)
+
+  def move(self, name):
+    return self.get('moves', name)
+
+  def ability(self, name):
+    return self.get('abilities', name)
+
+  def iter(self, kind):
+    for position in range(len(self.index[kind]['keys'])):
+      yield self.get(kind, self.index[kind]['keys'][position])
+
+  def all_pokemon(self):
+    return self.iter('pokemon')
+
+  def all_moves(self):
+    return self.iter('moves')
+
+  def all_abilities(self):
+    return self.iter('abilities')
+
+  def close(self):
+    for table in self.tables.values():
+      table.release()
+    self.tables = {}
+    self.buffer.close()
+    self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+# 数据包不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(pack_path=PACK_PATH, data_path=PATH):
+  if os.path.exists(pack_path):
+    dataset = Dataset(pack_path)
+    if dataset.index.get('source') == get_source(data_path):
+      return dataset
+    dataset.close()
+  build_pack(data_path, pack_path)
+  return Dataset(pack_path)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='构建或查询宝可梦数据包')
+  parser.add_argument('command', choices=['build', 'get'])
+  parser.add_argument('name', nargs='?')
+  parser.add_argument('field', nargs='?')
+  parser.add_argument('--pack', default=PACK_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    build_pack(pack_path=args.pack)
+    print(f'{args.pack}: {os.path.getsize(args.pack) / 1024 / 1024:.1f} MB in {time.perf_counter() - start:.1f}s')
+  else:
+    with load(args.pack) as dataset:
+      record = dataset.pokemon(args.name)
+      value = record[args.field] if args.field else record.to_dict()
+      json.dump(value, sys.stdout, ensure_ascii=False, indent=2)
+      print()
@@ -0,0 +1,106 @@
+import json
+import math
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# 记录一条的字段：阶段、宝可梦、墙钟时间、CPU 时间（当前线程）、新分配的内存块数、内存峰值（字节，未开启时为 0）
+RECORD_FIELDS = ['stage', 'key', 'wall', 'cpu', 'blocks', 'peak']
+
+# 可选的计时工具：不传 profiler 时各处的开销只有一次 None 判断
+# 阶段名用 . 分层，如 fetch、parse、index、extract.moves，导出火焰图时按 . 拆成调用栈
+class Profiler:
+  def __init__(self, memory=False):
+    self.memory = memory
+    self.records = []
+    self.lock = threading.Lock()
+    if memory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+
+  @contextmanager
+  def measure(self, stage, key=None):
+    if self.memory:
+      tracemalloc.reset_peak()
+    blocks = sys.getallocatedblocks()
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+      yield
+    finally:
+      record = (
+        stage,
+        key,
+        time.perf_counter() - wall,
+        time.thread_time() - cpu,
+        sys.getallocatedblocks() - blocks,
+        tracemalloc.get_traced_memory()[1] if self.memory else 0,
+      )
+      with self.lock:
+        self.records.append(record)
+
+  def extend(self, records):
+    with self.lock:
+      self.records.extend(tuple(record) for record in records)
+
+  def stop(self):
+    if self.memory and tracemalloc.is_tracing():
+      tracemalloc.stop()
+
+def measure(profiler, stage, key=None):
+  return profiler.measure(stage, key) if profiler is not None else nullcontext()
+
+# 最近秩法求分位数
+def percentile(values, q):
+  if not values:
+    return 0
+  values = sorted(values)
+  return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+def summarize(records, slowest=10):
+  stages = {}
+  species = {}
+  for stage, key, wall, cpu, blocks, peak in records:
+    stages.setdefault(stage, []).append((wall, cpu, blocks, peak))
+    if key is not None:
+      species[key] = species.get(key, 0) + wall
+
+  report = {'stages': {}, 'slowest': []}
+  for stage, rows in sorted(stages.items()):
+    walls = [row[0] for row in rows]
+    report['stages'][stage] = {
+      'count': len(rows),
+      'total': sum(walls),
+      'p50': percentile(walls, 50),
+      'p95': percentile(walls, 95),
+      'max': max(walls),
+      'cpu': sum(row[1] for row in rows),
+      'blocks': sum(row[2] for row in rows),
+      'peak': max(row[3] for row in rows),
+    }
+  ranked = sorted(species.items(), key=lambda item: -item[1])[:slowest]
+  report['slowest'] = [{'key': key, 'wall': wall} for key, wall in ranked]
+  return report
+
+def write_report(records, path, slowest=10):
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(summarize(records, slowest), f, ensure_ascii=False, indent=2)
+
+# 导出 flamegraph.pl / speedscope 可读的 folded 格式：每行 "栈;帧 微秒数"
+def write_folded(records, path):
+  stacks = {}
+  for stage, key, wall, *rest in records:
+    frames = [str(key)] if key is not None else []
+    stack = ';'.join(frames + stage.split('.'))
+    stacks[stack] = stacks.get(stack, 0) + wall
+  with open(path, 'w', encoding='utf-8') as f:
+    for stack, wall in sorted(stacks.items()):
+      f.write(f'{stack} {round(wall * 1e6)}\n')
+
+def print_report(report):
+  print(f'{"stage":<28}{"count":>7}{"total s":>10}{"p50 ms":>10}{"p95 ms":>10}{"cpu s":>9}')
+  for stage, row in sorted(report['stages'].items(), key=lambda item: -item[1]['total']):
+    print(f'{stage:<28}{row["count"]:>7}{row["total"]:>10.2f}{row["p50"] * 1000:>10.1f}{row["p95"] * 1000:>10.1f}{row["cpu"]:>9.2f}')
+  if report['slowest']:
+    print('slowest: ' + ', '.join(f'{item["key"]} ({item["wall"]:.2f}s)' for item in report['slowest']))
@@ -0,0 +1,185 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from array_pack import is_current, read_arrays, write_arrays
+from pokemon_dataset import (BUILD_PATH, PATH, TYPE_INDEX, TYPES, get_source, is_gmax, is_mega, iter_json_dir,
+                             load_json, match_form_stats, parse_number)
+
+INDEX_PATH = os.path.join(BUILD_PATH, 'similarity.bin')
+# 构建索引所用的数据
+SOURCES = ['pokemon', 'pokedex/national.json']
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+BLOCKS = ['stats', 'types', 'abilities', 'egg_groups', 'size']
+
+def unit(vector):
+  norm = np.linalg.norm(vector)
+  return vector / norm if norm else vector
+
+def iter_forms(data_path=PATH):
+  generations = {entry['id']: entry.get('gen') for entry in load_json(os.path.join(data_path, 'pokedex', 'national.json'))}
+  for key, record in iter_json_dir('pokemon', data_path):
+    species_id = record['pokedex_id']
+    for form, stats in zip(record['forms'], match_form_stats(record)):
+      yield species_id, record['name_zh'], form, stats, generations.get(species_id) or 0
+
+# 每个形态编码为定长向量，分为种族值、属性、特性、蛋群、身高体重五段；
+# 多值的段（属性、特性、蛋群）为归一化的多热向量
+def encode_forms(data_path=PATH):
+  forms = list(iter_forms(data_path))
+  abilities = sorted({ability['name'] for _, _, form, _, _ in forms for ability in form.get('abilities', [])})
+  egg_groups = sorted({group for _, _, form, _, _ in forms for group in form.get('egg_groups', [])})
+  ability_index = {name: i for i, name in enumerate(abilities)}
+  egg_group_index = {name: i for i, name in enumerate(egg_groups)}
+
+  blocks = {name: [] for name in BLOCKS}
+  meta = []
+  for species_id, species_name, form, stats, generation in forms:
+    blocks['stats'].append([parse_number(stats.get(name), 0) if stats else 0 for name in STATS])
+    types = np.zeros(len(TYPES), dtype=np.float32)
+    types[[TYPE_INDEX[name] for name in form.get('types', []) if name in TYPE_INDEX]] = 1
+    blocks['types'].append(unit(types))
+    ability_vector = np.zeros(len(abilities), dtype=np.float32)
+    ability_vector[[ability_index[ability['name']] for ability in form.get('abilities', [])]] = 1
+    blocks['abilities'].append(unit(ability_vector))
+    egg_group_vector = np.zeros(len(egg_groups), dtype=np.float32)
+    egg_group_vector[[egg_group_index[group] for group in form.get('egg_groups', [])]] = 1
+    blocks['egg_groups'].append(unit(egg_group_vector))
+    # 身高体重跨度大，取对数
+    blocks['size'].append([math.log1p(parse_number(form.get('height'), 0)), math.log1p(parse_number(form.get('weight'), 0))])
+    meta.append([species_id, species_name, form['name'], generation, is_mega(form), is_gmax(form)])
+  vocabulary = {'abilities': abilities, 'egg_groups': egg_groups}
+  return {name: np.array(values, dtype=np.float32) for name, values in blocks.items()}, meta, vocabulary
+
+# 各段缩放到随机两个形态之间平方距离的期望为 1，权重都为 1 时各段贡献相当
+def scale_block(values):
+  total_variance = values.var(axis=0).sum()
+  return values / math.sqrt(2 * total_variance) if total_variance else values
+
+def build_index(data_path=PATH, index_path=INDEX_PATH):
+  blocks, meta, vocabulary = encode_forms(data_path)
+  scaled = []
+  offsets = [0]
+  for name in BLOCKS:
+    values = blocks[name]
+    if name in ('stats', 'size'):
+      values = values - values.mean(axis=0)
+    values = scale_block(values)
+    scaled.append(values)
+    offsets.append(offsets[-1] + values.shape[1])
+  features = np.hstack(scaled).astype(np.float32)
+  norms = np.stack([(values ** 2).sum(axis=1) for values in scaled], axis=1).astype(np.float32)
+  write_arrays(index_path, {'source': get_source(data_path, SOURCES), 'forms': meta, 'blocks': BLOCKS, 'offsets': offsets, **vocabulary}, {
+    'features': features,
+    # 每个形态各段的平方范数，查询时距离展开为 |x|^2 + |q|^2 - 2x·q
+    'norms': norms,
+    'species': np.array([int(form[0]) for form in meta], dtype=np.uint16),
+    'generations': np.array([form[3] for form in meta], dtype=np.uint8),
+    'is_mega': np.array([form[4] for form in meta], dtype=np.bool_),
+    'is_gmax': np.array([form[5] for form in meta], dtype=np.bool_),
+  })
+  return index_path
+
+class SimilarityIndex:
+  def __init__(self, index_path=INDEX_PATH):
+    self.meta, self.arrays = read_arrays(index_path)
+    self.forms = self.meta['forms']
+    self.features = self.arrays['features']
+    self.norms = self.arrays['norms']
+    self.offsets = self.meta['offsets']
+    self.rows = {}
+    for i, (species_id, species_name, form_name, *rest) in enumerate(self.forms):
+      for key in [species_id, str(int(species_id)), species_name]:
+        self.rows.setdefault(key, []).append(i)
+      self.rows.setdefault(form_name, [i])
+
+  def find(self, name, form=None):
+    rows = self.rows.get(str(name))
+    if rows is None:
+      raise KeyError(name)
+    if form is None:
+      return rows[0]
+    for i in rows:
+      if self.forms[i][2] == form:
+        return i
+    raise KeyError(f'{name} {form}')
+
+  # weights 为 {段名: 权重}，未给出的段权重为 1
+  def get_weights(self, weights=None):
+    block_weights = np.array([(weights or {}).get(name, 1.0) for name in BLOCKS], dtype=np.float32)
+    column_weights = np.repeat(block_weights, np.diff(self.offsets))
+    return block_weights, column_weights
+
+  def query(self, vector, norms, k=10, weights=None, generations=None, exclude_mega=False, exclude_gmax=False,
+            exclude_species=None):
+    block_weights, column_weights = self.get_weights(weights)
+    distances = self.norms @ block_weights + norms @ block_weights - 2 * (self.features @ (vector * column_weights))
+    mask = np.ones(len(distances), dtype=bool)
+    if generations:
+      mask &= np.isin(self.arrays['generations'], generations)
+    if exclude_mega:
+      mask &= ~self.arrays['is_mega']
+    if exclude_gmax:
+      mask &= ~self.arrays['is_gmax']
+    if exclude_species is not None:
+      mask &= self.arrays['species'] != int(exclude_species)
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > k:
+      candidates = candidates[np.argpartition(distances[candidates], k)[:k]]
+    candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+    return [self.get_hit(i, distances[i]) for i in candidates]
+
+  def get_hit(self, i, distance):
+    species_id, species_name, form_name, generation, mega, gmax = self.forms[i]
+    return {
+      'species_id': species_id,
+      'name': species_name,
+      'form': form_name,
+      'generation': generation,
+      'distance': math.sqrt(max(float(distance), 0)),
+    }
+
+  # 与某个形态相似的其他宝可梦，默认排除同一种宝可梦的其他形态
+  def similar(self, name, form=None, k=10, weights=None, include_same_species=False, **filters):
+    i = self.find(name, form)
+    exclude = None if include_same_species else self.arrays['species'][i]
+    return self.query(self.features[i], self.norms[i], k, weights, exclude_species=exclude, **filters)
+
+# 索引不存在或不是由 data_path 的当前数据构建时，先重新构建
+def load(index_path=INDEX_PATH, data_path=PATH):
+  if not is_current(index_path, get_source(data_path, SOURCES)):
+    build_index(data_path, index_path)
+  return SimilarityIndex(index_path)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='构建或查询按种族值、属性、特性、蛋群和身高体重的相似宝可梦索引')
+  parser.add_argument('command', choices=['build', 'query'])
+  parser.add_argument('name', nargs='?')
+  parser.add_argument('--form')
+  parser.add_argument('-k', type=int, default=10)
+  parser.add_argument('--weight', action='append', default=[], metavar='BLOCK=WEIGHT', help=f'段: {", ".join(BLOCKS)}')
+  parser.add_argument('--gen', type=int, action='append', help='只返回这些世代的宝可梦')
+  parser.add_argument('--no-mega', action='store_true')
+  parser.add_argument('--no-gmax', action='store_true')
+  parser.add_argument('--same-species', action='store_true', help='包含同一种宝可梦的其他形态')
+  parser.add_argument('--index', default=INDEX_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    start = time.perf_counter()
+    build_index(index_path=args.index)
+    index = load(args.index)
+    print(f'{args.index}: {len(index.forms)} forms x {index.features.shape[1]} features in {time.perf_counter() - start:.1f}s')
+  else:
+    index = load(args.index)
+    weights = {block: float(value) for block, value in (item.split('=') for item in args.weight)}
+    start = time.perf_counter()
+    hits = index.similar(args.name, args.form, args.k, weights, args.same_species, generations=args.gen,
+                         exclude_mega=args.no_mega, exclude_gmax=args.no_gmax)
+    elapsed = time.perf_counter() - start
+    for hit in hits:
+      print(f'{hit["distance"]:6.3f} {hit["species_id"]} {hit["form"]} (gen {hit["generation"]})')
+    print(f'{len(hits)} hits in {elapsed * 1000:.2f} ms')
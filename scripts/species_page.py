@@ -0,0 +1,232 @@
+import argparse
+import os
+import unicodedata
+from html import escape
+
+from pokemon_dataset import BUILD_PATH, PATH, iter_json_dir
+
+SYNTHETIC_CORPUS_PATH = os.path.join(BUILD_PATH, 'corpus')
+IMAGE_HOST = '//media.52poke.com/wiki'
+STATS = [('hp', 'HP'), ('attack', '攻击'), ('defense', '防御'), ('sp_attack', '特攻'), ('sp_defense', '特防'), ('speed', '速度')]
+# 名称表中的语言行，任天堂一行取台湾的译名
+NAME_ROWS = [('中文-台湾', '任天堂'), ('英文', '英文'), ('法文', '法文'), ('德文', '德文'), ('意大利文', '意大利文'),
+             ('西班牙文', '西班牙文')]
+
+def text(value):
+  return escape(str(value if value is not None else ''), quote=False)
+
+def attr(value):
+  return escape(str(value if value is not None else ''))
+
+def heading(span_id):
+  return f'<h2><span class="mw-headline" id="{attr(span_id)}">{text(span_id)}</span></h2>'
+
+def find_name(record, language):
+  return next((item['name'] for item in record.get('names') or [] if item['language'] == language), '')
+
+def render_names(record):
+  rows = []
+  for language, label in NAME_ROWS:
+    name = find_name(record, language) or record['name_zh']
+    rows.append(f'<tr class="varname1"><td>{text(language)}</td><td>{text(label)}</td><td>{text(name)}</td></tr>')
+  korean = (find_name(record, '韩文').split() or [''])[0]
+  return (f'<table class="wiki-nametable roundy">{"".join(rows)}'
+          f'<tr><td>日文</td><td><span lang="ja">{text(record["name_ja"])}</span></td>'
+          f'<td><span lang="ko">{text(korean)}</span></td></tr></table>')
+
+def titled(title, label=None):
+  return f'<b><a href="/wiki/{attr(title)}" title="{attr(title)}">{text(label or title)}</a></b>'
+
+def render_gender(ratio):
+  if not ratio or not (ratio.get('male') or ratio.get('female')):
+    return '<table class="roundy"><tr><td>无性别</td></tr></table>'
+  return (f'<table class="roundy"><tr><td><span style="color:#00F;">雄性 {ratio["male"]}%</span>，'
+          f'<span style="color:#FF6060;">雌性 {ratio["female"]}%</span></td></tr></table>')
+
+def split_note(value):
+  number, _, note = (value or '').partition('（')
+  return number, f'（{note}' if note else ''
+
+def render_form(form):
+  types = ''.join(f'<span class="type-box-9 bg-{attr(name)}"><span class="type-box-9-text">{text(name)}</span></span>'
+                  for name in form.get('types') or [])
+  abilities = [ability for ability in form.get('abilities') or [] if not ability['is_hidden']]
+  hidden = [ability for ability in form.get('abilities') or [] if ability['is_hidden']]
+  ability_cells = ''.join(
+    '<td>' + ' '.join(f'<a href="/wiki/{attr(a["name"])}" title="{attr(a["name"])}">{text(a["name"])}</a>' for a in group) + '</td>'
+    for group in [abilities, hidden] if group)
+  experience, speed = split_note(form.get('experience_100'))
+  catch_number, catch_rate = split_note(form.get('catch_rate'))
+  egg_groups = ' '.join(f'<a href="/wiki/{attr(group)}" title="{attr(group)}">{text(group)}</a>'
+                        for group in form.get('egg_groups') or [])
+  image = form.get('image') or ''
+  cells = [
+    f'<td class="roundy bgwhite fulltable"><a class="image" href="/wiki/File:{attr(image)}">'
+    f'<img alt="{attr(image)}" data-url="{IMAGE_HOST}/{attr(image)}" width="300" height="300"></a></td>',
+    f'<td class="roundy fulltable">{titled("属性")}<table class="roundy"><tr><td>{types}</td></tr></table></td>',
+    f'<td class="roundy fulltable">{titled("分类")}<table class="roundy"><tr><td>'
+    f'<a href="/wiki/{attr(form.get("category"))}" title="{attr(form.get("category"))}">{text(form.get("category"))}</a>'
+    f'</td></tr></table></td>',
+    f'<td class="roundy fulltable">{titled("特性")}<table class="roundy"><tr>{ability_cells}</tr></table></td>',
+    f'<td class="roundy fulltable">{titled("经验值", "100级时经验值")}<table class="roundy"><tr><td>{text(experience)}'
+    f'<br><small>{text(speed)}</small></td></tr></table></td>',
+    f'<td class="roundy fulltable"><b>身高</b><table class="roundy"><tr><td class="roundy">{text(form.get("height"))}</td></tr></table></td>',
+    f'<td class="roundy fulltable"><b>体重</b><table class="roundy"><tr><td class="roundy">{text(form.get("weight"))}</td></tr></table></td>',
+    f'<td class="roundy">{titled("宝可梦列表（按性别比例分类）", "性别比例")}{render_gender(form.get("gender_ratio"))}</td>',
+    f'<td class="roundy">{titled("宝可梦列表（按体形分类）", "体形")}<table class="roundy"><tr><td>'
+    f'<a href="/wiki/File:{attr(form.get("shape"))}" title="{attr(form.get("shape"))}">{text(form.get("shape"))}</a>'
+    f'</td></tr></table></td>',
+    f'<td class="roundy">{titled("宝可梦列表（按颜色分类）", "图鉴颜色")}<table class="roundy"><tr><td>'
+    f'<span>{text(form.get("color"))}</span></td></tr></table></td>',
+    f'<td class="roundy">{titled("捕获率")}<table class="roundy"><tr><td>{text(catch_number)}'
+    f'<span class="explain">{text(catch_rate)}</span></td></tr></table></td>',
+    f'<td class="roundy">{titled("宝可梦培育", "培育")}<table class="roundy"><tr><td>{egg_groups}</td>'
+    f'<td>{text(form.get("egg_cycles"))}</td></tr></table></td>',
+  ]
+  return f'<table class="roundy a-r at-c">{"".join(f"<tr>{cell}</tr>" for cell in cells)}</table>'
+
+def render_forms(record):
+  forms = record['forms']
+  html = ''
+  if len(forms) > 1:
+    rows = ''.join(f'<tr class="md-hide"><th>{text(form["name"])}</th></tr>' for form in forms)
+    html += f'<table id="multi-pm-form-table" class="roundy">{rows}</table>'
+  return html + ''.join(render_form(form) for form in forms)
+
+def render_profile(record):
+  paragraphs = [line for line in (record.get('profile') or '').split('\n') if line]
+  # 第一段带一个脚注，提取时应被去掉
+  notes = ['<sup class="reference"><a href="#cite_note-1">[1]</a></sup>'] + [''] * len(paragraphs)
+  return heading('概述') + ''.join(f'<p>{text(line)}{note}</p>' for line, note in zip(paragraphs, notes)) + '<div></div>'
+
+def render_flavor_texts(record):
+  rows = []
+  for generation in record.get('pokedex_entries') or []:
+    versions = ''.join(
+      f'<tr><td><table class="roundy"><tr><th><a href="/wiki/{attr(version["group"])}" title="{attr(version["group"])}">'
+      f'{text(version["name"])}</a></th></tr></table></td><td>{text(version["text"])}</td></tr>'
+      for version in generation['versions'])
+    rows.append(f'<tr><th class="roundytop-5">{text(generation["name"])}</th></tr>'
+                f'<tr><td><table class="roundy">{versions}</table></td></tr>')
+  return heading('图鉴介绍') + f'<table class="roundy">{"".join(rows)}</table>'
+
+def render_evolution_node(node):
+  form_name = f'<br><a href="/wiki/形态变化" title="地区形态">{text(node["form_name"])}</a>' if node.get('form_name') else ''
+  return (f'<td><table class="roundy"><tbody>'
+          f'<tr><td><a href="/wiki/File:{attr(node.get("image"))}" class="image"><img alt="{attr(node.get("image"))}"></a></td></tr>'
+          f'<tr><td><small>{text(node["stage"])}</small><br><span class="textblack">'
+          f'<a href="/wiki/{attr(node["name"])}" title="{attr(node["name"])}">{text(node["name"])}</a></span>{form_name}</td></tr>'
+          f'</tbody></table></td>')
+
+# 数据集把分支进化拆成了多条链，页面上同一形态的分支画在一行里，同阶段的后一只沿用前一只的进化来源
+def group_chains(chains):
+  groups = {}
+  for chain in chains:
+    nodes = groups.setdefault(chain[0].get('form_name'), [])
+    for node in chain:
+      if not any(node['name'] == other['name'] and node.get('form_name') == other.get('form_name') for other in nodes):
+        nodes.append(node)
+  return list(groups.values())
+
+def render_evolution(record):
+  chains = record.get('evolution_chains') or []
+  if not chains or (len(chains[0]) == 1 and chains[0][0]['stage'] == '不进化'):
+    return ''
+  rows = []
+  for chain in group_chains(chains):
+    cells = []
+    for i, node in enumerate(chain):
+      if i:
+        back = f'←{text(node["back_text"])}' if node.get('back_text') else ''
+        cells.append(f'<td>{text(node.get("text"))}→{back}</td>')
+      cells.append(render_evolution_node(node))
+    rows.append(f'<tr>{"".join(cells)}</tr>')
+  return heading('进化') + f'<table class="roundy"><tbody>{"".join(rows)}</tbody></table>'
+
+def render_stat_table(data):
+  rows = ''.join(f'<tr class="bgl-{label}"><td><span style="float:left">{label}：</span>'
+                 f'<span style="float:right">{text(data.get(name))}</span></td></tr>' for name, label in STATS)
+  return f'<table class="roundy">{rows}</table>'
+
+def render_stats(record):
+  stats = record.get('stats') or [{'form': '一般', 'data': {}}]
+  if len(stats) == 1:
+    return heading('种族值') + render_stat_table(stats[0]['data'])
+  toggles = ''.join(f'<span class="toggle-pbase">{text(item["form"])}</span>' for item in stats)
+  return heading('种族值') + f'<table class="at-c"><tr><td>{toggles}</td></tr></table>' + ''.join(
+    render_stat_table(item['data']) for item in stats)
+
+def render_move_cells(move):
+  return (f'<td><a href="/wiki/{attr(move["name"])}" title="{attr(move["name"])}">{text(move["name"])}</a>'
+          f'<span class="explain" title="{attr(move["name"])}"></span></td>'
+          f'<td><a href="/wiki/{attr(move["type"])}" title="{attr(move["type"])}">{text(move["type"])}</a></td>'
+          f'<td>{text(move["category"])}</td><td>{text(move["power"])}</td><td>{text(move["accuracy"])}</td>'
+          f'<td>{text(move["pp"])}</td><td class="hide">{text(move["name"])}</td>')
+
+def render_move_tables(title, groups, render_row):
+  groups = groups or [{'form': '一般', 'data': []}]
+  tables = [f'<table class="roundy at-c">{"".join(render_row(move) for move in group["data"])}</table>' for group in groups]
+  if len(groups) == 1:
+    return heading(title) + tables[0]
+  toggles = ''.join(f'<span class="toggle-p">{text(group["form"])}</span>' for group in groups)
+  return heading(title) + f'<table class="roundy fulltable"><tr><td>{toggles}</td></tr></table>' + ''.join(tables)
+
+def render_moves(record):
+  learned = render_move_tables('可学会的招式', record.get('learnable_moves'),
+                               lambda move: f'<tr class="at-c"><td>{text(move.get("level"))}</td>{render_move_cells(move)}</tr>')
+  machine = render_move_tables('能使用的招式学习器', record.get('machine_moves'),
+                               lambda move: f'<tr class="at-c"><td></td><td><a href="/wiki/{attr(move.get("machine"))}" '
+                                            f'title="{attr(move.get("machine"))}">{text(move.get("machine"))}</a></td>'
+                                            f'{render_move_cells(move)}</tr>')
+  return learned + machine
+
+def render_home_images(record):
+  cells = []
+  for item in record.get('home_images') or []:
+    form_name = item['name'][len(record['name_zh']) + 1:]
+    for key, star in [('image', ''), ('shiny', '<img alt="ShinyHOMEStar.png">')]:
+      if item.get(key):
+        cells.append(f'<td><img alt="HOME{attr(record["pokedex_id"])}.png" data-url="{IMAGE_HOST}/{attr(item[key])}">{star}'
+                     f'<br>{text(form_name)}</td>')
+  return heading('形象') + (f'<div><table class="roundy"><tr><th><a href="/wiki/Pokémon_HOME" title="Pokémon HOME">'
+                            f'Pokémon HOME</a></th></tr><tr class="bgwhite">{"".join(cells)}</tr></table></div>')
+
+# 根据 data/pokemon 中的一条记录生成与 52poke 宝可梦页面结构相同的 HTML，供离线基准测试和测试使用；
+# 只包含 pokemon.py 的提取函数会读取的部分
+def render_page(record):
+  sections = [
+    render_names(record), render_forms(record), render_profile(record), render_flavor_texts(record),
+    render_evolution(record), render_stats(record), render_moves(record), render_home_images(record),
+  ]
+  title = text(record['name_zh'])
+  body = '\n'.join(sections)
+  return (f'<!DOCTYPE html>\n<html lang="zh-Hans"><head><meta charset="UTF-8"><title>{title} - 神奇宝贝百科</title></head>'
+          f'<body><div id="mw-content-text">\n{body}\n</div></body></html>\n')
+
+def normalize_name(name):
+  return unicodedata.normalize('NFKC', name)
+
+# 按中文名生成页面写入 corpus_path，返回写出的 {名称: 路径}
+def write_corpus(names, corpus_path=SYNTHETIC_CORPUS_PATH, data_path=PATH):
+  wanted = {normalize_name(name): name for name in names}
+  os.makedirs(corpus_path, exist_ok=True)
+  written = {}
+  for key, record in iter_json_dir('pokemon', data_path):
+    name = wanted.get(normalize_name(record['name_zh']))
+    if name is None:
+      continue
+    path = os.path.join(corpus_path, f'{name}.html')
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(render_page(record))
+    written[name] = path
+  return written
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='根据数据集生成离线的宝可梦页面，用作基准测试语料')
+  parser.add_argument('names', nargs='+')
+  parser.add_argument('--output', default=SYNTHETIC_CORPUS_PATH)
+  args = parser.parse_args()
+
+  written = write_corpus(args.names, args.output)
+  for name in args.names:
+    print(f'{name}: {written.get(name, "not found")}')
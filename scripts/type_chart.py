@@ -0,0 +1,181 @@
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from pokemon_dataset import PATH, TYPE_INDEX, TYPES, iter_json_dir
+
+# 攻击方属性 -> {防守方属性: 倍率}，未列出的为 1 倍
+TYPE_CHART = {
+  '一般': {'岩石': 0.5, '钢': 0.5, '幽灵': 0},
+  '格斗': {'一般': 2, '岩石': 2, '钢': 2, '冰': 2, '恶': 2, '飞行': 0.5, '毒': 0.5, '虫': 0.5, '超能力': 0.5, '妖精': 0.5, '幽灵': 0},
+  '飞行': {'格斗': 2, '虫': 2, '草': 2, '岩石': 0.5, '钢': 0.5, '电': 0.5},
+  '毒': {'草': 2, '妖精': 2, '毒': 0.5, '地面': 0.5, '岩石': 0.5, '幽灵': 0.5, '钢': 0},
+  '地面': {'毒': 2, '岩石': 2, '钢': 2, '火': 2, '电': 2, '虫': 0.5, '草': 0.5, '飞行': 0},
+  '岩石': {'飞行': 2, '虫': 2, '火': 2, '冰': 2, '格斗': 0.5, '地面': 0.5, '钢': 0.5},
+  '虫': {'草': 2, '超能力': 2, '恶': 2, '格斗': 0.5, '飞行': 0.5, '毒': 0.5, '幽灵': 0.5, '钢': 0.5, '火': 0.5, '妖精': 0.5},
+  '幽灵': {'幽灵': 2, '超能力': 2, '恶': 0.5, '一般': 0},
+  '钢': {'岩石': 2, '冰': 2, '妖精': 2, '钢': 0.5, '火': 0.5, '水': 0.5, '电': 0.5},
+  '火': {'虫': 2, '钢': 2, '草': 2, '冰': 2, '岩石': 0.5, '火': 0.5, '水': 0.5, '龙': 0.5},
+  '水': {'地面': 2, '岩石': 2, '火': 2, '水': 0.5, '草': 0.5, '龙': 0.5},
+  '草': {'地面': 2, '岩石': 2, '水': 2, '飞行': 0.5, '毒': 0.5, '虫': 0.5, '钢': 0.5, '火': 0.5, '草': 0.5, '龙': 0.5},
+  '电': {'飞行': 2, '水': 2, '草': 0.5, '电': 0.5, '龙': 0.5, '地面': 0},
+  '超能力': {'格斗': 2, '毒': 2, '钢': 0.5, '超能力': 0.5, '恶': 0},
+  '冰': {'飞行': 2, '地面': 2, '草': 2, '龙': 2, '钢': 0.5, '火': 0.5, '水': 0.5, '冰': 0.5},
+  '龙': {'龙': 2, '钢': 0.5, '妖精': 0},
+  '恶': {'幽灵': 2, '超能力': 2, '格斗': 0.5, '恶': 0.5, '妖精': 0.5},
+  '妖精': {'格斗': 2, '龙': 2, '恶': 2, '毒': 0.5, '钢': 0.5, '火': 0.5},
+}
+
+# 影响受到伤害倍率的特性：types 为对应属性的额外倍率，super_effective 为效果绝佳时的倍率，
+# not_very_effective 为其余情况的倍率（神奇守护只会被效果绝佳的招式打中）
+ABILITY_MODIFIERS = {
+  '飘浮': {'types': {'地面': 0}},
+  '食土': {'types': {'地面': 0}},
+  '储水': {'types': {'水': 0}},
+  '引水': {'types': {'水': 0}},
+  '蓄电': {'types': {'电': 0}},
+  '避雷针': {'types': {'电': 0}},
+  '电气引擎': {'types': {'电': 0}},
+  '引火': {'types': {'火': 0}},
+  '焦香之躯': {'types': {'火': 0}},
+  '食草': {'types': {'草': 0}},
+  '厚脂肪': {'types': {'火': 0.5, '冰': 0.5}},
+  '干燥皮肤': {'types': {'火': 1.25, '水': 0}},
+  '耐热': {'types': {'火': 0.5}},
+  '水泡': {'types': {'火': 0.5}},
+  '毛茸茸': {'types': {'火': 2}},
+  '洁净之盐': {'types': {'幽灵': 0.5}},
+  '始源之海': {'types': {'火': 0}},
+  '终结之地': {'types': {'水': 0}},
+  # 只有烈空坐（龙、飞行）拥有，对飞行属性效果绝佳的属性变为 1 倍
+  '德尔塔气流': {'types': {'电': 0.5, '冰': 0.5, '岩石': 0.5}},
+  '坚硬岩石': {'super_effective': 0.75},
+  '过滤': {'super_effective': 0.75},
+  '棱镜装甲': {'super_effective': 0.75},
+  '神奇守护': {'not_very_effective': 0},
+}
+ABILITIES = [None] + list(ABILITY_MODIFIERS)
+ABILITY_INDEX = {name: i for i, name in enumerate(ABILITIES)}
+NO_TYPE = -1
+
+def build_chart():
+  chart = np.ones((len(TYPES), len(TYPES)), dtype=np.float32)
+  for attacker, row in TYPE_CHART.items():
+    for defender, value in row.items():
+      chart[TYPE_INDEX[attacker], TYPE_INDEX[defender]] = value
+  return chart
+
+def build_ability_tables():
+  factors = np.ones((len(ABILITIES), len(TYPES)), dtype=np.float32)
+  super_effective = np.ones(len(ABILITIES), dtype=np.float32)
+  not_very_effective = np.ones(len(ABILITIES), dtype=np.float32)
+  for i, name in enumerate(ABILITIES[1:], start=1):
+    modifier = ABILITY_MODIFIERS[name]
+    for type_name, value in modifier.get('types', {}).items():
+      factors[i, TYPE_INDEX[type_name]] = value
+    super_effective[i] = modifier.get('super_effective', 1)
+    not_very_effective[i] = modifier.get('not_very_effective', 1)
+  return factors, super_effective, not_very_effective
+
+# 攻击方 x 防守方
+CHART = build_chart()
+# 按防守方属性取行；最后一行全为 1，对应没有第二属性（下标 -1）
+DEFENSE = np.vstack([CHART.T, np.ones((1, len(TYPES)), dtype=np.float32)])
+ABILITY_FACTORS, SUPER_EFFECTIVE, NOT_VERY_EFFECTIVE = build_ability_tables()
+
+def get_type_ids(types):
+  ids = [TYPE_INDEX[t] for t in types[:2]]
+  return ids + [NO_TYPE] * (2 - len(ids))
+
+# type_effectiveness 的 form 既可能是特性名（如 '(避雷针)'、'过滤'），也可能是形态名（如 '阿罗拉'）
+def find_ability(label):
+  for name in ABILITY_MODIFIERS:
+    if name in (label or ''):
+      return name
+  return None
+
+# 批量计算防守倍率：type1/type2/abilities 为长度 N 的数组，返回 (N, 18)，列为攻击方属性
+def defense_multipliers(type1, type2, abilities=None):
+  type1 = np.asarray(type1)
+  type2 = np.asarray(type2)
+  result = DEFENSE[type1] * DEFENSE[type2]
+  if abilities is None:
+    return result
+  abilities = np.asarray(abilities)
+  result = result * ABILITY_FACTORS[abilities]
+  super_effective = result > 1
+  result = np.where(super_effective, result * SUPER_EFFECTIVE[abilities, None], result * NOT_VERY_EFFECTIVE[abilities, None])
+  return result.astype(np.float32)
+
+def get_multipliers(types, ability=None):
+  type1, type2 = get_type_ids(types)
+  return defense_multipliers([type1], [type2], [ABILITY_INDEX[ability]])[0]
+
+# 用引擎重新计算 data/pokemon 中每一条 type_effectiveness，返回不一致的条目
+def validate(data_path=PATH):
+  rows = []
+  expected = []
+  for key, record in iter_json_dir('pokemon', data_path):
+    for item in record['type_effectiveness']:
+      row = np.ones(len(TYPES), dtype=np.float32)
+      for entry in item['data']:
+        row[TYPE_INDEX[entry['type']]] = float(entry['damage'])
+      rows.append((key, item['form'], item['types']))
+      expected.append(row)
+
+  type_ids = np.array([get_type_ids(types) for key, label, types in rows])
+  abilities = np.array([ABILITY_INDEX[find_ability(label)] for key, label, types in rows])
+  computed = defense_multipliers(type_ids[:, 0], type_ids[:, 1], abilities)
+  expected = np.array(expected)
+  mismatched = ~np.isclose(computed, expected).all(axis=1)
+
+  errors = []
+  for i in np.flatnonzero(mismatched):
+    key, label, types = rows[i]
+    columns = np.flatnonzero(~np.isclose(computed[i], expected[i]))
+    errors.append({
+      'key': key,
+      'form': label,
+      'types': types,
+      'differences': {TYPES[c]: {'stored': float(expected[i, c]), 'computed': float(computed[i, c])} for c in columns},
+    })
+  return len(rows), errors
+
+# 队伍属性弱点覆盖：members 为 (M, 18) 的防守倍率，teams 为 (T, 6) 的成员下标
+# 返回每支队伍对每种攻击属性的弱点数、抵抗数（含免疫）和免疫数，均为 (T, 18)
+def team_coverage(members, teams):
+  multipliers = members[np.asarray(teams)]
+  return {
+    'weak': (multipliers > 1).sum(axis=1, dtype=np.int8),
+    'resist': (multipliers < 1).sum(axis=1, dtype=np.int8),
+    'immune': (multipliers == 0).sum(axis=1, dtype=np.int8),
+  }
+
+# 弱点数超过抵抗数的部分之和，越小越好
+def team_weakness_score(coverage):
+  return np.maximum(coverage['weak'] - coverage['resist'], 0).sum(axis=1)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='属性相性计算，并与 data/pokemon 中的 type_effectiveness 对照')
+  parser.add_argument('--verbose', action='store_true')
+  parser.add_argument('--teams', type=int, default=10000, help='队伍覆盖计算的测速队伍数')
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  total, errors = validate()
+  print(f'validated {total} type_effectiveness entries in {time.perf_counter() - start:.2f}s, {len(errors)} mismatched')
+  if errors:
+    print(f'  by form label: {dict(Counter(error["form"] for error in errors).most_common(10))}')
+  if args.verbose:
+    for error in errors:
+      print(f'  {error["key"]} {error["form"]} {error["types"]}: {error["differences"]}')
+
+  type1, type2 = np.meshgrid(np.arange(len(TYPES)), np.arange(-1, len(TYPES)))
+  members = defense_multipliers(type1.ravel(), type2.ravel())
+  teams = np.random.default_rng(0).integers(0, len(members), size=(args.teams, 6))
+  start = time.perf_counter()
+  score = team_weakness_score(team_coverage(members, teams))
+  elapsed = time.perf_counter() - start
+  print(f'team coverage for {args.teams} teams in {elapsed * 1000:.1f} ms, best score {score.min()}')
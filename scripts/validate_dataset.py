@@ -0,0 +1,225 @@
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from normalize_moves import NAME_SUFFIX_RE
+from pokemon_dataset import PATH, TYPES, load_json, parse_number
+
+REQUIRED_FIELDS = ['name_zh', 'name_ja', 'name_en', 'pokedex_id', 'forms', 'stats', 'type_effectiveness',
+                   'evolution_chains', 'learnable_moves', 'machine_moves', 'egg_moves', 'home_images']
+FORM_FIELDS = ['name', 'types', 'abilities', 'egg_groups', 'height', 'weight', 'image']
+STATS = ['hp', 'attack', 'defense', 'sp_attack', 'sp_defense', 'speed']
+LEARNSET_FIELDS = ['learnable_moves', 'machine_moves', 'egg_moves']
+# 各类图片所在目录
+IMAGE_DIRECTORIES = ['official', 'home', 'dream']
+# 没有特性的形态（如超极巨化）用这些占位
+ABILITY_PLACEHOLDERS = {'未知', '无'}
+
+# 子进程中的查找表，由 init_worker 设置
+LOOKUPS = None
+
+def intern_set(values):
+  return frozenset(sys.intern(value) for value in values if value)
+
+# 一次性读入所有被引用的名称和文件名，做成集合供各子进程查找
+def load_lookups(data_path=PATH):
+  moves = load_json(os.path.join(data_path, 'move_list.json'))
+  abilities = load_json(os.path.join(data_path, 'ability_list.json'))
+  national = load_json(os.path.join(data_path, 'pokedex', 'national.json'))
+  species = load_json(os.path.join(data_path, 'simple_pokedex.json'))
+  images = {}
+  for directory in IMAGE_DIRECTORIES:
+    path = os.path.join(data_path, 'images', directory)
+    images[directory] = intern_set(os.listdir(path) if os.path.isdir(path) else [])
+  return {
+    'data_path': data_path,
+    'moves': intern_set(move['name_zh'] for move in moves),
+    'abilities': intern_set(ability['name_zh'] for ability in abilities),
+    'national_ids': intern_set(entry['id'].zfill(4) for entry in national),
+    'species': intern_set(pokemon['name_zh'] for pokemon in species),
+    'types': frozenset(TYPES),
+    'images': images,
+  }
+
+def init_worker(lookups):
+  global LOOKUPS
+  LOOKUPS = lookups
+
+class Report:
+  def __init__(self, file):
+    self.file = file
+    self.violations = []
+
+  def add(self, path, rule, message):
+    self.violations.append({'file': self.file, 'path': path, 'rule': rule, 'message': message})
+
+  def require(self, record, fields, path=''):
+    missing = [field for field in fields if field not in record]
+    for field in missing:
+      self.add(f'{path}{field}', 'missing-field', f'required field {field} is missing')
+    return not missing
+
+def check_types(report, types, path):
+  if not 1 <= len(types) <= 2:
+    report.add(path, 'type-count', f'expected 1 or 2 types, got {len(types)}')
+  for i, name in enumerate(types):
+    if name not in LOOKUPS['types']:
+      report.add(f'{path}[{i}]', 'unknown-type', f'unknown type {name!r}')
+
+def check_image(report, name, directory, path):
+  if name and name not in LOOKUPS['images'][directory]:
+    report.add(path, 'missing-image', f'{name} not found in images/{directory}')
+
+def check_forms(report, record):
+  for i, form in enumerate(record['forms']):
+    path = f'forms[{i}]'
+    if not report.require(form, FORM_FIELDS, f'{path}.'):
+      continue
+    check_types(report, form['types'], f'{path}.types')
+    for j, ability in enumerate(form['abilities']):
+      if ability['name'] not in LOOKUPS['abilities'] and ability['name'] not in ABILITY_PLACEHOLDERS:
+        report.add(f'{path}.abilities[{j}].name', 'unknown-ability', f'{ability["name"]} not in ability_list.json')
+    check_image(report, form['image'], 'official', f'{path}.image')
+
+def check_stats(report, record):
+  if not record['stats']:
+    report.add('stats', 'missing-stats', 'no base stats')
+  for i, item in enumerate(record['stats']):
+    for name in STATS:
+      value = item['data'].get(name)
+      if value is None:
+        report.add(f'stats[{i}].data.{name}', 'missing-field', f'stat {name} is missing')
+      elif math.isnan(parse_number(value)):
+        report.add(f'stats[{i}].data.{name}', 'invalid-stat', f'{value!r} is not a number')
+
+def check_learnsets(report, record):
+  for field in LEARNSET_FIELDS:
+    for i, group in enumerate(record[field]):
+      for j, move in enumerate(group['data']):
+        path = f'{field}[{i}].data[{j}]'
+        # 招式名后的 *、‡、USUM 是百科的注记
+        if NAME_SUFFIX_RE.sub('', move['name']) not in LOOKUPS['moves']:
+          report.add(f'{path}.name', 'unknown-move', f'{move["name"]} not in move_list.json')
+        for k, parent in enumerate(move.get('parents') or []):
+          # 没有编号的亲代是道具（如模仿香草）
+          if parent.get('id') and parent['name'] not in LOOKUPS['species']:
+            report.add(f'{path}.parents[{k}].name', 'unknown-species', f'{parent["name"]} not in simple_pokedex.json')
+
+def check_evolution(report, record):
+  for i, chain in enumerate(record['evolution_chains']):
+    names = {node['name'] for node in chain}
+    for j, node in enumerate(chain):
+      path = f'evolution_chains[{i}][{j}]'
+      if node.get('from') and node['from'] not in names:
+        report.add(f'{path}.from', 'unknown-evolution-source', f'{node["from"]} is not in the chain')
+      check_image(report, node.get('image'), 'dream', f'{path}.image')
+  for field in ['mega_evolution', 'gigantamax_evolution']:
+    for i, item in enumerate(record.get(field) or []):
+      check_image(report, item.get('image'), 'dream', f'{field}[{i}].image')
+
+def check_home_images(report, record):
+  for i, item in enumerate(record['home_images']):
+    for field in ['image', 'shiny']:
+      check_image(report, item.get(field), 'home', f'home_images[{i}].{field}')
+
+def check_pokemon(path):
+  report = Report(os.path.relpath(path, LOOKUPS['data_path']))
+  try:
+    record = load_json(path)
+  except ValueError as e:
+    report.add('', 'invalid-json', str(e))
+    return report.violations
+  if not report.require(record, REQUIRED_FIELDS):
+    return report.violations
+  if not os.path.basename(path).startswith(f'{record["pokedex_id"]}-'):
+    report.add('pokedex_id', 'file-name', f'{record["pokedex_id"]} does not match the file name')
+  if record['pokedex_id'] not in LOOKUPS['national_ids']:
+    report.add('pokedex_id', 'unknown-national-id', f'{record["pokedex_id"]} not in national.json')
+  for check in [check_forms, check_stats, check_learnsets, check_evolution, check_home_images]:
+    try:
+      check(report, record)
+    except (KeyError, TypeError, AttributeError) as e:
+      report.add(check.__name__[len('check_'):], 'schema', f'{type(e).__name__}: {e}')
+  return report.violations
+
+def check_pokedex(path):
+  report = Report(os.path.relpath(path, LOOKUPS['data_path']))
+  national = os.path.basename(path) == 'national.json'
+  try:
+    entries = load_json(path)
+  except ValueError as e:
+    report.add('', 'invalid-json', str(e))
+    return report.violations
+  for i, entry in enumerate(entries):
+    national_id = entry.get('id') if national else entry.get('national_id')
+    # 部分地区图鉴的全国编号只有三位
+    if not national and str(national_id).zfill(4) not in LOOKUPS['national_ids']:
+      report.add(f'[{i}].national_id', 'unknown-national-id', f'{national_id} ({entry.get("name")}) not in national.json')
+    check_types(report, entry.get('types', []), f'[{i}].types')
+  return report.violations
+
+# 列表文件：编号唯一、属性合法
+def check_lists(data_path=PATH):
+  violations = []
+  for file_name in ['move_list.json', 'ability_list.json']:
+    report = Report(file_name)
+    records = load_json(os.path.join(data_path, file_name))
+    counts = Counter(record['id'] for record in records)
+    for i, record in enumerate(records):
+      # 极巨招式等没有编号，记为 '—'
+      if counts[record['id']] > 1 and record['id'].isdigit():
+        report.add(f'[{i}].id', 'duplicate-id', f'id {record["id"]} ({record["name_zh"]}) is used {counts[record["id"]]} times')
+      if 'type' in record and record['type'] not in TYPES:
+        report.add(f'[{i}].type', 'unknown-type', f'unknown type {record["type"]!r}')
+    violations += report.violations
+  return violations
+
+def check_file(task):
+  kind, path = task
+  return CHECKS[kind](path)
+
+CHECKS = {
+  'pokemon': check_pokemon,
+  'pokedex': check_pokedex,
+}
+
+def validate(data_path=PATH, workers=None):
+  lookups = load_lookups(data_path)
+  tasks = [('pokemon', path) for path in sorted(glob.glob(os.path.join(data_path, 'pokemon', '*.json')))]
+  tasks += [('pokedex', path) for path in sorted(glob.glob(os.path.join(data_path, 'pokedex', '*.json')))]
+  violations = check_lists(data_path)
+  with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(lookups,)) as pool:
+    for result in pool.map(check_file, tasks, chunksize=32):
+      violations += result
+  return violations, len(tasks) + 2
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='检查数据集的交叉引用和字段格式，有问题时以非零状态退出')
+  parser.add_argument('--data', default=PATH)
+  parser.add_argument('--workers', type=int, default=None, help='进程数，默认为 CPU 核数')
+  parser.add_argument('--output', help='把全部问题写入该 JSON 文件')
+  parser.add_argument('--limit', type=int, default=20, help='每条规则最多打印的问题数')
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  violations, file_count = validate(args.data, args.workers)
+  elapsed = time.perf_counter() - start
+  counts = Counter(violation['rule'] for violation in violations)
+  printed = Counter()
+  for violation in violations:
+    printed[violation['rule']] += 1
+    if printed[violation['rule']] <= args.limit:
+      print(f'[{violation["rule"]}] {violation["file"]}: {violation["path"]}: {violation["message"]}')
+  if args.output:
+    with open(args.output, 'w', encoding='utf-8') as f:
+      json.dump(violations, f, ensure_ascii=False, indent=2)
+  for rule, count in counts.most_common():
+    print(f'{rule}: {count}')
+  print(f'Checked {file_count} files in {elapsed:.1f}s, {len(violations)} problems.')
+  sys.exit(1 if violations else 0)
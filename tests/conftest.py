@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+SCRIPTS = os.path.join(ROOT, 'scripts')
+sys.path.insert(0, SCRIPTS)
+
+# 抓取脚本依赖的 fixed_data、utils 不在仓库中，缺少时跳过相关测试
+def require_scraper():
+  pytest.importorskip('fixed_data', reason='scripts/fixed_data.py is not available')
+  pytest.importorskip('utils', reason='scripts/utils.py is not available')
+
+def read_fixture(name):
+  with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as f:
+    return f.read()
+
+# 本地 HTTP 服务器，按顺序返回 responses 中预设的 (状态码, 正文, 响应头, 延迟秒数)，最后一个响应重复使用；
+# routes 中有请求路径时改用该路径的响应列表。正文为 str 时按 UTF-8 HTML 返回，为 bytes 时原样返回
+class LocalServer:
+  def __init__(self):
+    self.responses = [(200, '', {}, 0)]
+    self.routes = {}
+    self.requests = []
+    server = self
+
+    class Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        path = unquote(self.path)
+        server.requests.append({'path': path, 'headers': dict(self.headers)})
+        responses = server.routes.get(path, server.responses)
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+        status, body, headers, delay = tuple(response) + ('', {}, 0)[len(response) - 1:]
+        if delay:
+          time.sleep(delay)
+        data = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+          self.send_header(name, value)
+        if 'Content-Type' not in headers:
+          self.send_header('Content-Type', 'application/octet-stream' if isinstance(body, bytes) else 'text/html; charset=utf-8')
+        # 响应头中给出更大的 Content-Length 可以模拟传输中断
+        if 'Content-Length' not in headers:
+          self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+          self.wfile.write(data)
+        except ConnectionError:
+          # 客户端已超时断开
+          pass
+
+      def log_message(self, *args):
+        pass
+
+    self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+    self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    self.thread.start()
+
+  def close(self):
+    self.httpd.shutdown()
+    self.httpd.server_close()
+
+# 抓取脚本中的 PATH 是相对于 scripts 目录的
+@pytest.fixture
+def scripts_dir(monkeypatch):
+  monkeypatch.chdir(SCRIPTS)
+  return SCRIPTS
+
+@pytest.fixture
+def server():
+  server = LocalServer()
+  yield server
+  server.close()
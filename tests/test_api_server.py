@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import json
+from urllib.parse import quote
+
+import pytest
+
+from conftest import ROOT
+from api_server import MAX_HEADER_BYTES, DatasetApi, ResponseCache, Server, get_cache_key, match_etag
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+  build_path = tmp_path_factory.mktemp('build')
+  return DatasetApi(f'{ROOT}/data', str(build_path / 'dataset.pack'), str(build_path / 'inverted_index.bin'))
+
+async def exchange(server, requests, method='GET'):
+  listener = await asyncio.start_server(server.handle, '127.0.0.1', 0, limit=MAX_HEADER_BYTES)
+  port = listener.sockets[0].getsockname()[1]
+  reader, writer = await asyncio.open_connection('127.0.0.1', port)
+  responses = []
+  try:
+    for i, (target, headers) in enumerate(requests):
+      # 最后一个请求让服务端关闭连接，handle 正常退出
+      connection = 'close' if i == len(requests) - 1 else 'keep-alive'
+      lines = [f'{method} {target} HTTP/1.1', 'Host: localhost', f'Connection: {connection}'] + \
+              [f'{name}: {value}' for name, value in headers.items()]
+      writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+      await writer.drain()
+      head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+      response_headers = dict(line.split(': ', 1) for line in head[1:] if line)
+      length = 0 if method == 'HEAD' else int(response_headers['Content-Length'])
+      responses.append((int(head[0].split(' ')[1]), response_headers, await reader.readexactly(length)))
+  finally:
+    writer.close()
+    await writer.wait_closed()
+    listener.close()
+    await listener.wait_closed()
+  return responses
+
+# 在同一个 keep-alive 连接上依次发送请求，每个请求为路径或 (路径, 请求头)，返回 [(状态码, 响应头, 正文)]
+def request(server, *requests, method='GET'):
+  requests = [(request, {}) if isinstance(request, str) else request for request in requests]
+  return asyncio.run(exchange(server, requests, method))
+
+def get_json(body):
+  return json.loads(body.decode('utf-8'))
+
+def test_routes(api):
+  server = Server(api)
+  index, pokemon, field, pokedex, search = request(server, '/', quote('/pokemon/妙蛙种子'),
+                                                   quote('/pokemon/1/stats'), '/pokedex',
+                                                   quote('/search?ability=硬爪&type=龙', safe='/?=&'))
+  assert index[0] == 200 and '/search' in get_json(index[2])['routes']
+  assert pokemon[0] == 200 and get_json(pokemon[2])['name_zh'] == '妙蛙种子'
+  assert field[0] == 200 and get_json(field[2]) == get_json(pokemon[2])['stats']
+  assert 'national' in get_json(pokedex[2])
+  assert [entry['name_zh'] for entry in get_json(search[2])] == ['喷火龙']
+
+def test_not_found_is_not_cached(api):
+  server = Server(api)
+  missing, no_route = request(server, quote('/pokemon/不存在'), '/nothing/here')
+  assert missing[0] == 404 and 'not found' in get_json(missing[2])['error']
+  assert no_route[0] == 404
+  assert not server.cache.entries
+
+def test_method_not_allowed(api):
+  [(status, headers, body)] = request(Server(api), '/', method='POST')
+  assert status == 405
+
+def test_etag_and_not_modified(api):
+  server = Server(api)
+  target = quote('/pokemon/妙蛙种子')
+  [(status, headers, body)] = request(server, target)
+  etag = headers['ETag']
+  for value in [etag, f'W/{etag}', f'"other", {etag}', f'"other",W/{etag}', '*']:
+    [(status, headers, body)] = request(server, (target, {'If-None-Match': value}))
+    assert (status, body) == (304, b''), value
+  [(status, headers, body)] = request(server, (target, {'If-None-Match': '"other", W/"else"'}))
+  assert status == 200 and body
+
+def test_match_etag():
+  assert match_etag('"a", W/"b"', '"b"')
+  assert match_etag(' * ', '"b"')
+  assert not match_etag('"ab"', '"b"')
+  assert not match_etag('', '"b"')
+
+def test_encoding_negotiation(api):
+  server = Server(api)
+  target = quote('/pokemon/妙蛙种子')
+  plain, compressed, unknown = request(server, target, (target, {'Accept-Encoding': 'gzip;q=1.0, deflate'}),
+                                       (target, {'Accept-Encoding': 'compress'}))
+  assert 'Content-Encoding' not in plain[1]
+  assert compressed[1]['Content-Encoding'] == 'gzip'
+  assert gzip.decompress(compressed[2]) == plain[2]
+  assert 'Content-Encoding' not in unknown[1] and unknown[2] == plain[2]
+  assert all(response[1]['Vary'] == 'Accept-Encoding' for response in [plain, compressed, unknown])
+
+def test_cache_eviction(api):
+  first, second = quote('/pokemon/妙蛙种子'), quote('/pokemon/妙蛙草')
+  sizes = [api.render(target).size for target in [first, second]]
+  server = Server(api, ResponseCache(max(sizes) + min(sizes) - 1))
+  request(server, first, second)
+  assert list(server.cache.entries) == [get_cache_key(second)]
+  assert server.cache.size == sizes[1]
+  request(server, second, first)
+  assert (server.cache.hits, server.cache.misses) == (1, 3)
+  assert list(server.cache.entries) == [get_cache_key(first)]
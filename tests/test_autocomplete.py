@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+import autocomplete
+from autocomplete import AutocompleteIndex, build_index
+
+# 只含几个条目的小数据集：皮卡丘与同样以 pika 开头的招式、道具，用于检查类别过滤
+POKEMON = {
+  '0006-喷火龙.json': {
+    'name_zh': '喷火龙', 'name_ja': 'リザードン', 'name_en': 'Charizard', 'pokedex_id': '0006',
+    'names': [{'language': '日文', 'name': 'リザードン\xa0Lizardon'}, {'language': '中文-台湾', 'name': '噴火龍'}],
+  },
+  '0025-皮卡丘.json': {
+    'name_zh': '皮卡丘', 'name_ja': 'ピカチュウ', 'name_en': 'Pikachu', 'pokedex_id': '0025',
+    'names': [{'language': '日文', 'name': 'ピカチュウ\xa0Pikachu'}],
+  },
+}
+MOVES = [
+  {'id': '85', 'name_zh': '十万伏特', 'name_jp': '10まんボルト', 'name_en': 'Thunderbolt'},
+  {'id': '732', 'name_zh': '皮卡皮卡必杀击', 'name_jp': 'ピカピカサンダー', 'name_en': 'Pika Papow'},
+]
+ABILITIES = [{'id': '009', 'name_zh': '静电', 'name_ja': 'せいでんき', 'name_en': 'Static'}]
+ITEMS = [{'type': 'category', 'name': '道具', 'children': [
+  {'type': 'item', 'name_zh': '电气球', 'name_ja': 'でんきだま', 'name_en': 'Light Ball'},
+  {'type': 'item', 'name_zh': '皮卡丘Z', 'name_ja': 'ピカチュウZ', 'name_en': 'Pikanium Z'},
+]}]
+
+def write_json(path, data):
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(data, f, ensure_ascii=False)
+
+@pytest.fixture(scope='module')
+def data_path(tmp_path_factory):
+  path = tmp_path_factory.mktemp('data')
+  os.makedirs(path / 'pokemon')
+  for name, record in POKEMON.items():
+    write_json(path / 'pokemon' / name, record)
+  write_json(path / 'move_list.json', MOVES)
+  write_json(path / 'ability_list.json', ABILITIES)
+  write_json(path / 'item_list.json', ITEMS)
+  return str(path)
+
+@pytest.fixture(scope='module')
+def index(data_path, tmp_path_factory):
+  index_path = str(tmp_path_factory.mktemp('index') / 'autocomplete.bin')
+  return AutocompleteIndex(build_index(data_path, index_path, pinyin=False))
+
+def names(results):
+  return [result['name'] for result in results]
+
+def test_prefix(index):
+  assert names(index.search('char'))[0] == '喷火龙'
+  assert names(index.search('皮卡'))[0] == '皮卡丘'
+  assert names(index.search('ピカチュウ'))[0] == '皮卡丘'
+
+def test_romaji(index):
+  assert names(index.search('lizardon'))[0] == '喷火龙'
+  assert names(index.search('rizadon'))[0] == '喷火龙'
+  assert names(index.search('pikachuu'))[0] == '皮卡丘'
+
+def test_one_edit_typo(index):
+  results = index.search('pikahcu')
+  assert names(results)[0] == '皮卡丘'
+  assert results[0]['score'] < index.search('pikachu')[0]['score']
+
+def test_kind_filter(index):
+  assert {result['kind'] for result in index.search('pika')} == {'pokemon', 'moves', 'items'}
+  assert names(index.search('pika', kinds=['moves'])) == ['皮卡皮卡必杀击']
+  assert names(index.search('pika', kinds=['items'])) == ['皮卡丘Z']
+  assert index.search('pika', kinds=['abilities']) == []
+
+def test_pinyin(data_path, tmp_path):
+  pytest.importorskip('pypinyin')
+  index = AutocompleteIndex(build_index(data_path, str(tmp_path / 'autocomplete.bin')))
+  assert names(index.search('pikaqiu'))[0] == '皮卡丘'
+  assert names(index.search('pkq'))[0] == '皮卡丘'
+  assert names(index.search('penhuo'))[0] == '喷火龙'
+
+def test_pinyin_requires_pypinyin(data_path, tmp_path, monkeypatch):
+  monkeypatch.setattr(autocomplete, 'lazy_pinyin', None)
+  with pytest.raises(RuntimeError):
+    build_index(data_path, str(tmp_path / 'autocomplete.bin'))
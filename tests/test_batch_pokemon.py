@@ -0,0 +1,66 @@
+import json
+
+import pytest
+import requests
+
+from conftest import read_fixture, require_scraper
+
+require_scraper()
+
+from batch_pokemon import TokenBucket, create_session, fetch_with_retry, run_batch
+from pokemon import fetch_page
+
+def fetch(server, **kwargs):
+  session = create_session(1)
+  try:
+    return fetch_with_retry('妙蛙种子', session, TokenBucket(0), server.url, backoff=0.01, **kwargs)
+  finally:
+    session.close()
+
+def test_retries_rate_limit_and_server_errors(server):
+  server.responses = [(429, '', {'Retry-After': '0'}), (503, ''), (502, ''), (200, '<html>ok</html>')]
+  assert fetch(server) == '<html>ok</html>'
+  assert len(server.requests) == 4
+  assert server.requests[0]['path'] == '/妙蛙种子'
+
+def test_gives_up_after_retries(server):
+  server.responses = [(500, '')]
+  with pytest.raises(requests.HTTPError):
+    fetch(server, retries=2)
+  assert len(server.requests) == 3
+
+def test_does_not_retry_client_errors(server):
+  server.responses = [(404, ''), (200, 'late')]
+  with pytest.raises(requests.HTTPError):
+    fetch(server)
+  assert len(server.requests) == 1
+
+def test_fetch_page_times_out(server):
+  server.responses = [(200, 'slow', {}, 1)]
+  with pytest.raises(requests.Timeout):
+    fetch_page('妙蛙种子', base_url=server.url, timeout=0.2)
+
+def run(server, tmp_path, **kwargs):
+  pokemon = {'index': '0074', 'name_zh': '小拳石', 'name_en': 'Geodude', 'name_jp': 'イシツブテ'}
+  return run_batch([pokemon], str(tmp_path), server.url, concurrency=1, rate=0, workers=1, backoff=0.01, **kwargs)
+
+def test_incremental_rebuild(server, tmp_path):
+  server.responses = [(200, read_fixture('0074-小拳石.html'))]
+  manifest = {}
+  assert run(server, tmp_path, manifest=manifest)['saved'] == 1
+  with open(tmp_path / '0074-小拳石.json', encoding='utf-8') as f:
+    assert json.load(f)['forms'][1]['name'] == '阿罗拉小拳石'
+  assert run(server, tmp_path, manifest=manifest)['skipped'] == 1
+
+def test_incremental_rejects_on_result(server, tmp_path):
+  with pytest.raises(ValueError):
+    run(server, tmp_path, manifest={}, on_result=lambda pokemon, data: None)
+  assert server.requests == []
+
+def test_on_result_receives_data(server, tmp_path):
+  server.responses = [(200, read_fixture('0074-小拳石.html'))]
+  results = []
+  summary = run(server, tmp_path, on_result=lambda pokemon, data: results.append(data))
+  assert summary['saved'] == 1
+  assert results[0]['name'] == '小拳石'
+  assert list(tmp_path.iterdir()) == []
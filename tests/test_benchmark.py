@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from conftest import ROOT, require_scraper
+
+require_scraper()
+
+from benchmark import (compare_extract, extract_page, find_regressions, get_pokemon_info, legacy_extract_page, load_corpus,
+                       run_suite)
+from species_page import write_corpus
+
+DATA_PATH = os.path.join(ROOT, 'data')
+
+pytestmark = pytest.mark.usefixtures('scripts_dir')
+
+def get_pages(tmp_path):
+  write_corpus(['小拳石', '无畏小子'], str(tmp_path), DATA_PATH)
+  return load_corpus(str(tmp_path))
+
+def test_suite_runs_offline_on_rendered_corpus(tmp_path):
+  results = run_suite(get_pages(tmp_path), repeat=1)
+  assert results['errors'] == {}
+  assert sorted(results['pages']) == ['小拳石', '无畏小子']
+  assert results['throughput'] > 0
+  assert results['peak'] > 0
+  assert 'extract.moves' in results['stages']
+
+def test_find_regressions(tmp_path):
+  results = run_suite(get_pages(tmp_path), repeat=1)
+  assert find_regressions(results, results) == []
+  faster = {**results, 'throughput': results['throughput'] * 2,
+            'stages': {stage: time / 2 - 0.01 for stage, time in results['stages'].items()}}
+  regressions = find_regressions(results, faster)
+  assert regressions[0].startswith('throughput')
+
+# 改造前原样保留的提取函数与当前实现的输出一致，端到端对比才有意义
+def test_legacy_extractor_matches_current(tmp_path):
+  pages = get_pages(tmp_path)
+  for name, html in pages.items():
+    pokemon = get_pokemon_info(name)
+    assert legacy_extract_page(html, pokemon, 'html.parser') == extract_page(html, pokemon, 'html.parser')
+  results = compare_extract(pages)
+  assert results['errors'] == {}
+  assert sorted(results['pages']) == ['小拳石', '无畏小子']
+  assert results['before'] > 0 and results['after'] > 0
@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import ROOT
+import pokemon_dataset
+from damage import MoveTable, Sets, damage_ranges
+
+DATA_PATH = f'{ROOT}/data'
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+  pack_path = str(tmp_path_factory.mktemp('pack') / 'pokemon.pack')
+  dataset = pokemon_dataset.load(pack_path, DATA_PATH)
+  yield dataset
+  dataset.close()
+
+@pytest.fixture(scope='module')
+def moves():
+  return MoveTable(DATA_PATH)
+
+def get_range(dataset, moves, attacker, move, defender, critical=False):
+  low, high = damage_ranges(Sets([attacker], dataset), moves.get_ids([move]), Sets([defender], dataset), moves,
+                            critical)
+  return int(low[0, 0, 0]), int(high[0, 0, 0])
+
+# 252+ 攻击的烈咬陆鲨用地震攻击 0 努力值的巨金怪，50 级
+GARCHOMP = {'pokemon': '烈咬陆鲨', 'evs': {'attack': 252}, 'nature': '固执'}
+METAGROSS = {'pokemon': '巨金怪'}
+
+def test_garchomp_earthquake_against_metagross(dataset, moves):
+  assert get_range(dataset, moves, GARCHOMP, '地震', METAGROSS) == (152, 180)
+
+def test_stab(dataset, moves):
+  without = get_range(dataset, moves, GARCHOMP, '撞击', METAGROSS)
+  normal = get_range(dataset, moves, {**GARCHOMP, 'types': ['一般']}, '撞击', METAGROSS)
+  assert without == (10, 12)
+  assert normal == (15, 18)
+
+def test_levitate_is_immune_to_ground(dataset, moves):
+  assert get_range(dataset, moves, GARCHOMP, '地震', {**METAGROSS, 'ability': '飘浮'}) == (0, 0)
+
+# 1 级绿毛虫的撞击打 252+ 防御的壶壶：最低随机数加上效果不好会把伤害压到 0，最少仍有 1 点
+def test_damage_is_at_least_one(dataset, moves):
+  shuckle = {'pokemon': '壶壶', 'evs': {'defense': 252}, 'nature': '大胆'}
+  assert get_range(dataset, moves, {'pokemon': '绿毛虫', 'level': 1}, '撞击', shuckle) == (1, 1)
+
+# 会心一击在随机数之前把基础伤害乘 1.5 并舍去小数：60 -> 90
+def test_critical_hit(dataset, moves):
+  assert get_range(dataset, moves, GARCHOMP, '地震', METAGROSS, critical=True) == (228, 270)
+  # 基础伤害为奇数时 1.5 倍带 .5，须舍去：25 -> 37
+  assert get_range(dataset, moves, GARCHOMP, '撞击', METAGROSS, critical=True) == (15, 18)
@@ -0,0 +1,135 @@
+import io
+import json
+import os
+import shutil
+import tarfile
+
+import pytest
+
+import delta_update
+from delta_update import (DeltaError, JOURNAL_NAME, STAGING_DIR, apply_delta, build_delta, dump_json, load_snapshot,
+                          snapshot)
+
+def write(root, path, data):
+  path = os.path.join(root, path)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'wb') as f:
+    f.write(data.encode('utf-8') if isinstance(data, str) else data)
+
+@pytest.fixture
+def versions(tmp_path):
+  old, new = str(tmp_path / 'old'), str(tmp_path / 'new')
+  pokemon = {'name_zh': '小拳石', 'stats': [{'hp': '40'}], 'forms': ['小拳石']}
+  write(old, 'pokemon/0074-小拳石.json', dump_json(pokemon))
+  write(old, 'move_list.json', dump_json([{'name': '撞击'}, {'name': '变圆'}]))
+  write(old, 'images/a.png', b'\x89PNG old')
+  write(old, 'removed.json', dump_json({}))
+  write(old, 'raw/ignored.html', 'not published')
+  write(new, 'pokemon/0074-小拳石.json', dump_json({**pokemon, 'stats': [{'hp': '41'}]}))
+  write(new, 'move_list.json', dump_json([{'name': '撞击'}, {'name': '变圆'}, {'name': '滚动'}]))
+  write(new, 'images/a.png', b'\x89PNG new')
+  write(new, 'images/b.png', b'\x89PNG new')
+  write(new, 'added.json', dump_json({'id': 1}))
+  return old, new
+
+def test_apply_reproduces_new_version(versions, tmp_path):
+  old, new = versions
+  bundle = str(tmp_path / 'delta.tar.gz')
+  delta = build_delta(old, new, bundle)
+  assert delta_update.summarize(delta) == {'added': 2, 'patched': 2, 'replaced': 1, 'removed': 1}
+  assert apply_delta(bundle, old) == (delta, 'applied')
+  assert snapshot(old) == snapshot(new)
+  assert not os.path.exists(os.path.join(old, STAGING_DIR))
+  assert apply_delta(bundle, old)[1] == 'current'
+
+def test_rejects_other_base(versions, tmp_path):
+  old, new = versions
+  bundle = str(tmp_path / 'delta.tar.gz')
+  build_delta(old, new, bundle)
+  write(old, 'move_list.json', dump_json([]))
+  before = snapshot(old)
+  with pytest.raises(DeltaError):
+    apply_delta(bundle, old)
+  assert snapshot(old) == before
+  assert not os.path.exists(os.path.join(old, STAGING_DIR))
+
+def test_rejects_corrupt_blob(versions, tmp_path):
+  old, new = versions
+  bundle = str(tmp_path / 'delta.tar.gz')
+  build_delta(old, new, bundle)
+  corrupt = str(tmp_path / 'corrupt.tar.gz')
+  with tarfile.open(bundle, 'r:gz') as source, tarfile.open(corrupt, 'w:gz') as target:
+    for member in source:
+      data = source.extractfile(member).read()
+      if member.name.startswith('blobs/'):
+        data = b'x' + data
+        member.size = len(data)
+      target.addfile(member, io.BytesIO(data))
+  before = snapshot(old)
+  with pytest.raises(DeltaError):
+    apply_delta(corrupt, old)
+  assert snapshot(old) == before
+
+# 替换到一半时中断，日志留在暂存目录，再次 apply 时先执行完上次的日志
+def test_resumes_after_interruption(versions, tmp_path, monkeypatch):
+  old, new = versions
+  bundle = str(tmp_path / 'delta.tar.gz')
+  build_delta(old, new, bundle)
+  copyfile = shutil.copyfile
+  calls = []
+  def crash(source, target):
+    calls.append(target)
+    if len(calls) == 2:
+      raise OSError('disk full')
+    return copyfile(source, target)
+  monkeypatch.setattr(delta_update.shutil, 'copyfile', crash)
+  with pytest.raises(OSError):
+    apply_delta(bundle, old)
+  assert os.path.exists(os.path.join(old, STAGING_DIR, JOURNAL_NAME))
+  assert snapshot(old) != snapshot(new)
+
+  monkeypatch.setattr(delta_update.shutil, 'copyfile', copyfile)
+  assert apply_delta(bundle, old)[1] == 'current'
+  assert snapshot(old) == snapshot(new)
+  assert not os.path.exists(os.path.join(old, STAGING_DIR))
+
+def test_diff_from_snapshot(versions, tmp_path):
+  old, new = versions
+  manifest_path = str(tmp_path / 'snapshot.json')
+  with open(manifest_path, 'w', encoding='utf-8') as f:
+    json.dump(snapshot(old), f)
+  bundle = str(tmp_path / 'delta.tar.gz')
+  delta = build_delta(None, new, bundle, old=load_snapshot(manifest_path))
+  assert not any('patch' in change for change in delta['changes'])
+  apply_delta(bundle, old)
+  assert snapshot(old) == snapshot(new)
+
+def test_load_snapshot_checks_root(tmp_path, versions):
+  manifest = snapshot(versions[0])
+  manifest['files']['move_list.json'] = '0' * 64
+  path = str(tmp_path / 'snapshot.json')
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(manifest, f)
+  with pytest.raises(DeltaError):
+    load_snapshot(path)
+
+# 增量包中的路径不可信，越出数据目录的路径在暂存任何文件之前就被拒绝
+@pytest.mark.parametrize('path', ['../pwned.txt', 'pokemon/../../pwned.txt', '/tmp/pwned.txt', '.delta/journal.json',
+                                  'raw/cache/index.json', 'pokemon//a.json'])
+def test_rejects_unsafe_paths(versions, tmp_path, path):
+  old, new = versions
+  blob = tmp_path / 'blob'
+  blob.write_bytes(b'pwned')
+  hash = delta_update.hash_bytes(b'pwned')
+  files = {**snapshot(old)['files'], path: hash}
+  delta = {'from': snapshot(old)['root'], 'to': delta_update.get_root_hash(files),
+           'changes': [{'path': path, 'base': None, 'hash': hash}]}
+  bundle = str(tmp_path / 'evil.tar.gz')
+  delta_update.write_bundle(delta, {hash: str(blob)}, bundle)
+  before = snapshot(old)
+  with pytest.raises(DeltaError, match='path'):
+    apply_delta(bundle, old)
+  assert not (tmp_path / 'pwned.txt').exists()
+  assert not os.path.exists('/tmp/pwned.txt')
+  assert not os.path.exists(os.path.join(old, STAGING_DIR))
+  assert snapshot(old) == before
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT
+from export_sqlite import connect, export_sqlite, search_flavor_texts
+
+DATA = os.path.join(ROOT, 'data')
+SPECIES = ['0004-小火龙.json', '0005-火恐龙.json', '0006-喷火龙.json']
+
+# 只含小火龙一家的数据目录，列表文件和图鉴链接到仓库中的数据
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+  data_path = tmp_path_factory.mktemp('data')
+  for name in ['move_list.json', 'ability_list.json', 'item_list.json', 'pokedex']:
+    os.symlink(os.path.join(DATA, name), data_path / name)
+  os.makedirs(data_path / 'pokemon')
+  for name in SPECIES:
+    shutil.copyfile(os.path.join(DATA, 'pokemon', name), data_path / 'pokemon' / name)
+  db = connect(export_sqlite(str(data_path), str(data_path / 'dataset.sqlite')))
+  yield db
+  db.close()
+
+def test_stats_join_forms_one_to_one(db):
+  rows = db.execute('SELECT f.name, s.form, s.attack FROM forms f JOIN stats s ON s.form_id = f.id '
+                    'WHERE f.species_id = 6 ORDER BY f.position').fetchall()
+  assert rows == [('喷火龙', '一般', 84), ('超级喷火龙Ｘ', '超级喷火龙Ｘ', 130), ('超级喷火龙Ｙ', '超级喷火龙Ｙ', 104),
+                  ('超极巨化喷火龙', '一般', 84)]
+
+# 进化图从导出的数据目录构建，而不是 build 目录中已有的图
+def test_evolutions_come_from_data_path(db):
+  assert {species_id for (species_id,) in db.execute('SELECT species_id FROM evolution_nodes')} == {4, 5, 6}
+
+@pytest.mark.parametrize('query', ['"', '火焰"', 'a "b" c'])
+def test_search_escapes_quotes(db, query):
+  assert search_flavor_texts(db, query) == []
+
+def test_search_flavor_texts(db):
+  assert {row[0] for row in search_flavor_texts(db, '尾巴上的火焰', limit=100)} <= {4, 5, 6}
+  assert search_flavor_texts(db, '尾巴上的火焰')
@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import read_fixture, require_scraper
+
+require_scraper()
+
+import pokemon
+from extract_cached import extract_pokemon
+from manifest import get_stale_fields, hash_text
+
+POKEMON = {'name_zh': '小拳石', 'index': '0074', 'name_en': 'Geodude', 'name_jp': 'イシツブテ'}
+
+@pytest.fixture
+def page(tmp_path):
+  html = read_fixture('0074-小拳石.html')
+  body_path = tmp_path / 'body.gz'
+  body_path.write_bytes(gzip.compress(html.encode('utf-8')))
+  return str(body_path), hash_text(html), str(tmp_path / '0074-小拳石.json')
+
+def fail_stats(monkeypatch):
+  def extractor(page, name, index):
+    raise KeyError('种族值')
+  monkeypatch.setitem(pokemon.EXTRACTORS, 'stats', extractor)
+
+def read(path):
+  with open(path, 'r', encoding='utf-8') as f:
+    return json.load(f)
+
+def test_entry_covers_all_fields(page):
+  body_path, source_hash, output_path = page
+  status, errors, entry = extract_pokemon(POKEMON, body_path, output_path)
+  assert (status, errors) == ('written', [])
+  assert entry['output'] == hash_text(open(output_path, encoding='utf-8').read())
+  assert get_stale_fields(entry, source_hash) == []
+
+# 出错的字段不保留旧值，manifest 中也不记版本，之后重试成功时恢复原来的键顺序
+def test_failed_field_is_dropped_and_retried(page, monkeypatch):
+  body_path, source_hash, output_path = page
+  extract_pokemon(POKEMON, body_path, output_path)
+  complete = read(output_path)
+
+  with monkeypatch.context() as m:
+    fail_stats(m)
+    status, errors, entry = extract_pokemon(POKEMON, body_path, output_path)
+  assert status == 'partial'
+  assert [error['field'] for error in errors] == ['stats']
+  assert 'stats' not in read(output_path)
+  assert get_stale_fields(entry, source_hash) == ['stats']
+
+  status, errors, entry = extract_pokemon(POKEMON, body_path, output_path, fields=['stats'], entry=entry)
+  assert (status, errors) == ('written', [])
+  assert list(read(output_path)) == list(complete)
+  assert get_stale_fields(entry, source_hash) == []
+
+# 旧记录与输出不一致时，沿用的字段不能算作最新
+def test_retry_without_valid_entry_marks_other_fields_stale(page):
+  body_path, source_hash, output_path = page
+  extract_pokemon(POKEMON, body_path, output_path)
+  status, errors, entry = extract_pokemon(POKEMON, body_path, output_path, fields=['stats'], entry=None)
+  assert get_stale_fields(entry, source_hash) == [field for field in pokemon.FIELDS if field != 'stats']
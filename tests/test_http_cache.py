@@ -0,0 +1,56 @@
+import os
+
+import pytest
+import requests
+
+from http_cache import OfflineCacheMiss, ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+  return ResponseCache(str(tmp_path / 'cache'))
+
+def test_not_modified_reads_cached_body(server, cache):
+  server.responses = [(200, 'v1', {'ETag': '"1"'}), (304, '')]
+  with requests.Session() as session:
+    assert cache.fetch(session, server.url) == 'v1'
+    assert cache.fetch(session, server.url) == 'v1'
+  assert server.requests[1]['headers']['If-None-Match'] == '"1"'
+
+# 命中缓存不立即改写 index.json，flush 时才写出访问时间
+def test_touch_defers_index_writes(server, cache):
+  server.responses = [(200, 'v1', {'ETag': '"1"'}), (304, '')]
+  with requests.Session() as session:
+    cache.fetch(session, server.url)
+    saved = os.path.getmtime(cache.index_path), ResponseCache(cache.cache_dir).index
+    cache.fetch(session, server.url)
+  assert (os.path.getmtime(cache.index_path), ResponseCache(cache.cache_dir).index) == saved
+  cache.flush()
+  assert ResponseCache(cache.cache_dir).index == cache.index
+
+# 正文文件丢失时，304 没有内容可用，改发不带条件的请求
+def test_missing_body_falls_back_to_unconditional_get(server, cache):
+  server.responses = [(200, 'v1', {'ETag': '"1"'}), (304, ''), (200, 'v2', {'ETag': '"2"'})]
+  with requests.Session() as session:
+    cache.fetch(session, server.url)
+    os.remove(cache.get_body_path(server.url))
+    assert cache.fetch(session, server.url) == 'v2'
+  assert 'If-None-Match' not in server.requests[2]['headers']
+  assert cache.index[server.url]['etag'] == '"2"'
+  assert cache.read(server.url) == 'v2'
+
+def test_not_modified_without_entry(server, cache):
+  server.responses = [(304, '')]
+  with requests.Session() as session:
+    with pytest.raises(requests.HTTPError):
+      cache.fetch(session, server.url)
+  assert server.url not in cache.index
+
+def test_offline_missing_body(server, cache):
+  server.responses = [(200, 'v1')]
+  with requests.Session() as session:
+    cache.fetch(session, server.url)
+  os.remove(cache.get_body_path(server.url))
+  offline = ResponseCache(cache.cache_dir, offline=True)
+  with pytest.raises(OfflineCacheMiss):
+    offline.fetch(None, server.url)
+  assert server.url not in offline.index
@@ -0,0 +1,97 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from conftest import require_scraper
+
+require_scraper()
+
+import image_downloader
+from image_downloader import SAVE_EVERY, download_images, load_image_manifest
+
+def make_png(width, height):
+  def chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+  rows = b''.join(b'\0' + b'\xff\0\0\xff' * width for _ in range(height))
+  return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+          + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+PNG = make_png(2, 3)
+
+def get_images(server, count):
+  images = [{'path': f'official/{i:04d}.png', 'url': f'https://media.52poke.com/wiki/{i:04d}.png'} for i in range(count)]
+  for image in images:
+    server.routes.setdefault(f'/wiki/{os.path.basename(image["path"])}', [(200, PNG)])
+  return images
+
+def download(server, tmp_path, images, **kwargs):
+  kwargs = {'concurrency': 2, 'rate': 0, 'host': server.url, 'retries': 2, 'backoff': 0, **kwargs}
+  return download_images(images, str(tmp_path / 'images'), manifest_path=str(tmp_path / 'images.json'), **kwargs)
+
+def get_files(tmp_path):
+  return sorted(name for root, dirs, names in os.walk(tmp_path / 'images') for name in names)
+
+def test_skips_current_files(server, tmp_path):
+  images = get_images(server, 3)
+  assert download(server, tmp_path, images)['downloaded'] == 3
+  entry = load_image_manifest(str(tmp_path / 'images.json'))['official/0000.png']
+  assert (entry['bytes'], entry['width'], entry['height']) == (len(PNG), 2, 3)
+
+  requests = len(server.requests)
+  summary = download(server, tmp_path, images, manifest=load_image_manifest(str(tmp_path / 'images.json')))
+  assert (summary['downloaded'], summary['skipped']) == (0, 3)
+  assert len(server.requests) == requests
+
+  # 内容与 manifest 中的哈希不一致时重新下载
+  (tmp_path / 'images' / 'official' / '0001.png').write_bytes(PNG[:-1] + b'!')
+  summary = download(server, tmp_path, images, manifest=load_image_manifest(str(tmp_path / 'images.json')))
+  assert (summary['downloaded'], summary['skipped']) == (1, 2)
+
+@pytest.mark.parametrize('response', [
+  (200, b'<html>not an image</html>'),
+  (200, PNG[:20], {'Content-Length': str(len(PNG))}),
+], ids=['corrupt', 'truncated'])
+def test_rejects_bad_images(server, tmp_path, response):
+  images = get_images(server, 1)
+  server.routes['/wiki/0000.png'] = [response]
+  summary = download(server, tmp_path, images)
+  assert summary['failed'] == ['official/0000.png']
+  assert len(server.requests) == 3
+  assert get_files(tmp_path) == []
+  assert load_image_manifest(str(tmp_path / 'images.json')) == {}
+
+def test_retries_server_errors(server, tmp_path):
+  images = get_images(server, 2)
+  server.routes['/wiki/0000.png'] = [(503, b'', {'Retry-After': '0'}), (502, b''), (200, PNG)]
+  server.routes['/wiki/0001.png'] = [(500, b'')]
+  summary = download(server, tmp_path, images)
+  assert summary['downloaded'] == 1
+  assert summary['failed'] == ['official/0001.png']
+  assert [request['path'] for request in server.requests].count('/wiki/0000.png') == 3
+  assert [request['path'] for request in server.requests].count('/wiki/0001.png') == 3
+
+class Interrupted(BaseException):
+  pass
+
+# 中断时 manifest 只保存到最近的第 SAVE_EVERY 张，再次运行时跳过这些图片，只下载其余的
+def test_resumes_after_interruption(server, tmp_path, monkeypatch):
+  images = get_images(server, SAVE_EVERY + 10)
+  calls = []
+  download_image = image_downloader.download_image
+  def interrupt(image, *args):
+    calls.append(image['path'])
+    if len(calls) == SAVE_EVERY + 5:
+      raise Interrupted()
+    return download_image(image, *args)
+  monkeypatch.setattr(image_downloader, 'download_image', interrupt)
+  with pytest.raises(Interrupted):
+    download(server, tmp_path, images, concurrency=1)
+  manifest = load_image_manifest(str(tmp_path / 'images.json'))
+  assert len(manifest) == SAVE_EVERY
+
+  monkeypatch.setattr(image_downloader, 'download_image', download_image)
+  summary = download(server, tmp_path, images, manifest=manifest)
+  assert (summary['downloaded'], summary['skipped'], summary['failed']) == (10, SAVE_EVERY, [])
+  assert len(load_image_manifest(str(tmp_path / 'images.json'))) == SAVE_EVERY + 10
@@ -0,0 +1,22 @@
+import pytest
+
+from conftest import ROOT
+from inverted_index import InvertedIndex, build_index
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+  path = str(tmp_path_factory.mktemp('index') / 'inverted_index.bin')
+  return InvertedIndex(build_index(f'{ROOT}/data', path))
+
+# 特性、属性、蛋群须由同一个形态满足：喷火龙的猛火属于一般形态，龙属性属于超级喷火龙Ｘ
+def test_constraints_match_the_same_form(index):
+  assert 6 not in index.search(abilities=['猛火'], types=['龙'])
+  assert index.search(abilities=['硬爪'], types=['龙']) == [6]
+  assert 6 in index.search(abilities=['猛火'], types=['飞行'])
+
+def test_moves_intersect_per_species(index):
+  assert index.search(moves=['喷射火焰'], abilities=['硬爪'], types=['龙']) == [6]
+  assert 6 not in index.search(moves=['挠痒'], abilities=['硬爪'])
+
+def test_move_suffixes_are_normalized(index):
+  assert not any(term.endswith(('*', '‡', 'USUM')) for term in index.meta['terms']['move_entries'])
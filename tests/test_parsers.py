@@ -0,0 +1,45 @@
+import importlib.util
+
+import pytest
+
+from conftest import read_fixture, require_scraper
+
+require_scraper()
+
+from benchmark import compare_parsers
+from pokemon import PARSERS, parse_pokemon_data
+
+NAME = '小拳石'
+AVAILABLE = [parser for parser in PARSERS if parser == 'html.parser' or importlib.util.find_spec(parser)]
+
+@pytest.fixture(scope='module')
+def html():
+  return read_fixture('0074-小拳石.html')
+
+def extract(html, parser):
+  return parse_pokemon_data(html, NAME, '0074', 'Geodude', 'イシツブテ', parser)
+
+def test_fixture_extracts(html):
+  data = extract(html, 'html.parser')
+  assert [form['name'] for form in data['forms']] == ['小拳石', '阿罗拉小拳石']
+  assert data['forms'][1]['index'] == '0074.1'
+  assert data['forms'][1]['types'] == ['岩石', '电']
+  assert data['forms'][0]['gender_rate'] == {'male': '50%', 'female': '50%'}
+  assert data['stats'][0]['data']['defense'] == '100'
+  assert [chain[0]['form_name'] for chain in data['evolution_chains']] == [None, '阿罗拉的样子']
+  assert data['names']['en'] == 'Geodude'
+  # 脚注在提取时去掉
+  assert '[1]' not in data['profile']
+
+@pytest.mark.parametrize('parser', [parser for parser in PARSERS if parser != 'html.parser'])
+def test_parser_matches_html_parser(html, parser):
+  if parser not in AVAILABLE:
+    pytest.skip(f'{parser} is not installed')
+  assert extract(html, parser) == extract(html, 'html.parser')
+
+def test_compare_parsers(html):
+  assert compare_parsers(html, NAME, AVAILABLE) == []
+
+def test_unknown_parser(html):
+  with pytest.raises(ValueError):
+    extract(html, 'xml')
@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import inverted_index
+import pokemon_dataset
+from conftest import ROOT
+
+DATA = os.path.join(ROOT, 'data')
+SPECIES = ['0004-小火龙.json', '0005-火恐龙.json', '0006-喷火龙.json']
+
+def make_data(path):
+  os.makedirs(path)
+  for name in ['move_list.json', 'ability_list.json']:
+    shutil.copyfile(os.path.join(DATA, name), path / name)
+  for directory in ['pokemon', 'moves', 'abilities']:
+    os.makedirs(path / directory)
+  for name in SPECIES:
+    shutil.copyfile(os.path.join(DATA, 'pokemon', name), path / 'pokemon' / name)
+  return str(path)
+
+def rename_species(data_path, name, new_name):
+  path = os.path.join(data_path, 'pokemon', name)
+  with open(path, 'r', encoding='utf-8') as f:
+    record = json.load(f)
+  record['name_en'] = new_name
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(record, f, ensure_ascii=False, indent=2)
+  stat = os.stat(path)
+  os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+@pytest.fixture
+def data_path(tmp_path):
+  return make_data(tmp_path / 'data')
+
+# 数据文件更新后，load 重新构建数据包，而不是继续返回旧记录
+def test_load_rebuilds_stale_pack(data_path, tmp_path):
+  pack_path = str(tmp_path / 'dataset.pack')
+  with pokemon_dataset.load(pack_path, data_path) as dataset:
+    assert dataset.pokemon(6).name_en == 'Charizard'
+  rename_species(data_path, '0006-喷火龙.json', 'Lizardon')
+  with pokemon_dataset.load(pack_path, data_path) as dataset:
+    assert dataset.pokemon(6).name_en == 'Lizardon'
+    assert dataset.pokemon('Lizardon').key == '0006-喷火龙'
+
+def test_load_rebuilds_for_other_data_path(data_path, tmp_path):
+  pack_path = str(tmp_path / 'dataset.pack')
+  pokemon_dataset.load(pack_path, data_path).close()
+  other = make_data(tmp_path / 'other')
+  os.remove(os.path.join(other, 'pokemon', SPECIES[0]))
+  with pokemon_dataset.load(pack_path, other) as dataset:
+    with pytest.raises(KeyError):
+      dataset.pokemon(4)
+
+def test_load_reuses_current_index(data_path, tmp_path):
+  index_path = str(tmp_path / 'inverted_index.bin')
+  inverted_index.load(index_path, data_path)
+  mtime = os.stat(index_path).st_mtime_ns
+  inverted_index.load(index_path, data_path)
+  assert os.stat(index_path).st_mtime_ns == mtime
+  os.remove(os.path.join(data_path, 'pokemon', SPECIES[0]))
+  assert 4 not in inverted_index.load(index_path, data_path).search(types=['火'])
@@ -0,0 +1,21 @@
+import os
+
+from species_page import render_page, write_corpus
+
+from conftest import ROOT
+
+DATA_PATH = os.path.join(ROOT, 'data')
+
+def test_write_corpus_matches_full_width_names(tmp_path):
+  written = write_corpus(['小拳石', '多边兽2型', '不存在'], str(tmp_path), DATA_PATH)
+  assert sorted(written) == ['多边兽2型', '小拳石']
+  with open(written['小拳石'], 'r', encoding='utf-8') as f:
+    html = f.read()
+  assert 'id="multi-pm-form-table"' in html
+  assert '阿罗拉小拳石' in html
+
+def test_render_page_escapes_text():
+  record = {'name_zh': 'A<B', 'name_ja': '', 'pokedex_id': '0000', 'forms': [{'name': 'A<B'}]}
+  html = render_page(record)
+  assert 'A<B' not in html
+  assert 'A&lt;B' in html
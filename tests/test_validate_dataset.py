@@ -0,0 +1,107 @@
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS
+from validate_dataset import validate
+
+FILE = 'pokemon/0025-皮卡丘.json'
+# 能通过全部检查的最小记录，各测试在其副本上改出一处问题
+RECORD = {
+  'name_zh': '皮卡丘', 'name_ja': 'ピカチュウ', 'name_en': 'Pikachu', 'pokedex_id': '0025',
+  'forms': [{
+    'name': '皮卡丘', 'types': ['电'], 'abilities': [{'name': '静电', 'is_hidden': False}],
+    'egg_groups': ['陆上', '妖精'], 'height': '0.4m', 'weight': '6.0kg', 'image': '0025-皮卡丘.png',
+  }],
+  'stats': [{'form': '皮卡丘', 'data': {'hp': '35', 'attack': '55', 'defense': '40', 'sp_attack': '50',
+                                         'sp_defense': '50', 'speed': '90'}}],
+  'type_effectiveness': [],
+  'evolution_chains': [[
+    {'name': '皮丘', 'stage': '幼年', 'image': '172Pichu_Dream.png'},
+    {'name': '皮卡丘', 'stage': '1阶进化', 'from': '皮丘', 'image': '025Pikachu_Dream.png'},
+  ]],
+  'learnable_moves': [{'form': '皮卡丘', 'data': [{'name': '十万伏特', 'level_learned_at': '1'}]}],
+  'machine_moves': [{'form': '皮卡丘', 'data': [{'name': '十万伏特*'}]}],
+  'egg_moves': [{'form': '皮卡丘', 'data': [{'name': '十万伏特', 'parents': [{'id': '0172', 'name': '皮丘'}]}]}],
+  'home_images': [{'name': '皮卡丘', 'image': '0025-皮卡丘.png', 'shiny': '0025-皮卡丘-shiny.png'}],
+}
+IMAGES = {
+  'official': ['0025-皮卡丘.png'],
+  'dream': ['172Pichu_Dream.png', '025Pikachu_Dream.png'],
+  'home': ['0025-皮卡丘.png', '0025-皮卡丘-shiny.png'],
+}
+
+def write_json(path, data):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w', encoding='utf-8') as f:
+    json.dump(data, f, ensure_ascii=False)
+
+@pytest.fixture
+def data_path(tmp_path):
+  write_json(tmp_path / 'move_list.json', [{'id': '85', 'name_zh': '十万伏特', 'type': '电'}])
+  write_json(tmp_path / 'ability_list.json', [{'id': '009', 'name_zh': '静电'}])
+  write_json(tmp_path / 'simple_pokedex.json', [{'index': '0025', 'name_zh': '皮卡丘'}, {'index': '0172', 'name_zh': '皮丘'}])
+  write_json(tmp_path / 'pokedex' / 'national.json', [{'id': '25', 'name': '皮卡丘', 'types': ['电']},
+                                                     {'id': '172', 'name': '皮丘', 'types': ['电']}])
+  for directory, names in IMAGES.items():
+    os.makedirs(tmp_path / 'images' / directory)
+    for name in names:
+      (tmp_path / 'images' / directory / name).write_bytes(b'')
+  write_json(tmp_path / FILE, RECORD)
+  return str(tmp_path)
+
+def write_record(data_path, change):
+  record = copy.deepcopy(RECORD)
+  change(record)
+  write_json(os.path.join(data_path, FILE), record)
+
+def get_violations(data_path):
+  violations, file_count = validate(data_path, workers=1)
+  return [(violation['file'], violation['path'], violation['rule']) for violation in violations]
+
+def run_cli(data_path):
+  return subprocess.run([sys.executable, 'validate_dataset.py', '--data', data_path, '--workers', '1'],
+                        cwd=SCRIPTS, capture_output=True, text=True)
+
+def test_clean_dataset(data_path):
+  assert get_violations(data_path) == []
+  result = run_cli(data_path)
+  assert result.returncode == 0, result.stdout
+  assert '0 problems' in result.stdout
+
+def test_unknown_move(data_path):
+  write_record(data_path, lambda record: record['machine_moves'][0]['data'].append({'name': '不存在的招式'}))
+  assert get_violations(data_path) == [(FILE, 'machine_moves[0].data[1].name', 'unknown-move')]
+
+def test_unknown_ability(data_path):
+  write_record(data_path, lambda record: record['forms'][0]['abilities'].append({'name': '避雷针', 'is_hidden': True}))
+  assert get_violations(data_path) == [(FILE, 'forms[0].abilities[1].name', 'unknown-ability')]
+
+def test_missing_image(data_path):
+  def change(record):
+    record['home_images'][0]['shiny'] = '0025-皮卡丘-闪光.png'
+    record['evolution_chains'][0][0]['image'] = '172Pichu-Spiky_Dream.png'
+  write_record(data_path, change)
+  assert get_violations(data_path) == [
+    (FILE, 'evolution_chains[0][0].image', 'missing-image'),
+    (FILE, 'home_images[0].shiny', 'missing-image'),
+  ]
+
+def test_unknown_evolution_source(data_path):
+  write_record(data_path, lambda record: record['evolution_chains'][0][1].update({'from': '雷丘'}))
+  assert get_violations(data_path) == [(FILE, 'evolution_chains[0][1].from', 'unknown-evolution-source')]
+
+def test_invalid_json(data_path):
+  with open(os.path.join(data_path, FILE), 'w', encoding='utf-8') as f:
+    f.write('{"name_zh": "皮卡丘",')
+  assert get_violations(data_path) == [(FILE, '', 'invalid-json')]
+
+def test_exit_status_reports_violations(data_path):
+  write_record(data_path, lambda record: record['forms'][0]['abilities'].append({'name': '避雷针', 'is_hidden': True}))
+  result = run_cli(data_path)
+  assert result.returncode == 1
+  assert f'[unknown-ability] {FILE}: forms[0].abilities[1].name: 避雷针 not in ability_list.json' in result.stdout